@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+"""Compare the time of sweeping every leaf of a large recursive listing by 
+building a ResponseV2 and walking its nodes against flattening it into 
+etcd.columns.ListingColumns (and then filtering those).
+"""
+
+from sys import path
+path.insert(0, '..')
+
+import json
+import time
+
+import requests
+
+import etcd.json_decode
+
+from etcd.columns import ListingColumns
+from etcd.response import ResponseV2
+
+_DIRECTORY_COUNT = 1000
+_KEYS_PER_DIRECTORY = 1000
+
+
+def _build_body():
+    directories = []
+    for i in range(_DIRECTORY_COUNT):
+        nodes = [{ 'key': '/services/d%03d/node%04d' % (i, j),
+                   'value': 'http://10.0.%d.%d:8080' % (i % 256, j % 256),
+                   'modifiedIndex': 100000 + i * _KEYS_PER_DIRECTORY + j,
+                   'createdIndex': 100000 + j }
+                 for j in range(_KEYS_PER_DIRECTORY)]
+
+        directories.append({ 'key': '/services/d%03d' % (i),
+                             'dir': True,
+                             'nodes': nodes,
+                             'modifiedIndex': 100000,
+                             'createdIndex': 100000 })
+
+    return json.dumps({ 'action': 'get',
+                        'node': { 'key': '/services',
+                                  'dir': True,
+                                  'nodes': directories,
+                                  'modifiedIndex': 100000,
+                                  'createdIndex': 100000 } }).encode('utf8')
+
+def _build_raw_response(body):
+    r = requests.models.Response()
+    r.status_code = 200
+    r._content = body
+
+    return r
+
+def _walk(node, keys, modified_indexes):
+    if node.is_directory is True:
+        for child in node.children:
+            _walk(child, keys, modified_indexes)
+    else:
+        keys.append(node.key)
+        modified_indexes.append(node.modified_index)
+
+def _sweep_nodes(body):
+    response = ResponseV2(_build_raw_response(body), 'get', '/services')
+
+    keys = []
+    modified_indexes = []
+    _walk(response.node, keys, modified_indexes)
+
+    return len(keys)
+
+def _sweep_columns(body):
+    response_raw = etcd.json_decode.decode_response(_build_raw_response(body))
+    return len(ListingColumns.from_decoded(response_raw))
+
+def _filter_columns(columns):
+    return len(columns.filter_prefix('/services/d5')
+                      .filter_modified_index(min_index=500000))
+
+def _report(name, cb, argument):
+    start_s = time.time()
+    count = cb(argument)
+    elapsed_s = time.time() - start_s
+
+    print("%-16s %8d rows %7.2f s" % (name, count, elapsed_s))
+
+body = _build_body()
+print("%d bytes" % (len(body)))
+
+_report('nodes', _sweep_nodes, body)
+_report('columns', _sweep_columns, body)
+
+columns = ListingColumns.from_decoded(
+            etcd.json_decode.decode_response(_build_raw_response(body)))
+
+_report('filter columns', _filter_columns, columns)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+"""Measure the cost of decoding a large recursive directory listing with each 
+of the JSON decoders that are installed, and with requests' own decoding 
+(which builds a string from the body first).
+"""
+
+from sys import path
+path.insert(0, '..')
+
+import json
+import timeit
+
+import requests
+
+import etcd.json_decode
+
+_ITERATIONS = 20
+_NODE_COUNT = 20000
+
+_LIST_BODY = json.dumps({
+    'action': 'get',
+    'node': {
+        'key': '/services',
+        'dir': True,
+        'nodes': [{ 'key': '/services/node%06d' % i,
+                    'value': 'http://10.0.%d.%d:8080' % (i // 256, i % 256),
+                    'modifiedIndex': 100000 + i,
+                    'createdIndex': 100000 + i } 
+                  for i in range(_NODE_COUNT)],
+        'modifiedIndex': 100000,
+        'createdIndex': 100000,
+    },
+}).encode('utf8')
+
+
+def _build_raw_response():
+    r = requests.models.Response()
+    r.status_code = 200
+    r.encoding = 'utf-8'
+    r._content = _LIST_BODY
+
+    return r
+
+def _report(name, cb):
+    elapsed_s = min(timeit.repeat(cb, number=_ITERATIONS, repeat=3))
+    print("%-20s %8.2f ms/listing" % 
+          (name, elapsed_s / _ITERATIONS * 1000.0))
+
+print("%d nodes, %d bytes" % (_NODE_COUNT, len(_LIST_BODY)))
+
+_report('requests .json()', lambda: _build_raw_response().json())
+
+for name in etcd.json_decode.DECODER_NAMES:
+    loads = etcd.json_decode._get_loads(name)
+    if loads is None:
+        print("%-20s (not installed)" % (name))
+        continue
+
+    etcd.json_decode.set_decoder(loads, name)
+    _report(name, 
+            lambda: etcd.json_decode.decode_response(_build_raw_response()))
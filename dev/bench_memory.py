@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""Measure the memory taken by the response to a large recursive listing, 
+with and without the node dictionaries being kept. The tree is synthetic: 
+services, each with instances, each with a handful of keys.
+
+Usage: bench_memory.py [<number of keys>]
+"""
+
+from sys import path, argv
+path.insert(0, '..')
+
+import json
+import gc
+import tracemalloc
+
+import requests
+
+from etcd.response import ResponseV2
+
+
+def _build_tree(key_count):
+    index = [0]
+
+    def node(key, **kwargs):
+        index[0] += 1
+        kwargs.update({ 'key': key, 
+                        'createdIndex': index[0], 
+                        'modifiedIndex': index[0] })
+        return kwargs
+
+    services = []
+    leaf_count = 0
+    i = 0
+    while leaf_count < key_count:
+        service_key = '/services/service-%04d' % (i,)
+
+        instances = []
+        for j in range(10):
+            instance_key = '%s/instance-%02d' % (service_key, j)
+            leaves = [node('%s/%s' % (instance_key, name), 
+                           value='value of %s %d' % (name, leaf_count + k))
+                      for (k, name) 
+                      in enumerate(('host', 'port', 'weight', 'zone'))]
+
+            leaf_count += len(leaves)
+            instances.append(node(instance_key, dir=True, nodes=leaves))
+
+        services.append(node(service_key, dir=True, nodes=instances))
+        i += 1
+
+    return { 'action': 'get', 
+             'node': node('/services', dir=True, nodes=services) }
+
+def _walk(node):
+    count = 1
+    if node.is_directory is True:
+        for child in node.children:
+            count += _walk(child)
+
+    return count
+
+def _measure(name, body, cb):
+    gc.collect()
+    tracemalloc.start()
+
+    r = requests.models.Response()
+    r.status_code = 200
+    r.encoding = 'utf-8'
+    r._content = body
+
+    result = cb(r)
+    del r
+
+    gc.collect()
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("%-28s %8.1f MB retained %8.1f MB peak" % 
+          (name, current / 1024.0 / 1024.0, peak / 1024.0 / 1024.0))
+
+    return result
+
+def _keep_raw(r):
+    response = ResponseV2(r, 'get', '/keys/services')
+
+    # Hold on to every node, as a caller that indexes the listing would.
+    nodes = []
+    def collect(node):
+        nodes.append(node)
+        if node.is_directory is True:
+            for child in node.children:
+                collect(child)
+
+    collect(response.node)
+    return (response, nodes)
+
+def _compact(r):
+    response = ResponseV2(r, 'get', '/keys/services', keep_raw=False)
+    return (response, _walk(response.node))
+
+key_count = int(argv[1]) if len(argv) > 1 else 400000
+body = json.dumps(_build_tree(key_count)).encode('utf8')
+
+print("(%d) keys, (%.1f) MB of JSON" % (key_count, len(body) / 1024.0 / 1024.0))
+
+_measure('decoded JSON only', body, lambda r: r.json())
+_measure('nodes, keeping raw_node', body, _keep_raw)
+_measure('nodes, without raw_node', body, _compact)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Measure the cost of turning a raw response into a ResponseV2, for the 
+common case of a caller that only reads the value, and for one that reads 
+every attribute, and without building any nodes at all.
+"""
+
+from sys import path
+path.insert(0, '..')
+
+import json
+import timeit
+
+import requests
+
+from etcd.response import ResponseV2, build_decoded_response
+
+_ITERATIONS = 20000
+
+_GET_BODY = json.dumps({
+    'action': 'get',
+    'node': {
+        'key': '/config/service/endpoint',
+        'value': 'http://10.0.0.1:8080',
+        'expiration': '2014-02-10T11:58:49.123456789-05:00',
+        'ttl': 3600,
+        'modifiedIndex': 123456,
+        'createdIndex': 123001,
+    },
+    'prevNode': {
+        'key': '/config/service/endpoint',
+        'value': 'http://10.0.0.2:8080',
+        'modifiedIndex': 123001,
+        'createdIndex': 123001,
+    },
+}).encode('utf8')
+
+
+def _build_raw_response():
+    r = requests.models.Response()
+    r.status_code = 200
+    r.encoding = 'utf-8'
+    r._content = _GET_BODY
+
+    return r
+
+def _get_value():
+    return ResponseV2(_build_raw_response(), 'get', '/keys/config').node.value
+
+def _get_everything():
+    response = ResponseV2(_build_raw_response(), 'get', '/keys/config')
+    node = response.node
+
+    return (node.key, node.value, node.created_index, node.modified_index, 
+            node.is_hidden, node.ttl, node.expiration, 
+            response.prev_node.value)
+
+def _get_decoded_value():
+    response = build_decoded_response(_build_raw_response())
+    return response.raw_response['node']['value']
+
+def _report(name, cb):
+    elapsed_s = min(timeit.repeat(cb, number=_ITERATIONS, repeat=5))
+    print("%-20s %6.2f us/response" % 
+          (name, elapsed_s / _ITERATIONS * 1000000.0))
+
+_report('value only', _get_value)
+_report('every attribute', _get_everything)
+_report('decoded', _get_decoded_value)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""Compare the peak memory (and the time) of reading every leaf of a large 
+recursive listing by building a ResponseV2 against streaming it through 
+etcd.stream.LeafParser.
+"""
+
+from sys import path
+path.insert(0, '..')
+
+import json
+import time
+import tracemalloc
+
+import requests
+
+from etcd.response import ResponseV2
+from etcd.stream import LeafParser
+
+_DIRECTORY_COUNT = 200
+_KEYS_PER_DIRECTORY = 1000
+_CHUNK_SIZE = 65536
+
+
+def _build_body():
+    directories = []
+    for i in range(_DIRECTORY_COUNT):
+        nodes = [{ 'key': '/services/d%03d/node%04d' % (i, j),
+                   'value': 'http://10.0.%d.%d:8080' % (i, j % 256),
+                   'modifiedIndex': 100000 + j,
+                   'createdIndex': 100000 + j }
+                 for j in range(_KEYS_PER_DIRECTORY)]
+
+        directories.append({ 'key': '/services/d%03d' % (i),
+                             'dir': True,
+                             'nodes': nodes,
+                             'modifiedIndex': 100000,
+                             'createdIndex': 100000 })
+
+    return json.dumps({ 'action': 'get',
+                        'node': { 'key': '/services',
+                                  'dir': True,
+                                  'nodes': directories,
+                                  'modifiedIndex': 100000,
+                                  'createdIndex': 100000 } }).encode('utf8')
+
+def _walk(node):
+    if node.is_directory is True:
+        for child in node.children:
+            for leaf in _walk(child):
+                yield leaf
+    else:
+        yield (node.key, node.value, node.modified_index, node.ttl)
+
+def _read_built(body):
+    r = requests.models.Response()
+    r.status_code = 200
+    r._content = body
+
+    return sum(1 for _ in _walk(ResponseV2(r, 'get', '/services').node))
+
+def _read_streamed(body):
+    parser = LeafParser()
+    count = 0
+    for i in range(0, len(body), _CHUNK_SIZE):
+        count += len(parser.feed(body[i:i + _CHUNK_SIZE]))
+
+    return count + len(parser.close())
+
+def _report(name, cb, body):
+    tracemalloc.start()
+    start_s = time.time()
+    count = cb(body)
+    elapsed_s = time.time() - start_s
+    (_, peak_b) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("%-10s %7d leaves %8.2f MB peak %7.2f s" % 
+          (name, count, peak_b / 1048576.0, elapsed_s))
+
+body = _build_body()
+print("%d bytes" % (len(body)))
+
+# The body itself isn't counted, since a streamed one is never held whole.
+_report('built', _read_built, body)
+_report('streamed', _read_streamed, body)
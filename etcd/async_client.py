@@ -0,0 +1,635 @@
+"""A client for asyncio applications. It provides the same functionality as
+:class:`etcd.client.Client`, with the calls being coroutines, and it runs on
+*aiohttp* so that a single event-loop can keep many requests (and long-polls)
+open at once over a pool of keep-alive connections.
+"""
+
+import time
+import asyncio
+import ssl
+import logging
+
+import requests
+import requests.utils
+
+from requests.exceptions import ConnectionError, ChunkedEncodingError, \
+                               HTTPError, ConnectTimeout, ReadTimeout
+from requests.structures import CaseInsensitiveDict
+from requests.status_codes import codes
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+    _ConnectTimeoutError = None
+else:
+    # Older versions of aiohttp don't distinguish connect and read timeouts.
+    _ConnectTimeoutError = getattr(aiohttp, 'ConnectionTimeoutError', ())
+
+import etcd.config
+
+from etcd.config import ASYNC_CONNECTION_LIMIT
+from etcd.client import _ClientBase, _Modules
+from etcd.exceptions import EtcdTimeoutError, EtcdAllMachinesFailedError
+from etcd.deadline import get_deadline
+from etcd.coalesce import CoalescingStats, get_coalescing_key, \
+                          copy_error, is_borrowed_timeout
+from etcd.async_watch import AsyncWatcher
+from etcd.async_ops import AsyncDirectoryOps, AsyncNodeOps, AsyncServerOps, \
+                           AsyncStatOps, AsyncInOrderOps, AsyncLockMod, \
+                           AsyncLeaderMod
+
+_logger = logging.getLogger(__name__)
+
+
+def _build_response(url, status, reason, headers, content, history=()):
+    """Wrap the result of an aiohttp request in a Requests response so that
+    the response classes and the error handling are shared with the blocking
+    client.
+    """
+
+    r = requests.models.Response()
+    r.history = [_build_response(str(h.url), h.status, h.reason, h.headers,
+                                 b'')
+                 for h
+                 in history]
+
+    r.url = url
+    r.status_code = status
+    r.reason = reason
+    r.headers = CaseInsensitiveDict(headers)
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    r._content = content
+
+    return r
+
+async def iter_content(r, chunk_size):
+    """Yield the body of a streamed response as it's received, like 
+    :meth:`requests.models.Response.iter_content` does. The response is 
+    released when the body has been consumed, or when the generator is 
+    closed.
+
+    :param r: Response to a request that was sent with *stream*
+    :type r: requests.models.Response
+
+    :param chunk_size: Number of bytes to read at a time
+    :type chunk_size: int
+
+    :rtype: asynchronous generator of bytes
+
+    :raises: requests.exceptions.ChunkedEncodingError, 
+             requests.exceptions.ReadTimeout, 
+             requests.exceptions.ConnectionError
+    """
+
+    try:
+        async for content in r.raw.content.iter_chunked(chunk_size):
+            yield content
+    except aiohttp.ClientPayloadError as e:
+        raise ChunkedEncodingError(e)
+    except aiohttp.ServerTimeoutError as e:
+        raise ReadTimeout(e)
+    except aiohttp.ClientConnectionError as e:
+        raise ConnectionError(e)
+    finally:
+        r.raw.release()
+
+
+class _AsyncSingleFlight(object):
+    """Runs a coroutine once for all of the callers that ask for it with the
+    same key while it's in flight. The coroutine runs as its own task, so
+    cancelling one of the callers doesn't cancel it for the others. Errors
+    are handled like :class:`etcd.coalesce.SingleFlight` does.
+    """
+
+    def __init__(self):
+        self.__tasks = {}
+        self.__sent = 0
+        self.__merged = 0
+
+    def __forget(self, key, task):
+        if self.__tasks.get(key) is task:
+            del self.__tasks[key]
+
+        # Don't complain about an error that no caller was left to receive.
+        if task.cancelled() is False:
+            task.exception()
+
+    async def do(self, key, cb, deadline=None):
+        """Run the coroutine returned by the callback, or wait for the
+        identical one that's already running.
+
+        :raises: :class:`etcd.exceptions.EtcdTimeoutError`
+        """
+
+        is_retry = False
+        while True:
+            task = self.__tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(cb())
+                task.add_done_callback(lambda task: self.__forget(key, task))
+
+                self.__tasks[key] = task
+                self.__sent += 1
+
+                is_leader = True
+            else:
+                self.__merged += 1
+
+                is_leader = False
+
+            try:
+                if deadline is None:
+                    return await asyncio.shield(task)
+
+                return await asyncio.wait_for(asyncio.shield(task),
+                                              deadline.remaining_s)
+            except asyncio.TimeoutError:
+                raise EtcdTimeoutError("Timed-out while waiting for an "
+                                       "identical request: %s" % (key,))
+            except Exception as e:
+                if is_leader is True:
+                    raise
+
+                # The call ran under the deadline of the caller that started
+                # it.
+                if is_retry is False and \
+                   is_borrowed_timeout(e, deadline) is True:
+                    is_retry = True
+                    continue
+
+                raise copy_error(e)
+
+    @property
+    def stats(self):
+        return CoalescingStats(sent=self.__sent, merged=self.__merged)
+
+
+class _AsyncModules(_Modules):
+    """Intermediate container that holds functionality related to modules.
+
+    :param client: Client instance
+    :type client: :class:`etcd.async_client.AsyncClient`
+    """
+
+    lock_mod_cls = AsyncLockMod
+    leader_mod_cls = AsyncLeaderMod
+
+
+class AsyncClient(_ClientBase):
+    """The asyncio channel of functionality for the client. It takes the same
+    parameters as :class:`etcd.client.Client`, and all of its calls must be
+    awaited. Like that client, no I/O happens in the constructor.
+
+    It's also available as an *async with* statement, which will close the
+    connections on exit.
+
+    :param connection_limit: Maximum number of simultaneous connections to the
+                             cluster (zero for no limit).
+    :type connection_limit: int
+
+    :raises: ImportError
+    """
+
+    directory_ops_cls = AsyncDirectoryOps
+    node_ops_cls = AsyncNodeOps
+    server_ops_cls = AsyncServerOps
+    stat_ops_cls = AsyncStatOps
+    inorder_ops_cls = AsyncInOrderOps
+    modules_cls = _AsyncModules
+
+    def __init__(self, *args, **kwargs):
+        connection_limit = kwargs.pop('connection_limit',
+                                      ASYNC_CONNECTION_LIMIT)
+
+        if aiohttp is None:
+            raise ImportError("The asyncio client requires 'aiohttp'.")
+
+        super(AsyncClient, self).__init__(*args, **kwargs)
+
+        self.__connection_limit = connection_limit
+        self.__session = None
+        self.__discovery_lock = None
+        self.__single_flight = _AsyncSingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __build_ssl_context(self):
+        verify = self.ssl_verify
+
+        if verify is False:
+            return False
+
+        if verify is True:
+            context = ssl.create_default_context()
+        else:
+            context = ssl.create_default_context(cafile=verify)
+
+        cert = self.ssl_cert
+        if isinstance(cert, tuple) is True:
+            context.load_cert_chain(cert[0], cert[1])
+        elif cert is not None:
+            context.load_cert_chain(cert)
+
+        return context
+
+    @property
+    def session(self):
+        """Return the aiohttp session, creating it on first use (it must be
+        created from within the event-loop).
+
+        :rtype: aiohttp.ClientSession
+        """
+
+        if self.__session is None:
+            connector = aiohttp.TCPConnector(
+                            limit=self.__connection_limit,
+                            ssl=self.__build_ssl_context())
+
+            # Long-polls may legitimately take a long time, so there's no
+            # overall timeout.
+            self.__session = aiohttp.ClientSession(
+                                connector=connector,
+                                timeout=aiohttp.ClientTimeout(total=None))
+
+        return self.__session
+
+    @property
+    def coalescing_stats(self):
+        """Return how many coalescable reads were sent, and how many reads
+        were merged into them.
+
+        :rtype: :class:`etcd.coalesce.CoalescingStats`
+        """
+
+        return self.__single_flight.stats
+
+    def watch(self, path, recursive=False, index=None, poll_timeout=None,
+              resync=True, listing=None,
+              buffer_size=etcd.config.WATCH_BUFFER_SIZE):
+        """Return an asynchronous iterator of every change to the given node
+        (or, recursively, to the given directory). See
+        :class:`etcd.async_watch.AsyncWatcher`.
+
+        :param path: Node key
+        :type path: string
+
+        :param recursive: Report changes to any descendant of the node.
+        :type recursive: bool
+
+        :param index: Index to report changes from.
+        :type index: int or None
+
+        :param buffer_size: Number of changes to receive ahead of the
+                            iteration
+        :type buffer_size: int
+
+        :rtype: :class:`etcd.async_watch.AsyncWatcher`
+        """
+
+        return AsyncWatcher(self, path, recursive=recursive, index=index,
+                            poll_timeout=poll_timeout, resync=resync,
+                            listing=listing, buffer_size=buffer_size)
+
+    async def close(self):
+        """Close all pooled connections."""
+
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    async def refresh_machines(self):
+        """Retrieve the list of machines from the cluster."""
+
+        self.set_discovered_machines(await self.server.get_machines())
+
+    async def __discover(self):
+        if self.__discovery_lock is None:
+            self.__discovery_lock = asyncio.Lock()
+
+        async with self.__discovery_lock:
+            if self.cluster.is_discovered is True:
+                return
+
+            try:
+                await self.refresh_machines()
+            except (ConnectionError, HTTPError, ReadTimeout,
+                    EtcdTimeoutError, EtcdAllMachinesFailedError) as e:
+                _logger.debug("Could not retrieve the list of machines: %s",
+                              str(e))
+
+                # Without a cached list, we stay with the seed machine and
+                # try again on a later request.
+                self.use_stale_machines()
+
+    async def request(self, verb, url, parameters=None, data=None, 
+                      timeout=None, stream=False):
+        """Execute a single request against the given URL, with no
+        fail-over.
+
+        :param verb: Verb of request ('get', 'post', etc..)
+        :type verb: string
+
+        :param url: URL
+        :type url: string
+
+        :param parameters: Dictionary of values to be passed via URL query.
+        :type parameters: dictionary or None
+
+        :param data: Dictionary of values to be passed via POST data.
+        :type data: dictionary or None
+
+        :param timeout: Connect and read timeouts, in seconds (see 
+                        :meth:`etcd.client._ClientBase.get_timeout`).
+        :type timeout: tuple or None
+
+        :param stream: Return a successful response as soon as its headers 
+                       have been received. Its body is left to 
+                       :func:`iter_content`, and the caller must close it.
+        :type stream: bool
+
+        :returns: Raw response
+        :rtype: requests.models.Response
+
+        :raises: requests.exceptions.ConnectionError, 
+                 requests.exceptions.ReadTimeout
+        """
+
+        if timeout is None:
+            timeout = self.get_timeout(False)
+
+        (connect_timeout_s, read_timeout_s) = timeout
+        client_timeout = aiohttp.ClientTimeout(total=None, 
+                                               sock_connect=connect_timeout_s, 
+                                               sock_read=read_timeout_s)
+
+        try:
+            r = await self.session.request(verb.upper(), url,
+                                           params=parameters,
+                                           data=data or None, 
+                                           timeout=client_timeout)
+
+            if stream is True and r.status < codes.bad_request:
+                response = _build_response(str(r.url), r.status, r.reason, 
+                                           r.headers, False, r.history)
+
+                response.raw = r
+                return response
+
+            async with r:
+                content = await r.read()
+        except aiohttp.ClientPayloadError as e:
+            raise ChunkedEncodingError(e)
+        except _ConnectTimeoutError as e:
+            raise ConnectTimeout(e)
+        except aiohttp.ServerTimeoutError as e:
+            raise ReadTimeout(e)
+        except aiohttp.ClientConnectionError as e:
+            raise ConnectionError(e)
+
+        return _build_response(str(r.url), r.status, r.reason, r.headers,
+                               content, r.history)
+
+    async def __attempt(self, verb, prefix, url, parameters, data, is_wait,
+                        is_relaxed_read, timeout, stream=False):
+        _logger.debug("Request(%s)=[%s] params=[%s] data_keys=[%s]",
+                      verb, url, parameters, data.keys())
+
+        start_s = time.time()
+
+        try:
+            r = await self.request(verb, url, parameters, data, timeout,
+                                   stream=stream)
+        except ReadTimeout:
+            raise self.fail_timeout(prefix, url, is_wait, timeout)
+        except ConnectionError as e:
+            if isinstance(e, ConnectTimeout) is True and \
+               self.is_clipped_timeout(is_wait, timeout, True) is True:
+                raise self.fail_timeout(prefix, url, is_wait, timeout, 
+                                        is_connect=True)
+
+            _logger.debug("Connection error with [%s] [%s]: %s",
+                          prefix, e.__class__.__name__, str(e))
+
+            self.cluster.record(prefix, is_success=False, 
+                                is_connected=False)
+            raise
+
+        self.record_response(prefix, r, start_s, is_wait, is_relaxed_read)
+        return r
+
+    async def __send_hedged(self, version, path, parameters, data, deadline):
+        """Send a relaxed read to one machine and, if it hasn't answered
+        within the hedging delay, to a second machine as well. The first
+        response wins and the other request is cancelled.
+
+        :returns: Raw response, or None if no machine could be connected-to.
+        :rtype: requests.models.Response or None
+        """
+
+        timeout = self.get_timeout(False, deadline)
+
+        def start(prefix):
+            url = self.build_url(prefix, version, path)
+            return asyncio.ensure_future(
+                    self.__attempt('get', prefix, url, parameters, data,
+                                   False, True, timeout))
+
+        first_prefix = self.select_prefix(True)
+        pending = { start(first_prefix): first_prefix }
+
+        hedge_delay_s = self.get_hedge_delay()
+        (done, not_done) = await asyncio.wait(list(pending),
+                                              timeout=hedge_delay_s)
+
+        if not done:
+            second_prefix = self.cluster.select_for_read(
+                                exclude=(first_prefix,))
+
+            if second_prefix is not None:
+                _logger.debug("Hedging read to [%s] after (%.3f)s.",
+                              second_prefix, hedge_delay_s)
+
+                pending[start(second_prefix)] = second_prefix
+
+        try:
+            while pending:
+                (done, not_done) = await asyncio.wait(
+                                    list(pending),
+                                    return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    prefix = pending.pop(task)
+
+                    try:
+                        return task.result()
+                    except ConnectionError:
+                        self.cluster.fail(prefix)
+                    except EtcdTimeoutError:
+                        pass
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return None
+
+    async def send(self, version, verb, path, value=None, parameters=None,
+                   data=None, module=None, return_raw=False,
+                   allow_reconnect=True, timeout=None, stream=False,
+                   return_decoded=False):
+        """Build and execute a request. This takes the same parameters as
+        :meth:`etcd.client.Client.send`. The body of a response to a request 
+        with *stream* is read with :func:`iter_content`.
+
+        :returns: Response object
+        :rtype: :class:`etcd.response.ResponseV2` or
+                :class:`etcd.response.DecodedResponse`
+
+        :raises: :class:`etcd.exceptions.EtcdTimeoutError`
+        """
+
+        deadline = get_deadline(timeout)
+
+        if stream is True:
+            return_raw = True
+
+        if allow_reconnect is True and self.cluster.is_discovered is False:
+            await self.__discover()
+
+        if parameters is None:
+            parameters = {}
+
+        if data is None:
+            data = {}
+
+        if value is not None:
+            data['value'] = value
+
+        is_wait = self.is_long_poll(verb, parameters, module)
+        is_relaxed_read = allow_reconnect is True and \
+                          self.is_relaxed_read(verb, path, parameters, module)
+        needs_leader = allow_reconnect is True and \
+                       self.needs_leader(verb, path, parameters, module)
+
+        def send_cb():
+            return self.__send_with_retries(version, verb, path, module,
+                                            parameters, data, is_wait,
+                                            is_relaxed_read, needs_leader,
+                                            allow_reconnect, stream, deadline)
+
+        if is_relaxed_read is True and self.coalesce_reads is True and \
+           stream is False:
+            key = get_coalescing_key(version, path, parameters, module,
+                                     self.write_generation)
+
+            (r, retry_count) = await self.__single_flight.do(key, send_cb,
+                                                             deadline)
+        elif verb == 'get':
+            (r, retry_count) = await send_cb()
+        else:
+            try:
+                (r, retry_count) = await send_cb()
+            finally:
+                self.observe_write()
+
+        return self.build_response(r, verb, path, retry_count, return_raw,
+                                   return_decoded)
+
+    async def __send_with_retries(self, version, verb, path, module,
+                                  parameters, data, is_wait, is_relaxed_read,
+                                  needs_leader, allow_reconnect, stream,
+                                  deadline):
+        """Send a request, retrying it if the retry-policy allows.
+
+        :returns: Raw response, and the number of retries
+        :rtype: tuple
+        """
+
+        self.retry_policy.budget.deposit()
+
+        retry_count = 0
+        while True:
+            try:
+                r = await self.__send_once(version, verb, path, module,
+                                           parameters, data, is_wait,
+                                           is_relaxed_read, needs_leader,
+                                           allow_reconnect, stream, deadline)
+            except (EtcdTimeoutError, ChunkedEncodingError) as e:
+                error = e
+            else:
+                if self.retry_policy.is_retryable_response(r) is False:
+                    break
+
+                error = None
+
+            delay_s = self.get_retry_delay(verb, parameters, data, is_wait,
+                                           retry_count + 1, deadline)
+
+            if delay_s is None:
+                if error is not None:
+                    raise error
+
+                break
+
+            retry_count += 1
+
+            _logger.debug("Retrying (%d) request for [%s] in (%.3f)s: %s",
+                          retry_count, path, delay_s,
+                          error or r.status_code)
+
+            await asyncio.sleep(delay_s)
+
+        r.raise_for_status()
+
+        return (r, retry_count)
+
+    async def __send_once(self, version, verb, path, module, parameters, data,
+                          is_wait, is_relaxed_read, needs_leader,
+                          allow_reconnect, stream, deadline):
+        """Send a request, failing-over between machines until one of them
+        can be connected-to.
+
+        :returns: Raw response
+        :rtype: requests.models.Response
+        """
+
+        if self.should_look_up_leader(needs_leader) is True:
+            try:
+                self.set_looked_up_leader(
+                    await self.server.get_leader_url_prefix())
+            except (ConnectionError, HTTPError, ReadTimeout) as e:
+                _logger.debug("Could not look-up the leader: %s", str(e))
+
+        r = None
+        if is_relaxed_read is True and self.hedge_reads is True and \
+           stream is False:
+            r = await self.__send_hedged(version, path, parameters, data,
+                                         deadline)
+
+        failed_prefixes = set()
+        while r is None:
+            if deadline is not None:
+                deadline.check("send a request for [%s]" % (path,))
+
+            prefix = self.select_prefix(is_relaxed_read, needs_leader)
+            url = self.build_url(prefix, version, path, module=module)
+
+            try:
+                r = await self.__attempt(verb, prefix, url, parameters, data,
+                                         is_wait, is_relaxed_read,
+                                         self.get_timeout(is_wait, deadline),
+                                         stream=stream)
+            except ConnectionError:
+                if allow_reconnect is False:
+                    raise
+            else:
+                break
+
+            self.fail_connection(prefix, failed_prefixes)
+
+        return r
@@ -0,0 +1,455 @@
+"""Functionality classes for :class:`etcd.async_client.AsyncClient`. Most of
+the calls are inherited, as-is, from the blocking classes (they just return
+the coroutine from :meth:`etcd.async_client.AsyncClient.send`). Only the calls
+that have to look at the result or the error of a request are overridden.
+"""
+
+import logging
+
+from requests.exceptions import HTTPError, ChunkedEncodingError
+from requests.status_codes import codes
+
+import etcd.config
+
+from etcd.exceptions import EtcdPreconditionException, \
+                            EtcdEmptyResponseError, EtcdWaitFaultException, \
+                            EtcdAtomicWriteError, translate_exceptions, \
+                            translate_http_error, set_error_indexes
+from etcd.common_ops import CommonOps
+from etcd.node_ops import NodeOps, get_value_and_index
+from etcd.directory_ops import DirectoryOps, translate_create_error, \
+                                get_list_parameters
+from etcd.server_ops import ServerOps, parse_version
+from etcd.stat_ops import StatOps, parse_leader_stats, parse_self_stats
+from etcd.inorder_ops import InOrderOps
+from etcd.columns import ListingColumns
+from etcd.compat import parse_qsl
+from etcd.deadline import get_deadline
+from etcd.json_decode import decode_response
+from etcd.stream import LeafParser
+from etcd.modules.lock import _LockBase, LockMod
+from etcd.modules.leader import LeaderMod
+
+_logger = logging.getLogger(__name__)
+
+
+async def translate_awaitable(path, awaitable):
+    """Await the given request and translate its HTTP errors the same way
+    that :func:`etcd.exceptions.translate_exceptions` does.
+
+    :param path: Node key
+    :type path: string
+
+    :param awaitable: Pending request
+    :type awaitable: coroutine
+    """
+
+    try:
+        return await awaitable
+    except HTTPError as e:
+        r = translate_http_error(path, e)
+        if r is None:
+            raise
+
+    raise r
+
+
+class AsyncCommonOps(CommonOps):
+    """Base-class of the asyncio 'ops' classes. This must precede the
+    blocking 'ops' class among the bases so that the calls inherited from it
+    find these.
+    """
+
+    async def get_text(self, reason, path, version=2):
+        """Execute a request that will return flat text.
+
+        :param reason: Brief phrase describing the request
+        :param path: URL path
+        :param version: API version
+
+        :type reason: string
+        :type path: string
+        :type version: int
+
+        :returns: Response text
+        :rtype: string
+        """
+
+        if version is not None:
+            url = ('%s/v%d%s' % (self.client.prefix, version, path))
+        else:
+            url = ('%s%s' % (self.client.prefix, path))
+
+        _logger.debug("TEXT URL (%s) = [%s]", reason, url)
+
+        r = await self.client.request('get', url)
+        r.raise_for_status()
+
+        return r.text
+
+    async def compare_and_delete(self, *args, **kwargs):
+        try:
+            return await super(AsyncCommonOps, self).compare_and_delete(
+                            *args, **kwargs)
+        except HTTPError as e:
+            if e.response.status_code == codes.precondition_failed:
+                raise set_error_indexes(EtcdPreconditionException(), 
+                                        e.response)
+
+            raise
+
+    async def wait(self, *args, **kwargs):
+        try:
+            return await super(AsyncCommonOps, self).wait(*args, **kwargs)
+        except ChunkedEncodingError:
+            pass
+        except EtcdEmptyResponseError:
+            # https://github.com/coreos/etcd/issues/1120
+            pass
+
+        raise EtcdWaitFaultException()
+
+
+class AsyncNodeOps(NodeOps, AsyncCommonOps):
+    """Common key-value functions."""
+
+    async def get_bytes(self, path, force_consistent=False, 
+                        force_quorum=False, timeout=None):
+        response = await self.get(path, force_consistent=force_consistent, 
+                                  force_quorum=force_quorum, timeout=timeout)
+
+        (value, _) = get_value_and_index(response)
+        return self.client.value_codec.decode(value)
+
+    @translate_exceptions
+    async def atomic_update(self, path, update_value_cb,
+                            max_attempts=etcd.config.ATOMIC_MAX_ATTEMPTS,
+                            ttl=None, timeout=None):
+        """Retrieve the value for the given path, pass it to the callback, get
+        an update value back, and try updating. Loop until the update can be
+        performed atomically. An update that fails without showing whether it
+        was applied isn't tried again (see
+        :meth:`etcd.node_ops.NodeOps.atomic_update`).
+
+        :param path: Node key
+        :type path: string
+
+        :param update_value_cb: Callback
+        :type update_value_cb: callback
+
+        :param timeout: Number of seconds (or a deadline) that all of the
+                        attempts must finish within.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+        """
+
+        deadline = get_deadline(timeout)
+
+        i = max_attempts
+        while i > 0:
+            response = await self.get(path, timeout=deadline)
+            (current_value, modified_index) = get_value_and_index(response)
+            value = update_value_cb(current_value)
+
+            try:
+                return await self.update_if_index(
+                                path,
+                                value,
+                                modified_index,
+                                ttl=ttl,
+                                timeout=deadline)
+            except EtcdPreconditionException:
+                pass
+
+            i -= 1
+
+        raise EtcdAtomicWriteError("Atomic update failed (%d): %s" % (i, path))
+
+
+class AsyncDirectoryOps(DirectoryOps, AsyncCommonOps):
+    """Functions specific to directory management."""
+
+    async def create(self, path, ttl=None, timeout=None):
+        try:
+            return await super(AsyncDirectoryOps, self).create(
+                            path, ttl=ttl, timeout=timeout)
+        except HTTPError as e:
+            r = translate_create_error(path, e)
+            if r is not None:
+                raise r
+
+            raise
+
+    @translate_exceptions
+    async def list_columns(self, path, recursive=True, force_consistent=False, 
+                           force_quorum=False, timeout=None):
+        fq_path = self.get_fq_node_path(path)
+        parameters = get_list_parameters(recursive, force_consistent, 
+                                         force_quorum)
+
+        r = await self.client.send(2, 'get', fq_path, parameters=parameters, 
+                                   timeout=timeout, return_raw=True)
+
+        return ListingColumns.from_decoded(decode_response(r))
+
+    async def list_stream(self, path, recursive=True, force_consistent=False, 
+                          force_quorum=False, timeout=None, 
+                          chunk_size=etcd.config.STREAM_CHUNK_SIZE):
+        """Yield the leaves of the directory as they're received (see 
+        :meth:`etcd.directory_ops.DirectoryOps.list_stream`). This is an 
+        asynchronous generator, so the request is only sent once it's 
+        iterated.
+
+        :rtype: asynchronous generator of :class:`etcd.stream.StreamedLeaf`
+        """
+
+        fq_path = self.get_fq_node_path(path)
+        parameters = get_list_parameters(recursive, force_consistent, 
+                                         force_quorum)
+
+        try:
+            r = await self.client.send(2, 'get', fq_path, 
+                                       parameters=parameters, 
+                                       timeout=timeout, stream=True)
+        except HTTPError as e:
+            error = translate_http_error(path, e)
+            if error is None:
+                raise
+
+            raise error
+
+        from etcd.async_client import iter_content
+
+        parser = LeafParser()
+        chunks = iter_content(r, chunk_size)
+
+        try:
+            async for content in chunks:
+                for leaf in parser.feed(content):
+                    yield leaf
+        finally:
+            # Release the response even if the listing was abandoned.
+            await chunks.aclose()
+
+        for leaf in parser.close():
+            yield leaf
+
+
+class AsyncInOrderOps(InOrderOps, AsyncCommonOps):
+    """The functions having to do with in-order keys."""
+
+    pass
+
+
+class AsyncServerOps(ServerOps, AsyncCommonOps):
+    """Functions that query the server for cluster-level information."""
+
+    async def get_version(self):
+        version_string = await self.get_text('version', '/version',
+                                             version=None)
+
+        return parse_version(version_string)
+
+    async def get_machines(self):
+        """Return the list of servers in the cluster.
+
+        :returns: Parsed machine information
+        :rtype: list
+        """
+
+        fq_path = self.get_fq_node_path('/_etcd/machines')
+        response = await self.client.send(2, 'get', fq_path,
+                                          allow_reconnect=False)
+
+        return [parse_qsl(machine.value)
+                for machine
+                in response.node.children]
+
+
+class AsyncStatOps(StatOps, AsyncCommonOps):
+    """Functions that query the server for statistics information."""
+
+    async def get_leader_stats(self):
+        r = await self.client.send(2, 'get', '/stats/leader', return_raw=True)
+        return parse_leader_stats(decode_response(r))
+
+    async def get_self_stats(self):
+        r = await self.client.send(2, 'get', '/stats/self', return_raw=True)
+        return parse_self_stats(decode_response(r))
+
+
+class AsyncLeaderMod(LeaderMod, AsyncCommonOps):
+    """'Leader' functionality for consensus-based assignment."""
+
+    async def set_or_renew(self, key, value, ttl):
+        _logger.debug("LEADER: Setting key [%s] with value [%s].", key, value)
+
+        data = { 'name': value }
+        parameters = { 'ttl': ttl }
+
+        await self.client.send(2, 'put', '/' + key, data=data,
+                               parameters=parameters, module='leader',
+                               return_raw=True)
+
+    async def get(self, key):
+        _logger.debug("LEADER: Getting value for key [%s].", key)
+
+        r = await self.client.send(2, 'get', '/' + key, module='leader',
+                                   return_raw=True)
+
+        if r.text == '':
+            return None
+
+        result = r.text
+        if result.startswith('get leader error:') is True:
+            raise KeyError(key)
+
+        return result
+
+    async def delete(self, key, value):
+        _logger.debug("LEADER: Deleting key [%s] with value [%s].",
+                      key, value)
+
+        parameters = { 'name': value }
+
+        try:
+            await self.client.send(2, 'delete', '/' + key, module='leader',
+                                   parameters=parameters, return_raw=True)
+        except HTTPError as e:
+            if e.response.status_code == 500:
+                raise KeyError(key)
+
+            raise
+
+
+class _AsyncLockBase(_LockBase):
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.release()
+
+    async def _send(self, verb, phrase, **kwargs):
+        try:
+            return await self.client.send(2,
+                                          verb,
+                                          self.path,
+                                          module='lock',
+                                          return_raw=True,
+                                          **kwargs)
+        except HTTPError as e:
+            if e.response.status_code == codes.internal_server_error:
+                _logger.debug("There was a server-error while trying to %s. "
+                              "Make sure the key hasn't been used for any "
+                              "other data: %s", phrase, self.path)
+
+            raise
+
+
+class _AsyncLock(_AsyncLockBase):
+    """This lock will seek acquire an exclusive lock every time."""
+
+    def __init__(self, client, lock_name, ttl):
+        super(_AsyncLock, self).__init__(client, lock_name, ttl)
+
+        self.__index = None
+
+    async def acquire(self, timeout=None):
+        _logger.debug("Acquiring lock: %s", self.path)
+
+        parameters = { 'ttl': self.ttl }
+
+        r = await self._send('post', "ACQUIRE an index lock",
+                             parameters=parameters, timeout=timeout)
+
+        self.__index = int(r.text)
+
+    async def renew(self, ttl):
+        if self.__index is None:
+            raise ValueError("Could not renew unacquired lock: %s" %
+                             (self.path))
+
+        _logger.debug("Renewing lock: %s", self.path)
+
+        parameters = { 'ttl': ttl }
+        data = { 'index': self.__index }
+
+        await self._send('put', "RENEW an index lock",
+                         parameters=parameters, data=data)
+
+    async def get_active_index(self):
+        parameters = { 'field': 'index' }
+
+        r = await self._send('get', "get the active index of an index lock",
+                             parameters=parameters)
+
+        return int(r.text) if r.text != '' else None
+
+    async def release(self):
+        if self.__index is None:
+            raise ValueError("Could not release unacquired lock: %s" %
+                             (self.path))
+
+        _logger.debug("Releasing lock: %s", self.path)
+
+        parameters = { 'index': self.__index }
+
+        try:
+            await self._send('delete', "release an index lock",
+                             parameters=parameters)
+        finally:
+            self.__index = None
+
+
+class _AsyncReentrantLock(_AsyncLockBase):
+    """This lock will allow the lock to be reacquired without blocking by
+    anything with the same instance-value.
+    """
+
+    def __init__(self, client, lock_name, instance_value, ttl):
+        super(_AsyncReentrantLock, self).__init__(client, lock_name, ttl)
+
+        self.__instance_value = instance_value
+
+    async def acquire(self, timeout=None):
+        _logger.debug("Acquiring rlock [%s]: %s",
+                      self.__instance_value, self.path)
+
+        parameters = { 'ttl': self.ttl }
+
+        await self._send('post', "ACQUIRE a value lock",
+                         parameters=parameters, value=self.__instance_value,
+                         timeout=timeout)
+
+    async def renew(self, ttl):
+        _logger.debug("Renewing rlock [%s]: %s",
+                      self.__instance_value, self.path)
+
+        parameters = { 'ttl': ttl }
+
+        await self._send('put', "RENEW a value lock",
+                         parameters=parameters, value=self.__instance_value)
+
+    async def get_active_value(self):
+        r = await self._send('get', "get the active value of a value lock")
+        return r.text if r.text != '' else None
+
+    async def release(self):
+        _logger.debug("Releasing rlock [%s]: %s",
+                      self.__instance_value, self.path)
+
+        parameters = { 'value': self.__instance_value }
+
+        await self._send('delete', "release a value lock",
+                         parameters=parameters)
+
+        self.__instance_value = None
+
+
+class AsyncLockMod(LockMod):
+    def get_lock(self, lock_name, ttl):
+        return _AsyncLock(self.client, lock_name, ttl)
+
+    def get_rlock(self, lock_name, instance_value, ttl):
+        return _AsyncReentrantLock(self.client, lock_name, instance_value,
+                                   ttl)
@@ -0,0 +1,186 @@
+"""Continuous watches for :class:`etcd.async_client.AsyncClient`. The watch
+is a task of its own, which long-polls into a bounded buffer while the
+changes that it has received are being iterated.
+"""
+
+import asyncio
+import logging
+
+import etcd.config
+
+from etcd.watch import _WatcherBase, POLL_ERROR_BACK_OFF, POLL_ERROR_RESYNC
+
+_logger = logging.getLogger(__name__)
+
+# Marks the end of the buffer.
+_CLOSED = object()
+
+
+class AsyncWatcher(_WatcherBase):
+    """Reports every change to a node (or, recursively, to a directory), in
+    order, as an asynchronous iterator of :class:`etcd.watch.WatchEvent`. It
+    behaves like :class:`etcd.watch.Watcher` (it resumes from the index after
+    the last change, rides out timeouts, backs off, and resyncs), but it
+    never blocks the event-loop.
+
+    While iterating, the long-polls are sent by a separate task, which keeps
+    up to *buffer_size* changes that haven't been iterated yet, and waits for
+    room when the buffer is full. Cancelling the task that iterates (or
+    breaking out of the loop, or calling *close()*) cancels the long-poll.
+
+    :param client: Client instance
+    :type client: :class:`etcd.async_client.AsyncClient`
+
+    :param path: Node key
+    :type path: string
+
+    :param recursive: Report changes to any descendant of the node.
+    :type recursive: bool
+
+    :param index: Index to report changes from.
+    :type index: int or None
+
+    :param poll_timeout: Number of seconds that a single long-poll may wait
+                         for.
+    :type poll_timeout: float or None
+
+    :param resync: Resync when the changes have been cleared, rather than
+                   raising :class:`etcd.exceptions.EtcdIndexClearedError`.
+    :type resync: bool
+
+    :param listing: Listing of the node to start from, in place of *index*.
+    :type listing: :class:`etcd.response.ResponseV2` or None
+
+    :param buffer_size: Number of changes to receive ahead of the iteration
+    :type buffer_size: int
+    """
+
+    def __init__(self, client, path, recursive=False, index=None,
+                 poll_timeout=None, resync=True, listing=None,
+                 buffer_size=etcd.config.WATCH_BUFFER_SIZE):
+        super(AsyncWatcher, self).__init__(client, path, recursive=recursive,
+                                           index=index,
+                                           poll_timeout=poll_timeout,
+                                           resync=resync, listing=listing)
+
+        if buffer_size < 1:
+            raise ValueError("Buffer size must be at least one.")
+
+        self.__buffer_size = buffer_size
+        self.__buffer = None
+        self.__producer = None
+
+        # The index that follows the last change that was iterated.
+        self.__iterated_index = super(AsyncWatcher, self).index
+
+    def __aiter__(self):
+        return self.__iterate()
+
+    async def __iterate(self):
+        if self.__producer is not None:
+            raise ValueError("Watch is already being iterated.")
+
+        buffer_ = asyncio.Queue(maxsize=self.__buffer_size)
+        producer = asyncio.ensure_future(self.__produce(buffer_))
+
+        self.__buffer = buffer_
+        self.__producer = producer
+
+        try:
+            while self.is_closed is False:
+                item = await buffer_.get()
+                if item is _CLOSED or self.is_closed is True:
+                    break
+
+                (event, index, error) = item
+                if error is not None:
+                    raise error
+
+                self.__iterated_index = index
+                yield event
+        finally:
+            producer.cancel()
+
+    async def __produce(self, buffer_):
+        while self.is_closed is False:
+            try:
+                event = await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Whatever the watch can't go on from is raised where it's
+                # being iterated.
+                await buffer_.put((None, None, e))
+                return
+
+            if event is not None:
+                index = super(AsyncWatcher, self).index
+                await buffer_.put((event, index, None))
+
+    async def poll(self):
+        """Send one long-poll.
+
+        :returns: The next change, or None if there wasn't one before the
+                  long-poll ended.
+        :rtype: :class:`etcd.watch.WatchEvent` or None
+        """
+
+        event = self.pop_pending()
+        if event is not None:
+            return event
+
+        (fq_path, parameters, timeout) = self.get_poll_arguments()
+
+        try:
+            response = await self.client.send(2, 'get', fq_path,
+                                              parameters=parameters,
+                                              timeout=timeout)
+        except Exception as e:
+            action = self.get_poll_error_action(e)
+        else:
+            return self.accept(response)
+
+        if action == POLL_ERROR_BACK_OFF:
+            await asyncio.sleep(self.get_backoff_s())
+        elif action == POLL_ERROR_RESYNC:
+            try:
+                r = await self.client.directory.list(
+                                self.path, recursive=self.recursive)
+            except KeyError as e:
+                r = e
+            except Exception as e:
+                # The next long-poll finds the history cleared again, and
+                # resyncs then.
+                if self.get_poll_error_action(e) == POLL_ERROR_BACK_OFF:
+                    await asyncio.sleep(self.get_backoff_s())
+
+                return None
+
+            return self.accept_listing(r)
+
+        return None
+
+    def close(self):
+        """Stop iterating, and cancel the long-poll that's open."""
+
+        super(AsyncWatcher, self).close()
+
+        if self.__producer is not None:
+            self.__producer.cancel()
+
+            try:
+                self.__buffer.put_nowait(_CLOSED)
+            except asyncio.QueueFull:
+                # The iteration isn't waiting, and will see that it's closed.
+                pass
+
+    @property
+    def index(self):
+        """Return the index that follows the last change that was iterated
+        (changes still in the buffer don't count). Another watch can resume
+        from there without missing anything.
+
+        :rtype: int or None
+        """
+
+        return self.__iterated_index
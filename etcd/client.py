@@ -1,14 +1,28 @@
 import requests
 import ssl
+import time
 import logging
+import threading
+import concurrent.futures
 
 from os import environ
-from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectionError, HTTPError, ReadTimeout, \
+                               ConnectTimeout, ChunkedEncodingError
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.poolmanager import PoolManager
-from datetime import datetime
 
-from etcd.config import HOST_FAIL_WAIT_S
+from etcd.config import POOL_MAXSIZE, MACHINE_CACHE_MAX_AGE_S, \
+                        READ_SELECTION, HEDGE_READS, HEDGE_PERCENTILE, \
+                        ROUTE_TO_LEADER, LEADER_LOOKUP_INTERVAL_S, \
+                        CONNECT_TIMEOUT_S, READ_TIMEOUT_S, WAIT_TIMEOUT_S, \
+                        COALESCE_READS, KEEP_RAW_NODES, VALUE_CODEC
+from etcd.exceptions import EtcdTimeoutError, EtcdAllMachinesFailedError
+from etcd.deadline import get_deadline
+from etcd.codec import get_codec
+from etcd.retry import RetryPolicy
+from etcd.coalesce import SingleFlight, get_coalescing_key
+from etcd.watch import Watcher
+from etcd.cluster import Cluster, read_machine_cache, write_machine_cache
 from etcd.directory_ops import DirectoryOps
 from etcd.node_ops import NodeOps
 from etcd.server_ops import ServerOps
@@ -16,7 +30,9 @@ from etcd.stat_ops import StatOps
 from etcd.inorder_ops import InOrderOps
 from etcd.modules.lock import LockMod
 from etcd.modules.leader import LeaderMod
-from etcd.response import ResponseV2
+from etcd.response import ResponseV2, get_response_indexes, \
+                          build_decoded_response
+from etcd.compat import urlparse
 
 logging.getLogger('requests.packages.urllib3').setLevel(logging.WARN)
 
@@ -36,14 +52,23 @@ _SSL_CLIENT_KEY_FILEPATH = environ.get(
                             '') or None
 
 
+def _close_discarded(future):
+    """Close the response of a hedged read that lost, once it arrives."""
+
+    if future.cancelled() is False and future.exception() is None:
+        future.result().close()
+
+
 class _SslHttpAdapter(HTTPAdapter):
     """"Transport adapter" for requests module that creates TLS connections."""
 
-    def init_poolmanager(self, connections, maxsize, block=False):
+    def init_poolmanager(self, connections, maxsize, block=False, 
+                         **pool_kwargs):
         self.poolmanager = PoolManager(num_pools=connections,
                                        maxsize=maxsize,
                                        block=block,
-                                       ssl_version=self.best_ssl_version())
+                                       ssl_version=self.best_ssl_version(),
+                                       **pool_kwargs)
 
     def best_ssl_version(self):
         # Use recommended settings from ssl module docs with fallbacks to
@@ -63,6 +88,9 @@ class _Modules(object):
     :type client: :class:`etcd.client.Client`
     """
 
+    lock_mod_cls = LockMod
+    leader_mod_cls = LeaderMod
+
     def __init__(self, client):
         self.__client = client
 
@@ -70,13 +98,13 @@ class _Modules(object):
     def lock(self):
         """Return an instance of the class having the lock functionality.
 
-        :rtype: :class:`etcd.response.ResponseV2`
+        :rtype: :class:`etcd.modules.lock.LockMod`
         """
 
         try:
             return self.__lock
         except AttributeError:
-            self.__lock = LockMod(self.__client)
+            self.__lock = self.lock_mod_cls(self.__client)
             return self.__lock
 
     @property
@@ -90,13 +118,14 @@ class _Modules(object):
         try:
             return self.__leader
         except AttributeError:
-            self.__leader = LeaderMod(self.__client)
+            self.__leader = self.leader_mod_cls(self.__client)
             return self.__leader
 
 
-class Client(object):
-    """The main channel of functionality for the client. Connects to the 
-    server, and provides functions via properties.
+class _ClientBase(object):
+    """Functionality shared by the blocking and the asyncio clients: the SSL 
+    configuration, the cluster bookkeeping, the construction of URLs, and the 
+    properties that provide the functionality.
 
     :param host: Hostname or IP of server
     :type host: string
@@ -119,14 +148,108 @@ class Client(object):
     :param ssl_client_key_filepath: A client key, for authentication.
     :type ssl_client_key_filepath: string or None
 
-    :raises: ValueError
+    :param machines: URL prefixes of the machines in the cluster. If given, 
+                     they won't be retrieved from the cluster.
+    :type machines: list of string or None
+
+    :param machine_cache_filepath: File to cache the list of machines in, 
+                                   between processes.
+    :type machine_cache_filepath: string or None
+
+    :param machine_cache_max_age_s: Number of seconds that the cached list is 
+                                    used before being retrieved again.
+    :type machine_cache_max_age_s: int
+
+    :param read_selection: How plain reads are distributed among the machines: 
+                           'p2c' (the better of two random machines), 
+                           'least_latency', or 'sticky' (the current machine).
+    :type read_selection: string
+
+    :param hedge_reads: If a relaxed read (a node get or directory listing 
+                        without force_consistent/force_quorum) hasn't been 
+                        answered within the hedging delay, send it to a second 
+                        machine as well and take whichever response comes 
+                        first.
+    :type hedge_reads: bool
+
+    :param hedge_percentile: The hedging delay is this percentile of the 
+                             recent relaxed-read latencies.
+    :type hedge_percentile: float
+
+    :param route_to_leader: Send writes (including CAS/CAD) and consistent or 
+                            quorum reads directly to the leader, rather than 
+                            having the current machine forward them. The 
+                            leader is looked-up once, and again after a 
+                            redirect, a failure of the leader, or a change of 
+                            the raft term shows that it might have moved.
+    :type route_to_leader: bool
+
+    :param connect_timeout_s: Number of seconds to wait for a connection to a 
+                              machine before failing-over to the next one.
+    :type connect_timeout_s: float
+
+    :param read_timeout_s: Number of seconds to wait for a response.
+    :type read_timeout_s: float
+
+    :param wait_timeout_s: Number of seconds to wait for the response to a 
+                           long-poll (a wait, or a lock acquisition), or None 
+                           to wait indefinitely.
+    :type wait_timeout_s: float or None
+
+    :param retry_policy: Decides which requests are retried after a 
+                         server-error, a timeout, or a truncated response, and 
+                         limits the retries of the client as a whole. Pass a 
+                         policy with *max_retries=0* to disable retries.
+    :type retry_policy: :class:`etcd.retry.RetryPolicy` or None
+
+    :param coalesce_reads: Have identical plain reads (see *hedge_reads*) that 
+                           are in flight at the same time share one request. 
+                           Every caller gets a response object of its own, 
+                           and a read that's sent after a write of the 
+                           client's doesn't share the request of one that 
+                           was sent before it.
+    :type coalesce_reads: bool
+
+    :param keep_raw_nodes: Have responses keep the decoded JSON of every node 
+                           (as *raw_node*). Not keeping it makes large 
+                           listings much smaller in memory.
+    :type keep_raw_nodes: bool
+
+    :param value_codec: Transport encoding of the values that are set and 
+                        retrieved as bytes (see 
+                        :meth:`etcd.node_ops.NodeOps.set_bytes`). By default, 
+                        the codec named by *PEC_VALUE_CODEC* (base64).
+    :type value_codec: :class:`etcd.codec.ValueCodec` or None
+
+    Most calls also take a *timeout*: a number of seconds (or a 
+    :class:`etcd.deadline.Deadline`) that the call must finish within, 
+    including any fail-over between machines. Calls that are composed of 
+    several requests (like :meth:`etcd.node_ops.NodeOps.atomic_update`) apply 
+    it to all of them together.
     """
 
+    directory_ops_cls = DirectoryOps
+    node_ops_cls = NodeOps
+    server_ops_cls = ServerOps
+    stat_ops_cls = StatOps
+    inorder_ops_cls = InOrderOps
+    modules_cls = None
+
     def __init__(self, host='127.0.0.1', port=4001, 
                  is_ssl=False, ssl_do_verify=_SSL_DO_VERIFY, 
                  ssl_ca_bundle_filepath=_SSL_CA_BUNDLE_FILEPATH, 
                  ssl_client_cert_filepath=_SSL_CLIENT_CRT_FILEPATH, 
-                 ssl_client_key_filepath=_SSL_CLIENT_KEY_FILEPATH):
+                 ssl_client_key_filepath=_SSL_CLIENT_KEY_FILEPATH, 
+                 machines=None, machine_cache_filepath=None, 
+                 machine_cache_max_age_s=MACHINE_CACHE_MAX_AGE_S, 
+                 read_selection=READ_SELECTION, hedge_reads=HEDGE_READS, 
+                 hedge_percentile=HEDGE_PERCENTILE, 
+                 route_to_leader=ROUTE_TO_LEADER, 
+                 connect_timeout_s=CONNECT_TIMEOUT_S, 
+                 read_timeout_s=READ_TIMEOUT_S, 
+                 wait_timeout_s=WAIT_TIMEOUT_S or None, retry_policy=None, 
+                 coalesce_reads=COALESCE_READS, 
+                 keep_raw_nodes=KEEP_RAW_NODES, value_codec=None):
 
         if ssl_do_verify is not None:
             _logger.debug("SSL: Explicit verify setting given: [%s]", ssl_do_verify)
@@ -163,171 +286,549 @@ class Client(object):
             self.__ssl_cert = ssl_client_cert_filepath
 
         scheme = 'http' if is_ssl is False else 'https'
-        self.__prefix = ('%s://%s:%s' % (scheme, host, port))
-        _logger.debug("PREFIX= [%s]", self.__prefix)
+        prefix = ('%s://%s:%s' % (scheme, host, port))
+        _logger.debug("PREFIX= [%s]", prefix)
+
+        self.__cluster = Cluster(prefix, read_selection=read_selection)
+        self.__hedge_reads = hedge_reads
+        self.__hedge_percentile = hedge_percentile
+        self.__route_to_leader = route_to_leader
+        self.__leader_lookup_s = None
+        self.__leader_lookup_lock = threading.Lock()
+        self.__machine_cache_filepath = machine_cache_filepath
+        self.__connect_timeout_s = connect_timeout_s
+        self.__read_timeout_s = read_timeout_s
+        self.__wait_timeout_s = wait_timeout_s
+
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+
+        self.__retry_policy = retry_policy
+        self.__coalesce_reads = coalesce_reads
+        self.__keep_raw_nodes = keep_raw_nodes
+
+        if value_codec is None:
+            value_codec = get_codec(VALUE_CODEC)
+
+        self.__value_codec = value_codec
+        self.__highest_index = None
+        self.__highest_index_lock = threading.Lock()
+
+        # Counts the writes that have been made, so that a read that's sent 
+        # after one isn't coalesced with one that was sent before it.
+        self.__write_generation = 0
+        self.__write_generation_lock = threading.Lock()
+
+        # The list of machines is only retrieved from the cluster when the 
+        # first request is sent, and not at all if we were given it or have 
+        # a recent-enough copy.
+
+        if machines is not None:
+            self.__cluster.set_machines(machines)
+        elif machine_cache_filepath is not None:
+            cached = read_machine_cache(machine_cache_filepath, 
+                                        machine_cache_max_age_s)
+
+            if cached is not None:
+                self.__cluster.set_machines(cached)
 
-        self.__session = requests.Session()
+    def __str__(self):
+        return ('<ETCD %s>' % (self.prefix))
 
-        # Define an adapter for when SSL is requested.
-        self.__session.mount('https://', _SslHttpAdapter())
-
-# TODO: Remove the version check after debugging.
-# TODO: Can we implicitly read the version from the response/headers?
-#        self.__version = self.server.get_version()
-#        self.debug("Version: %s" % (self.__version))
-#
-#        if self.__version.startswith('0.2') is False:
-#            raise ValueError("We don't support an etcd version older than 0.2.0 .")
-
-        self.__machines = [[dict(machine_info)['etcd'], None]
-                            for machine_info
-                            in self.server.get_machines()]
-
-        _logger.debug("Cluster machines: %s", self.__machines)
-
-        # This will fail if the given server does appear in the published list 
-        # of servers. This might only happen because of a hostname being used 
-        # instead of an IP, or vice-versa.
-        self.__machine_index = None
-        i = 0
-        for (prefix, last_fail_dt) in self.__machines:
-            if prefix == self.__prefix:
-                self.__machine_index = i
-                break
+    def set_discovered_machines(self, machines):
+        """Apply the list of machines retrieved from the cluster, and cache it 
+        if we were asked to.
 
-            i += 1
+        :param machines: Machine information from 
+                         :meth:`etcd.server_ops.ServerOps.get_machines`
+        :type machines: iterable
+        """
 
-        if self.__machine_index is None:
-            raise ValueError("Could not identify given prefix [%s] among "
-                             "published prefixes: %s" % 
-                             (self.__prefix, self.__machines))
+        machines = [dict(machine_info) for machine_info in machines]
+        prefixes = [machine['etcd'] for machine in machines]
+        peer_prefixes = dict([(machine['raft'], machine['etcd']) 
+                              for machine 
+                              in machines 
+                              if 'raft' in machine])
 
-        _logger.debug("The initial machine is at index (%d).",
-                      self.__machine_index)
+        self.__cluster.set_machines(prefixes, peer_prefixes=peer_prefixes)
 
-    def __str__(self):
-        return ('<ETCD %s>' % (self.__prefix))
+        if self.__machine_cache_filepath is not None:
+            write_machine_cache(self.__machine_cache_filepath, prefixes)
 
-    def send(self, version, verb, path, value=None, parameters=None, data=None, 
-             module=None, return_raw=False, allow_reconnect=True):
-        """Build and execute a request.
+    def use_stale_machines(self):
+        """When the list of machines can't be retrieved from the cluster, fall 
+        back to the cached list regardless of its age.
+
+        :returns: Whether a cached list was available
+        :rtype: bool
+        """
+
+        if self.__machine_cache_filepath is None:
+            return False
+
+        cached = read_machine_cache(self.__machine_cache_filepath)
+        if cached is None:
+            return False
+
+        _logger.debug("Using stale list of machines: %s", cached)
+        self.__cluster.set_machines(cached)
+
+        return True
+
+    def debug(self, message):
+        """Log a debug message on behalf of the functionality classes.
+
+        :param message: Message
+        :type message: string
+        """
+
+        _logger.debug(message)
+
+    def build_url(self, prefix, version, path, module=None):
+        """Build the URL for a request against the given machine.
+
+        :param prefix: URL prefix of the machine
+        :type prefix: string
 
         :param version: Version of API
         :type version: int
 
-        :param verb: Verb of request ('get', 'post', etc..)
-        :type verb: string
-
         :param path: URL path
         :type path: string
 
-        :param value: Value to be converted to string and passed as "value" in 
-                      the POST data.
-        :type value: scalar or None
+        :param module: Name of the etcd module that hosts the functionality.
+        :type module: string or None
 
-        :param parameters: Dictionary of values to be passed via URL query.
-        :type parameters: dictionary or None
+        :returns: URL
+        :rtype: string
+        """
 
-        :param data: Dictionary of values to be passed via POST data.
-        :type data: dictionary or None
+        if version != 2:
+            raise ValueError("We were told to send a version (%d) request, "
+                             "which is not supported." % (version))
 
-        :param module: Name of the etcd module that hosts the functionality.
-        :type module: string or None
+        if module is None:
+            return ('%s/v%d%s' % (prefix, version, path))
+        else:
+            return ('%s/mod/v%d/%s%s' % (prefix, version, module, path))
 
-        :param return_raw: Whether to return a 
-                           :class:`etcd.response.ResponseV2` object or the raw 
-                           Requests response.
-        :type return_raw: bool
+    def is_relaxed_read(self, verb, path, parameters, module):
+        """Can the request be served by any machine? This is true of plain 
+        reads of keys (not consistent, quorum, or long-poll reads).
 
-        :param allow_reconnect: Allow the client to consider alternate hosts if
-                                the current host fails connection.
-        :type allow_reconnect: bool
+        :rtype: bool
+        """
 
-        :returns: Response object
-        :rtype: :class:`etcd.response.ResponseV2`
+        return verb == 'get' and \
+               module is None and \
+               path.startswith('/keys/') is True and \
+               'consistent' not in parameters and \
+               'quorum' not in parameters and \
+               'wait' not in parameters
+
+    def is_long_poll(self, verb, parameters, module):
+        """Will the response to the request be held back until something 
+        happens? This is true of waits and of lock acquisitions.
+
+        :rtype: bool
         """
 
-        if parameters is None:
-            parameters = {}
+        return parameters.get('wait') == 'true' or \
+               (module == 'lock' and verb == 'post')
 
-        if data is None:
-            data = {}
+    def get_timeout(self, is_long_poll, deadline=None):
+        """Return the connect and read timeouts for a single request, 
+        shortened so that the request doesn't outlast the given deadline.
 
-        if version != 2:
-            raise ValueError("We were told to send a version (%d) request, "
-                             "which is not supported." % (version))
+        :param is_long_poll: Whether the request is a long-poll
+        :type is_long_poll: bool
+
+        :param deadline: Deadline of the operation that the request is part of
+        :type deadline: :class:`etcd.deadline.Deadline` or None
+
+        :returns: Connect and read timeouts, in seconds
+        :rtype: tuple
+        """
+
+        connect_timeout_s = self.__connect_timeout_s
+        if is_long_poll is True:
+            read_timeout_s = self.__wait_timeout_s
         else:
-            response_cls = ResponseV2
+            read_timeout_s = self.__read_timeout_s
 
-        if module is None:
-            url = ('%s/v%d%s' % (self.__prefix, version, path))
+        if deadline is not None:
+            # A timeout of zero isn't allowed (and the deadline has already 
+            # been checked).
+            connect_timeout_s = max(deadline.clip(connect_timeout_s), 0.001)
+            read_timeout_s = max(deadline.clip(read_timeout_s), 0.001)
+
+        return (connect_timeout_s, read_timeout_s)
+
+    def is_clipped_timeout(self, is_long_poll, timeout, is_connect=False):
+        """Was the timeout that ran out shorter than the configured one (it 
+        was shortened to fit a deadline)? Running out of it says nothing 
+        about the machine.
+
+        :param is_long_poll: Whether the request is a long-poll
+        :type is_long_poll: bool
+
+        :param timeout: Connect and read timeouts that the request was sent 
+                        with (see :meth:`get_timeout`)
+        :type timeout: tuple
+
+        :param is_connect: Whether it was the connect timeout that ran out
+        :type is_connect: bool
+
+        :rtype: bool
+        """
+
+        (connect_timeout_s, read_timeout_s) = timeout
+
+        if is_connect is True:
+            return connect_timeout_s < self.__connect_timeout_s
+        elif is_long_poll is True:
+            configured_s = self.__wait_timeout_s
         else:
-            url = ('%s/mod/v%d/%s%s' % (self.__prefix, version, module, path))
+            configured_s = self.__read_timeout_s
 
-        if value is not None:
-            data['value'] = value
+        return configured_s is None or read_timeout_s < configured_s
 
-        args = { 'params': parameters, 
-                 'data': data, 
-                 'verify': self.__ssl_verify, 
-                 'cert': self.__ssl_cert }
+    def fail_timeout(self, prefix, url, is_long_poll, timeout, 
+                     is_connect=False):
+        """Account for a request that wasn't answered in time. A machine that 
+        doesn't answer a regular request within the configured read-timeout 
+        is treated like one that couldn't be connected-to, but a long-poll is 
+        expected to go unanswered, and a deadline of the caller's may simply 
+        have been too short.
 
-        _logger.debug("Request(%s)=[%s] params=[%s] data_keys=[%s]",
-                      verb, url, parameters, args['data'].keys())
+        :param timeout: Connect and read timeouts that the request was sent 
+                        with
+        :type timeout: tuple
 
-        send = getattr(self.__session, verb)
-    
-        while 1:
-            try:
-                r = send(url, **args)
-            except ConnectionError as e:
-                _logger.debug("Connection error with [%s] [%s]: %s",
-                              self.__prefix, e.__class__.__name__, str(e))
+        :param is_connect: Whether it was the connect timeout that ran out
+        :type is_connect: bool
 
-                if allow_reconnect is False:
-                    raise
-            else:
-                break
+        :returns: The error to raise
+        :rtype: :class:`etcd.exceptions.EtcdTimeoutError`
+        """
 
-            # If we get here, there was a connection problem. Rotate the server 
-            # that we're using, excluding any that have recently failed.
+        _logger.debug("Request to [%s] timed-out.", url)
 
-            now_dt = datetime.now()
-            self.__machines[self.__machine_index][1] = now_dt
+        if is_long_poll is False and \
+           self.is_clipped_timeout(is_long_poll, timeout, is_connect) is False:
+            self.__cluster.record(prefix, is_success=False, 
+                                  is_connected=False)
 
-            len_ = len(self.__machines)
-            i = 0
-            elected = None
-            while i < len_:
-                machine_index = (self.__machine_index + 1) % len_
-                (prefix, last_fail_dt) = self.__machines[machine_index]
+            self.__cluster.fail(prefix)
 
-                if last_fail_dt is None or \
-                   (now_dt - last_fail_dt).total_seconds() > \
-                        HOST_FAIL_WAIT_S:
-                    elected = prefix
+        return EtcdTimeoutError("Request timed-out: %s" % (url,))
 
-                i += 1
+    def fail_connection(self, prefix, failed_prefixes):
+        """Account for a machine that couldn't be connected-to while sending 
+        a request, and fail the request once every machine has been tried.
 
-            if elected is None:
-                raise SystemError("All servers have failed: %s" % 
-                                  (self.__machines,))
+        :param prefix: URL prefix of the machine
+        :type prefix: string
 
-            self.__prefix = elected
-            self.__machine_index = machine_index
+        :param failed_prefixes: The machines that have already failed for 
+                                this request. The machine is added.
+        :type failed_prefixes: set
 
-            _logger.debug("Retrying with next machine: %s", self.__prefix)
+        :raises: :class:`etcd.exceptions.EtcdAllMachinesFailedError`
+        """
 
-        r.raise_for_status()
+        self.__cluster.fail(prefix)
+        failed_prefixes.add(prefix)
+
+        if failed_prefixes.issuperset(self.__cluster.machines) is True:
+            raise EtcdAllMachinesFailedError(
+                    "All servers have failed: %s" % 
+                    (sorted(failed_prefixes),))
+
+    def get_retry_delay(self, verb, parameters, data, is_long_poll, 
+                        retry_count, deadline=None):
+        """Return how long to wait before retrying a failed request, or None 
+        if it shouldn't be retried.
+
+        :param retry_count: Number of the retry (starting at one)
+        :type retry_count: int
+
+        :param deadline: Deadline of the request
+        :type deadline: :class:`etcd.deadline.Deadline` or None
+
+        :rtype: float or None
+        """
+
+        if self.__retry_policy.is_retryable(verb, parameters, data, 
+                                            is_long_poll) is False:
+            return None
+
+        return self.__retry_policy.get_delay(retry_count, deadline)
+
+    def needs_leader(self, verb, path, parameters, module):
+        """Does the request have to be served by the leader? This is true of 
+        writes and of consistent or quorum reads, but not of long-polls.
+
+        :rtype: bool
+        """
+
+        if 'wait' in parameters:
+            return False
+
+        return verb != 'get' or \
+               'consistent' in parameters or \
+               'quorum' in parameters
+
+    def select_prefix(self, is_relaxed_read, needs_leader=False):
+        """Choose the machine to send a request to. Relaxed reads go to 
+        whichever machine the cluster judges to be the fastest, and requests 
+        that need the leader go to the leader, if we know it. Everything else 
+        goes to the current machine.
+
+        :param is_relaxed_read: Whether any machine can serve the request
+        :type is_relaxed_read: bool
+
+        :param needs_leader: Whether the leader has to serve the request
+        :type needs_leader: bool
+
+        :returns: URL prefix
+        :rtype: string
+        """
+
+        if is_relaxed_read is True:
+            return self.__cluster.select_for_read()
+
+        if needs_leader is True and self.__route_to_leader is True:
+            leader_prefix = self.__cluster.select_leader()
+            if leader_prefix is not None:
+                return leader_prefix
+
+        return self.__cluster.select_current()
+
+    def should_look_up_leader(self, needs_leader):
+        """Should the leader be looked-up before sending a request? This is 
+        only done when it isn't known, and not more than once per 
+        LEADER_LOOKUP_INTERVAL_S (so that a failing lookup isn't repeated for 
+        every request).
+
+        :param needs_leader: Whether the leader has to serve the request
+        :type needs_leader: bool
+
+        :rtype: bool
+        """
+
+        if needs_leader is False or \
+           self.__route_to_leader is False or \
+           self.__cluster.leader_prefix is not None:
+            return False
+
+        now_s = time.time()
+
+        with self.__leader_lookup_lock:
+            if self.__leader_lookup_s is not None and \
+               now_s - self.__leader_lookup_s < LEADER_LOOKUP_INTERVAL_S:
+                return False
+
+            self.__leader_lookup_s = now_s
+
+        return True
+
+    def set_looked_up_leader(self, peer_prefix):
+        """Apply the leader reported by 
+        :meth:`etcd.server_ops.ServerOps.get_leader_url_prefix`.
+
+        :param peer_prefix: Peer (raft) URL prefix of the leader
+        :type peer_prefix: string
+        """
+
+        self.__cluster.set_leader_by_peer(peer_prefix.strip())
+
+    def record_response(self, prefix, r, start_s, is_wait, 
+                        is_relaxed_read=False):
+        """Account for a response in the statistics of the machine that 
+        served it. The duration of a long-poll says nothing about the machine, 
+        so it's not counted towards its latency.
+
+        :param prefix: URL prefix of the machine
+        :type prefix: string
+
+        :param r: Raw response
+        :type r: requests.models.Response
+
+        :param start_s: Epoch time at which the request was sent
+        :type start_s: float
+
+        :param is_wait: Whether the request was a long-poll
+        :type is_wait: bool
+
+        :param is_relaxed_read: Whether any machine could serve the request
+        :type is_relaxed_read: bool
+        """
+
+        elapsed_s = None if is_wait is True else (time.time() - start_s)
+        self.__cluster.record(prefix, elapsed_s, 
+                              is_success=r.status_code < 500,
+                              is_relaxed_read=is_relaxed_read)
+
+        indexes = get_response_indexes(r)
+
+        if indexes.etcd_index is not None:
+            self.observe_index(indexes.etcd_index)
+
+        if indexes.raft_term is not None:
+            self.__cluster.observe_term(indexes.raft_term)
+
+        # A follower redirects requests that it can't serve to the leader.
+        if r.history:
+            parts = urlparse(r.url)
+            self.__cluster.set_leader('%s://%s' % (parts.scheme, parts.netloc))
+
+    def observe_index(self, etcd_index):
+        """Note an etcd-index that the cluster has reached. Every response 
+        (including an error) is noted automatically.
+
+        :param etcd_index: etcd-index
+        :type etcd_index: int
+        """
+
+        with self.__highest_index_lock:
+            if self.__highest_index is None or \
+               etcd_index > self.__highest_index:
+                self.__highest_index = etcd_index
+
+    def observe_write(self):
+        """Account for a write that has been made (or attempted). The reads 
+        that are sent from now on aren't coalesced with the ones in flight, 
+        so that they see the write.
+        """
+
+        with self.__write_generation_lock:
+            self.__write_generation += 1
+
+    def build_response(self, r, verb, path, retry_count, return_raw, 
+                       return_decoded):
+        """Return what a request is supposed to return for its (successful) 
+        raw response. The callers of a coalesced read share the raw response, 
+        but every one of them gets a response object of its own.
+
+        :param r: Raw response
+        :type r: requests.models.Response
+
+        :param retry_count: Number of times that the request was retried
+        :type retry_count: int
+
+        :rtype: :class:`etcd.response.ResponseV2`, 
+                :class:`etcd.response.DecodedResponse`, or 
+                requests.models.Response
+        """
 
         if return_raw is True:
             return r
+        elif return_decoded is True:
+            return build_decoded_response(r, retry_count=retry_count)
 
-        return response_cls(r, verb, path)
+        return ResponseV2(r, verb, path, retry_count=retry_count, 
+                          keep_raw=self.keep_raw_nodes)
 
     @property
-    def session(self):
-        return self.__session
+    def write_generation(self):
+        """Return the number of writes that have been made.
+
+        :rtype: int
+        """
+
+        return self.__write_generation
+
+    @property
+    def highest_index(self):
+        """Return the highest etcd-index that any response has reported. 
+        The cluster has made at least that many changes, so this is where a 
+        read that has to reflect our own writes, or a watch that mustn't miss 
+        anything after them, can start.
+
+        :rtype: int or None
+        """
+
+        return self.__highest_index
+
+    @property
+    def retry_policy(self):
+        return self.__retry_policy
+
+    @property
+    def keep_raw_nodes(self):
+        """Do responses keep the decoded JSON of every node?
+
+        :rtype: bool
+        """
+
+        return self.__keep_raw_nodes
+
+    @property
+    def value_codec(self):
+        """Return the transport encoding of values that are set and 
+        retrieved as bytes.
+
+        :rtype: :class:`etcd.codec.ValueCodec`
+        """
+
+        return self.__value_codec
+
+    @property
+    def coalesce_reads(self):
+        """Do identical plain reads that are in flight at the same time share 
+        one request?
+
+        :rtype: bool
+        """
+
+        return self.__coalesce_reads
+
+    @property
+    def hedge_reads(self):
+        """Are slow relaxed reads also sent to a second machine?
+
+        :rtype: bool
+        """
+
+        return self.__hedge_reads
+
+    def get_hedge_delay(self):
+        """Return how long a relaxed read may take before it's hedged.
+
+        :rtype: float
+        """
+
+        return self.__cluster.get_hedge_delay(self.__hedge_percentile)
+
+    @property
+    def ssl_verify(self):
+        """Return the certificate-verification setting (a flag or the path of 
+        a CA bundle).
+
+        :rtype: bool or string
+        """
+
+        return self.__ssl_verify
+
+    @property
+    def ssl_cert(self):
+        """Return the client certificate (and key) to authenticate with.
+
+        :rtype: string, tuple, or None
+        """
+
+        return self.__ssl_cert
+
+    @property
+    def cluster(self):
+        """Return the object that tracks the machines in the cluster.
+
+        :rtype: :class:`etcd.cluster.Cluster`
+        """
+
+        return self.__cluster
 
     @property
     def prefix(self):
@@ -336,7 +837,7 @@ class Client(object):
         :rtype: string
         """
 
-        return self.__prefix
+        return self.__cluster.prefix
 
     @property
     def directory(self):
@@ -348,7 +849,7 @@ class Client(object):
         try:
             return self.__directory
         except AttributeError:
-            self.__directory = DirectoryOps(self)
+            self.__directory = self.directory_ops_cls(self)
             return self.__directory
 
     @property
@@ -362,7 +863,7 @@ class Client(object):
         try:
             return self.__node
         except AttributeError:
-            self.__node = NodeOps(self)
+            self.__node = self.node_ops_cls(self)
             return self.__node
 
     @property
@@ -375,7 +876,7 @@ class Client(object):
         try:
             return self.__server
         except AttributeError:
-            self.__server = ServerOps(self)
+            self.__server = self.server_ops_cls(self)
             return self.__server
 
     @property
@@ -388,7 +889,7 @@ class Client(object):
         try:
             return self.__stat
         except AttributeError:
-            self.__stat = StatOps(self)
+            self.__stat = self.stat_ops_cls(self)
             return self.__stat
 
     @property
@@ -402,7 +903,7 @@ class Client(object):
         try:
             return self.__inorder
         except AttributeError:
-            self.__inorder = InOrderOps(self)
+            self.__inorder = self.inorder_ops_cls(self)
             return self.__inorder
 
     @property
@@ -416,5 +917,487 @@ class Client(object):
         try:
             return self.__module
         except AttributeError:
-            self.__module = _Modules(self)
+            self.__module = self.modules_cls(self)
             return self.__module
+
+
+class Client(_ClientBase):
+    """The main channel of functionality for the client. Connects to the 
+    server, and provides functions via properties.
+
+    :param host: Hostname or IP of server
+    :type host: string
+
+    :param port: Port of server
+    :type port: int
+
+    :param is_ssl: Whether to use 'http://' or 'https://'.
+    :type is_ssl: bool
+
+    :param ssl_do_verify: Whether to verify the certificate hostname.
+    :type ssl_do_verify: bool or None
+
+    :param ssl_ca_bundle_filepath: A bundle of rootCAs for verifications.
+    :type ssl_ca_bundle_filepath: string or None
+
+    :param ssl_client_cert_filepath: A client certificate, for authentication.
+    :type ssl_client_cert_filepath: string or None
+
+    :param ssl_client_key_filepath: A client key, for authentication.
+    :type ssl_client_key_filepath: string or None
+
+    :param pool_maxsize: Number of connections to keep open to each machine. 
+                         This should be at least the number of threads that 
+                         share the client.
+    :type pool_maxsize: int
+
+    :param pool_block: Whether threads should wait for a pooled connection 
+                       rather than open (and then discard) an extra one when 
+                       the pool is exhausted.
+    :type pool_block: bool
+
+    The parameters that are shared with the asyncio client (cluster discovery, 
+    read distribution, etc..) are described by :class:`_ClientBase`.
+
+    No I/O happens in the constructor. Unless they were given (or cached), 
+    the machines in the cluster are retrieved when the first request is sent.
+
+    A single instance may be shared by any number of threads:
+
+    - The machine being talked to, and the fail-over state of the others, is 
+      kept by a :class:`etcd.cluster.Cluster`, which only changes it under a 
+      lock. Each request works from the prefix that was current when it 
+      started, and, when several threads see the same machine fail at once, 
+      only the first one rotates to the next machine.
+    - Connections come from a per-machine pool of *pool_maxsize* keep-alive 
+      connections, so a thread reuses an idle connection instead of opening 
+      a new one.
+    - The functionality classes (node, directory, etc..) hold no state of 
+      their own.
+    - Objects that are returned to the caller (responses, locks, in-order 
+      directories) are not themselves meant to be shared between threads. 
+      The callers of a coalesced read (see *coalesce_reads*) each get a 
+      response object of their own, though the raw response (with 
+      *return_raw*) is shared.
+    """
+
+    modules_cls = _Modules
+
+    def __init__(self, *args, **kwargs):
+        pool_maxsize = kwargs.pop('pool_maxsize', POOL_MAXSIZE)
+        pool_block = kwargs.pop('pool_block', False)
+
+        super(Client, self).__init__(*args, **kwargs)
+
+        self.__session = requests.Session()
+
+        self.__session.mount('http://', 
+                             HTTPAdapter(pool_maxsize=pool_maxsize, 
+                                         pool_block=pool_block))
+
+        # Define an adapter for when SSL is requested.
+        self.__session.mount('https://', 
+                             _SslHttpAdapter(pool_maxsize=pool_maxsize, 
+                                             pool_block=pool_block))
+
+        self.__discovery_lock = threading.Lock()
+        self.__single_flight = SingleFlight()
+
+        # Every hedged read may occupy two workers.
+        self.__hedge_workers = pool_maxsize * 2
+        self.__hedge_executor = None
+        self.__hedge_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Stop the threads that send hedged reads (without waiting for the 
+        reads that are still in flight), and close all pooled connections.
+        """
+
+        with self.__hedge_lock:
+            executor = self.__hedge_executor
+            self.__hedge_executor = None
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+        self.__session.close()
+
+    def refresh_machines(self):
+        """Retrieve the list of machines from the cluster."""
+
+        self.set_discovered_machines(self.server.get_machines())
+
+    def __discover(self):
+        with self.__discovery_lock:
+            if self.cluster.is_discovered is True:
+                return
+
+            try:
+                self.refresh_machines()
+            except (ConnectionError, HTTPError, ReadTimeout, 
+                    EtcdTimeoutError, EtcdAllMachinesFailedError) as e:
+                _logger.debug("Could not retrieve the list of machines: %s", 
+                              str(e))
+
+                # Without a cached list, we stay with the seed machine and 
+                # try again on a later request.
+                self.use_stale_machines()
+
+    def __attempt(self, send, prefix, url, args, is_wait, is_relaxed_read):
+        _logger.debug("Request=[%s] params=[%s] data_keys=[%s]",
+                      url, args['params'], args['data'].keys())
+
+        start_s = time.time()
+
+        try:
+            r = send(url, **args)
+        except ReadTimeout:
+            raise self.fail_timeout(prefix, url, is_wait, args['timeout'])
+        except ConnectionError as e:
+            if isinstance(e, ConnectTimeout) is True and \
+               self.is_clipped_timeout(is_wait, args['timeout'], True) is True:
+                raise self.fail_timeout(prefix, url, is_wait, args['timeout'], 
+                                        is_connect=True)
+
+            _logger.debug("Connection error with [%s] [%s]: %s",
+                          prefix, e.__class__.__name__, str(e))
+
+            self.cluster.record(prefix, is_success=False, 
+                                is_connected=False)
+            raise
+
+        self.record_response(prefix, r, start_s, is_wait, is_relaxed_read)
+        return r
+
+    def __look_up_leader(self):
+        try:
+            self.set_looked_up_leader(self.server.get_leader_url_prefix())
+        except (ConnectionError, HTTPError, ReadTimeout) as e:
+            _logger.debug("Could not look-up the leader: %s", str(e))
+
+    def __get_hedge_executor(self):
+        with self.__hedge_lock:
+            if self.__hedge_executor is None:
+                self.__hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                                            max_workers=self.__hedge_workers)
+
+        return self.__hedge_executor
+
+    def __send_hedged(self, send, version, path, args):
+        """Send a relaxed read to one machine and, if it hasn't answered 
+        within the hedging delay, to a second machine as well. The first 
+        response wins. A request that has already been sent can't be aborted, 
+        so the other one is cancelled if it hasn't started, and its response 
+        is otherwise discarded.
+
+        :returns: Raw response, or None if no machine could be connected-to.
+        :rtype: requests.models.Response or None
+        """
+
+        executor = self.__get_hedge_executor()
+
+        def submit(prefix):
+            url = self.build_url(prefix, version, path)
+            return executor.submit(self.__attempt, send, prefix, url, args, 
+                                   False, True)
+
+        first_prefix = self.select_prefix(True)
+        pending = { submit(first_prefix): first_prefix }
+
+        hedge_delay_s = self.get_hedge_delay()
+        (done, not_done) = concurrent.futures.wait(pending, 
+                                                   timeout=hedge_delay_s)
+
+        if not done:
+            second_prefix = self.cluster.select_for_read(
+                                exclude=(first_prefix,))
+
+            if second_prefix is not None:
+                _logger.debug("Hedging read to [%s] after (%.3f)s.", 
+                              second_prefix, hedge_delay_s)
+
+                pending[submit(second_prefix)] = second_prefix
+
+        while pending:
+            (done, not_done) = concurrent.futures.wait(
+                                pending, 
+                                return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+                prefix = pending.pop(future)
+
+                try:
+                    r = future.result()
+                except ConnectionError:
+                    self.cluster.fail(prefix)
+                    continue
+                except EtcdTimeoutError:
+                    continue
+
+                # A read that has already been sent can't be aborted, but its 
+                # response is closed (releasing its connection) as soon as it 
+                # arrives.
+                for other in pending:
+                    if other.cancel() is False:
+                        other.add_done_callback(_close_discarded)
+
+                return r
+
+        return None
+
+    def send(self, version, verb, path, value=None, parameters=None, data=None, 
+             module=None, return_raw=False, allow_reconnect=True, 
+             timeout=None, stream=False, return_decoded=False):
+        """Build and execute a request.
+
+        :param version: Version of API
+        :type version: int
+
+        :param verb: Verb of request ('get', 'post', etc..)
+        :type verb: string
+
+        :param path: URL path
+        :type path: string
+
+        :param value: Value to be converted to string and passed as "value" in 
+                      the POST data.
+        :type value: scalar or None
+
+        :param parameters: Dictionary of values to be passed via URL query.
+        :type parameters: dictionary or None
+
+        :param data: Dictionary of values to be passed via POST data.
+        :type data: dictionary or None
+
+        :param module: Name of the etcd module that hosts the functionality.
+        :type module: string or None
+
+        :param return_raw: Whether to return a 
+                           :class:`etcd.response.ResponseV2` object or the raw 
+                           Requests response.
+        :type return_raw: bool
+
+        :param allow_reconnect: Allow the client to consider alternate hosts if
+                                the current host fails connection.
+        :type allow_reconnect: bool
+
+        :param timeout: Number of seconds (or a deadline) that the request, 
+                        including any fail-over, must finish within.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
+        :param stream: Return the raw Requests response as soon as its headers 
+                       have been received, so that the body can be consumed 
+                       incrementally (implies *return_raw*). The caller must 
+                       close it. These requests aren't hedged or coalesced.
+        :type stream: bool
+
+        :param return_decoded: Return the decoded document and the indexes 
+                               reported with it, rather than a 
+                               :class:`etcd.response.ResponseV2` (no node 
+                               objects are built).
+        :type return_decoded: bool
+
+        :returns: Response object
+        :rtype: :class:`etcd.response.ResponseV2` or 
+                :class:`etcd.response.DecodedResponse`
+
+        :raises: :class:`etcd.exceptions.EtcdTimeoutError`
+        """
+
+        deadline = get_deadline(timeout)
+
+        if stream is True:
+            return_raw = True
+
+        if allow_reconnect is True and self.cluster.is_discovered is False:
+            self.__discover()
+
+        if parameters is None:
+            parameters = {}
+
+        if data is None:
+            data = {}
+
+        if value is not None:
+            data['value'] = value
+
+        args = { 'params': parameters, 
+                 'data': data, 
+                 'verify': self.ssl_verify, 
+                 'cert': self.ssl_cert, 
+                 'stream': stream }
+
+        send = getattr(self.__session, verb)
+    
+        is_wait = self.is_long_poll(verb, parameters, module)
+        is_relaxed_read = allow_reconnect is True and \
+                          self.is_relaxed_read(verb, path, parameters, module)
+        needs_leader = allow_reconnect is True and \
+                       self.needs_leader(verb, path, parameters, module)
+
+        def send_cb():
+            return self.__send_with_retries(send, version, verb, path, module, 
+                                            args, is_wait, is_relaxed_read, 
+                                            needs_leader, allow_reconnect, 
+                                            deadline)
+
+        if is_relaxed_read is True and self.coalesce_reads is True and \
+           stream is False:
+            key = get_coalescing_key(version, path, parameters, module, 
+                                     self.write_generation)
+
+            (r, retry_count) = self.__single_flight.do(key, send_cb, 
+                                                       deadline)
+        elif verb == 'get':
+            (r, retry_count) = send_cb()
+        else:
+            try:
+                (r, retry_count) = send_cb()
+            finally:
+                self.observe_write()
+
+        return self.build_response(r, verb, path, retry_count, return_raw, 
+                                   return_decoded)
+
+    def __send_with_retries(self, send, version, verb, path, module, args, 
+                            is_wait, is_relaxed_read, needs_leader, 
+                            allow_reconnect, deadline):
+        """Send a request, retrying it if the retry-policy allows.
+
+        :returns: Raw response, and the number of retries
+        :rtype: tuple
+        """
+
+        parameters = args['params']
+        data = args['data']
+
+        self.retry_policy.budget.deposit()
+
+        retry_count = 0
+        while True:
+            try:
+                r = self.__send_once(send, version, path, module, args, 
+                                     is_wait, is_relaxed_read, needs_leader, 
+                                     allow_reconnect, deadline)
+            except (EtcdTimeoutError, ChunkedEncodingError) as e:
+                error = e
+            else:
+                if self.retry_policy.is_retryable_response(r) is False:
+                    break
+
+                error = None
+
+            delay_s = self.get_retry_delay(verb, parameters, data, is_wait, 
+                                           retry_count + 1, deadline)
+
+            if delay_s is None:
+                if error is not None:
+                    raise error
+
+                break
+
+            if error is None:
+                # Release the connection of the response that's discarded.
+                r.close()
+
+            retry_count += 1
+
+            _logger.debug("Retrying (%d) request for [%s] in (%.3f)s: %s", 
+                          retry_count, path, delay_s, 
+                          error or r.status_code)
+
+            time.sleep(delay_s)
+
+        r.raise_for_status()
+
+        return (r, retry_count)
+
+    def __send_once(self, send, version, path, module, args, is_wait, 
+                    is_relaxed_read, needs_leader, allow_reconnect, deadline):
+        """Send a request, failing-over between machines until one of them 
+        can be connected-to.
+
+        :returns: Raw response
+        :rtype: requests.models.Response
+        """
+
+        if self.should_look_up_leader(needs_leader) is True:
+            self.__look_up_leader()
+
+        r = None
+        if is_relaxed_read is True and self.hedge_reads is True and \
+           args['stream'] is False:
+            args['timeout'] = self.get_timeout(False, deadline)
+            r = self.__send_hedged(send, version, path, args)
+
+        failed_prefixes = set()
+        while r is None:
+            if deadline is not None:
+                deadline.check("send a request for [%s]" % (path,))
+
+            prefix = self.select_prefix(is_relaxed_read, needs_leader)
+            url = self.build_url(prefix, version, path, module=module)
+
+            args['timeout'] = self.get_timeout(is_wait, deadline)
+
+            try:
+                r = self.__attempt(send, prefix, url, args, is_wait, 
+                                   is_relaxed_read)
+            except ConnectionError:
+                if allow_reconnect is False:
+                    raise
+            else:
+                break
+
+            # If we get here, there was a connection problem. Rotate the server 
+            # that we're using, excluding any that have recently failed.
+
+            self.fail_connection(prefix, failed_prefixes)
+
+        return r
+
+    def watch(self, path, recursive=False, index=None, poll_timeout=None, 
+              resync=True, listing=None):
+        """Return an iterator of every change to the given node (or, 
+        recursively, to the given directory). See 
+        :class:`etcd.watch.Watcher`.
+
+        :param path: Node key
+        :type path: string
+
+        :param recursive: Report changes to any descendant of the node.
+        :type recursive: bool
+
+        :param index: Index to report changes from.
+        :type index: int or None
+
+        :param listing: Listing of the node to start from, in place of 
+                        *index*.
+        :type listing: :class:`etcd.response.ResponseV2` or None
+
+        :rtype: :class:`etcd.watch.Watcher`
+        """
+
+        return Watcher(self, path, recursive=recursive, index=index, 
+                       poll_timeout=poll_timeout, resync=resync, 
+                       listing=listing)
+
+    @property
+    def coalescing_stats(self):
+        """Return how many coalescable reads were sent, and how many reads 
+        were merged into them.
+
+        :rtype: :class:`etcd.coalesce.CoalescingStats`
+        """
+
+        return self.__single_flight.stats
+
+    @property
+    def session(self):
+        return self.__session
@@ -0,0 +1,700 @@
+import os
+import os.path
+import json
+import time
+import random
+import collections
+import logging
+import threading
+
+from etcd.compat import urlparse
+
+from etcd.config import HOST_FAIL_WAIT_S, READ_SELECTION, \
+                        LATENCY_EWMA_ALPHA, ERROR_PENALTY, \
+                        READ_EXPLORE_RATIO, HEDGE_SAMPLE_SIZE, \
+                        HEDGE_MIN_SAMPLES, HEDGE_DEFAULT_DELAY_S, \
+                        HEDGE_MIN_DELAY_S, BREAKER_FAILURE_THRESHOLD, \
+                        BREAKER_MAX_BACKOFF_S, BREAKER_HALF_OPEN_PROBES, \
+                        BREAKER_PROBE_TIMEOUT_S
+
+_logger = logging.getLogger(__name__)
+
+S_STICKY = 'sticky'
+S_P2C = 'p2c'
+S_LEAST_LATENCY = 'least_latency'
+
+B_CLOSED = 'closed'
+B_OPEN = 'open'
+B_HALF_OPEN = 'half-open'
+
+
+def read_machine_cache(filepath, max_age_s=None):
+    """Read a list of machines written by :func:`write_machine_cache`.
+
+    :param filepath: Cache file
+    :type filepath: string
+
+    :param max_age_s: Maximum age of the file, or None to accept any age.
+    :type max_age_s: int or None
+
+    :returns: URL prefixes, or None if there's no (fresh-enough) cache.
+    :rtype: list of string or None
+    """
+
+    try:
+        age_s = time.time() - os.path.getmtime(filepath)
+        if max_age_s is not None and age_s > max_age_s:
+            _logger.debug("Machine cache is too old (%d): [%s]", 
+                          age_s, filepath)
+
+            return None
+
+        with open(filepath) as f:
+            return json.load(f)['machines']
+    except (IOError, OSError, ValueError, KeyError, TypeError) as e:
+        _logger.debug("Could not read machine cache [%s]: %s", filepath, e)
+        return None
+
+def write_machine_cache(filepath, prefixes):
+    """Store a list of machines. The file is replaced atomically, so 
+    concurrent processes will never see a partial list.
+
+    :param filepath: Cache file
+    :type filepath: string
+
+    :param prefixes: URL prefixes
+    :type prefixes: list of string
+    """
+
+    temp_filepath = ('%s.%d.tmp' % (filepath, os.getpid()))
+
+    try:
+        with open(temp_filepath, 'w') as f:
+            json.dump({ 'machines': prefixes }, f)
+
+        os.rename(temp_filepath, filepath)
+    except (IOError, OSError) as e:
+        _logger.warning("Could not write machine cache [%s]: %s", 
+                        filepath, e)
+
+
+MachineState = collections.namedtuple('MachineState', 
+                        ['prefix', 'breaker_state', 'consecutive_failures', 
+                         'open_count', 'retry_in_s', 'probes_in_flight', 
+                         'latency_s', 'error_rate', 'is_current', 
+                         'is_leader'])
+
+
+class _Machine(object):
+    """The state that we keep for a single machine, including its circuit 
+    breaker.
+
+    The breaker starts closed. After BREAKER_FAILURE_THRESHOLD consecutive 
+    failures it opens, and the machine is skipped for a backoff period that 
+    starts at HOST_FAIL_WAIT_S, doubles every time that the breaker re-opens 
+    (up to BREAKER_MAX_BACKOFF_S), and is jittered so that clients don't 
+    return to it in lock-step. After that, the breaker is half-open: only 
+    BREAKER_HALF_OPEN_PROBES requests at a time are let through, and the first 
+    outcome either closes the breaker or re-opens it.
+
+    :param prefix: URL prefix of the machine
+    :type prefix: string
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.latency_s = None
+        self.error_rate = 0.0
+
+        self.breaker_state = B_CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0
+        self.open_until_s = None
+        self.probes_in_flight = 0
+        self.last_probe_s = None
+
+    def __repr__(self):
+        return ('<MACHINE [%s] BREAKER=[%s] FAILURES=(%d) LATENCY=[%s] '
+                'ERRORS=[%.2f]>' % 
+                (self.prefix, self.breaker_state, self.consecutive_failures, 
+                 self.latency_s, self.error_rate))
+
+    def is_available(self, now_s):
+        """Would the breaker let a request through? This only looks at the 
+        breaker: a breaker whose backoff has expired stays open until a 
+        request is actually acquired for it.
+
+        :rtype: bool
+        """
+
+        if self.breaker_state == B_CLOSED:
+            return True
+
+        if self.breaker_state == B_OPEN:
+            return now_s >= self.open_until_s
+
+        return self.__get_probes_in_flight(now_s) < BREAKER_HALF_OPEN_PROBES
+
+    def __get_probes_in_flight(self, now_s):
+        # A probe whose outcome we never heard about (it was abandoned) 
+        # shouldn't hold the breaker half-open forever.
+        if self.probes_in_flight > 0 and \
+           now_s - self.last_probe_s > BREAKER_PROBE_TIMEOUT_S:
+            return 0
+
+        return self.probes_in_flight
+
+    def acquire(self, now_s):
+        """Account for a request that's about to be sent.
+
+        :returns: Whether the breaker lets it through
+        :rtype: bool
+        """
+
+        if self.is_available(now_s) is False:
+            return False
+
+        if self.breaker_state == B_OPEN:
+            _logger.debug("Breaker for [%s] is half-open.", self.prefix)
+
+            self.breaker_state = B_HALF_OPEN
+            self.probes_in_flight = 0
+
+        if self.breaker_state == B_HALF_OPEN:
+            self.probes_in_flight = self.__get_probes_in_flight(now_s) + 1
+            self.last_probe_s = now_s
+
+        return True
+
+    def succeed(self):
+        if self.breaker_state != B_CLOSED:
+            _logger.debug("Breaker for [%s] is closed.", self.prefix)
+
+        self.breaker_state = B_CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0
+        self.probes_in_flight = 0
+
+    def fail(self, now_s, random_):
+        self.consecutive_failures += 1
+
+        if self.breaker_state == B_HALF_OPEN or \
+           (self.breaker_state == B_CLOSED and 
+            self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD):
+            self.open_count += 1
+
+            backoff_s = min(HOST_FAIL_WAIT_S * 2 ** (self.open_count - 1), 
+                            BREAKER_MAX_BACKOFF_S)
+
+            backoff_s = random_.uniform(backoff_s / 2.0, backoff_s)
+
+            _logger.debug("Breaker for [%s] is open for (%.1f)s.", 
+                          self.prefix, backoff_s)
+
+            self.breaker_state = B_OPEN
+            self.open_until_s = now_s + backoff_s
+            self.probes_in_flight = 0
+
+    @property
+    def score(self):
+        """A cost for sending a request to this machine: lower is better. A 
+        machine that we haven't measured yet is tried before any other.
+
+        :rtype: float
+        """
+
+        if self.latency_s is None:
+            return 0.0
+
+        return self.latency_s * (1.0 + ERROR_PENALTY * self.error_rate)
+
+
+class Cluster(object):
+    """Keeps track of the machines published by the cluster and of the one
+    that we're currently talking to. This is shared by the blocking and the
+    asyncio clients so that both fail-over the same way.
+
+    Besides fail-over, we keep a moving-average of the latency and of the 
+    error-rate of every machine so that reads that can be served by any 
+    machine go to the fastest ones.
+
+    The state is only ever changed while holding an internal lock, so a single 
+    instance may be shared by any number of threads.
+
+    :param prefix: URL prefix of the machine that we were told to connect to.
+    :type prefix: string
+
+    :param read_selection: How to choose a machine for reads that don't have 
+                           to be served by the leader (S_STICKY, S_P2C, or 
+                           S_LEAST_LATENCY).
+    :type read_selection: string
+    """
+
+    def __init__(self, prefix, read_selection=READ_SELECTION):
+        if read_selection not in (S_STICKY, S_P2C, S_LEAST_LATENCY):
+            raise ValueError("Read-selection not valid: %s" % 
+                             (read_selection))
+
+        self.__prefix = prefix
+        self.__read_selection = read_selection
+        self.__machines = [_Machine(prefix)]
+        self.__machine_index = 0
+        self.__is_discovered = False
+        self.__lock = threading.Lock()
+        self.__random = random.Random()
+        self.__read_latencies = collections.deque(maxlen=HEDGE_SAMPLE_SIZE)
+        self.__peer_prefixes = {}
+        self.__leader_prefix = None
+        self.__raft_term = None
+
+    def __str__(self):
+        return ('<CLUSTER %s>' % (self.__prefix))
+
+    def set_machines(self, prefixes, peer_prefixes=None):
+        """Replace the list of machines with the ones published by the
+        cluster (or given by the caller). The statistics of machines that we 
+        already knew about are kept.
+
+        If the current server does not appear in the list (which might only 
+        happen because of a hostname being used instead of an IP, or 
+        vice-versa), it's kept at the front of the list.
+
+        :param prefixes: URL prefixes of the client-facing machines
+        :type prefixes: list of string
+
+        :param peer_prefixes: The client-facing URL prefix of each machine, by 
+                              its peer (raft) URL prefix. The leader is 
+                              reported by its peer URL.
+        :type peer_prefixes: dictionary or None
+        """
+
+        _logger.debug("Cluster machines: %s", prefixes)
+
+        with self.__lock:
+            if peer_prefixes is not None:
+                self.__peer_prefixes = peer_prefixes
+
+            existing = dict([(machine.prefix, machine) 
+                             for machine 
+                             in self.__machines])
+
+            machines = [existing.get(prefix) or _Machine(prefix) 
+                        for prefix 
+                        in prefixes]
+
+            machine_index = None
+            i = 0
+            for machine in machines:
+                if machine.prefix == self.__prefix:
+                    machine_index = i
+                    break
+
+                i += 1
+
+            if machine_index is None:
+                _logger.debug("Could not identify current prefix [%s] among "
+                              "published prefixes. It will be kept.", 
+                              self.__prefix)
+
+                machines.insert(0, existing[self.__prefix])
+                machine_index = 0
+
+            self.__machines = machines
+            self.__machine_index = machine_index
+            self.__is_discovered = True
+
+        _logger.debug("The current machine is at index (%d).", machine_index)
+
+    def __find(self, prefix):
+        for machine in self.__machines:
+            if machine.prefix == prefix:
+                return machine
+
+        return None
+
+    def record(self, prefix, elapsed_s=None, is_success=True, 
+               is_relaxed_read=False, is_connected=True):
+        """Update the statistics of a machine with the outcome of a request.
+
+        :param prefix: URL prefix of the machine
+        :type prefix: string
+
+        :param elapsed_s: Duration of the request, or None if it shouldn't 
+                          count towards the latency (like a long-poll).
+        :type elapsed_s: float or None
+
+        :param is_success: Whether the machine served the request.
+        :type is_success: bool
+
+        :param is_relaxed_read: Whether the request was a read that any 
+                                machine could serve (these durations determine 
+                                when reads are hedged).
+        :type is_relaxed_read: bool
+
+        :param is_connected: Whether the machine could be connected-to. Any 
+                             response closes the machine's circuit breaker 
+                             (a connection failure is counted against it by 
+                             :meth:`fail`).
+        :type is_connected: bool
+        """
+
+        with self.__lock:
+            if elapsed_s is not None and \
+               is_success is True and \
+               is_relaxed_read is True:
+                self.__read_latencies.append(elapsed_s)
+
+            machine = self.__find(prefix)
+            if machine is None:
+                return
+
+            if is_connected is True:
+                machine.succeed()
+
+            error = 0.0 if is_success is True else 1.0
+            machine.error_rate += LATENCY_EWMA_ALPHA * \
+                                    (error - machine.error_rate)
+
+            if elapsed_s is not None:
+                if machine.latency_s is None:
+                    machine.latency_s = elapsed_s
+                else:
+                    machine.latency_s += LATENCY_EWMA_ALPHA * \
+                                            (elapsed_s - machine.latency_s)
+
+    def __rotate(self, now_s):
+        """Make the next machine that the breakers let through the current 
+        one. If none of them does, the one whose breaker is due to let a 
+        probe through first is probed early.
+        """
+
+        len_ = len(self.__machines)
+        i = 1
+        while i < len_:
+            machine_index = (self.__machine_index + i) % len_
+            machine = self.__machines[machine_index]
+
+            if machine.acquire(now_s) is True:
+                break
+
+            i += 1
+        else:
+            # The current machine is the only one left that might be.
+            machine_index = self.__machine_index
+            machine = self.__machines[machine_index]
+
+            if machine.acquire(now_s) is False:
+                machine = self.__force_probe(now_s)
+                machine_index = self.__machines.index(machine)
+
+        self.__prefix = machine.prefix
+        self.__machine_index = machine_index
+
+        _logger.debug("Retrying with next machine: %s", machine.prefix)
+
+        return machine.prefix
+
+    def __force_probe(self, now_s):
+        """Let a probe through to the machine whose breaker is due to close 
+        first, when no breaker lets a request through. Rather than failing 
+        every request until a breaker's backoff expires (even if the machine 
+        has recovered), we find out sooner.
+
+        :rtype: :class:`_Machine`
+        """
+
+        machine = min(self.__machines, 
+                      key=lambda machine: machine.open_until_s or 0.0)
+
+        _logger.debug("No machine is available. Probing [%s] early.", 
+                      machine.prefix)
+
+        machine.breaker_state = B_HALF_OPEN
+        machine.probes_in_flight = 1
+        machine.last_probe_s = now_s
+
+        return machine
+
+    def fail(self, failed_prefix):
+        """Count a connection failure against the given machine's breaker 
+        and, if it's still the current machine, rotate to the next one that 
+        the breakers let through. If another thread has already rotated away 
+        from it, the current machine is kept.
+
+        :param failed_prefix: URL prefix of the machine that failed
+        :type failed_prefix: string
+
+        :returns: URL prefix of the machine to retry with
+        :rtype: string
+        """
+
+        now_s = time.time()
+
+        with self.__lock:
+            machine = self.__find(failed_prefix)
+            if machine is not None:
+                machine.fail(now_s, self.__random)
+
+            if failed_prefix == self.__leader_prefix:
+                _logger.debug("The leader has failed: %s", failed_prefix)
+                self.__leader_prefix = None
+
+            if failed_prefix != self.__prefix:
+                return self.__prefix
+
+            return self.__rotate(now_s)
+
+    def select_current(self):
+        """Return the current machine, if its breaker lets a request through, 
+        or else rotate to the next one that does (or to the one that's due to 
+        be probed first, if none does).
+
+        :returns: URL prefix
+        :rtype: string
+        """
+
+        now_s = time.time()
+
+        with self.__lock:
+            machine = self.__machines[self.__machine_index]
+            if machine.acquire(now_s) is True:
+                return machine.prefix
+
+            return self.__rotate(now_s)
+
+    def select_leader(self):
+        """Return the leader, if it's known and its breaker lets a request 
+        through.
+
+        :returns: URL prefix
+        :rtype: string or None
+        """
+
+        with self.__lock:
+            if self.__leader_prefix is None:
+                return None
+
+            machine = self.__find(self.__leader_prefix)
+            if machine is not None and \
+               machine.acquire(time.time()) is False:
+                return None
+
+            return self.__leader_prefix
+
+    def select_for_read(self, exclude=()):
+        """Choose the machine to send a read to, when the read doesn't have to 
+        be served by the leader.
+
+        :param exclude: URL prefixes that mustn't be chosen (like the one that 
+                        a hedged read was already sent to).
+        :type exclude: tuple of string
+
+        :returns: URL prefix, or None if every machine was excluded.
+        :rtype: string or None
+        """
+
+        if self.__read_selection == S_STICKY and \
+           self.__prefix not in exclude:
+            return self.select_current()
+
+        now_s = time.time()
+
+        with self.__lock:
+            # Only the machine that's chosen is acquired, so sampling a 
+            # machine whose breaker is due to be probed doesn't use up the 
+            # probe.
+            candidates = [machine 
+                          for machine 
+                          in self.__machines 
+                          if machine.is_available(now_s) is True and \
+                             machine.prefix not in exclude]
+
+            if not candidates:
+                if exclude:
+                    return None
+
+                return self.__force_probe(now_s).prefix
+
+            # Occasionally send a read to an arbitrary machine, so that a 
+            # machine that was slow has a chance to show that it recovered.
+            if self.__random.random() < READ_EXPLORE_RATIO:
+                machine = self.__random.choice(candidates)
+            else:
+                if self.__read_selection == S_P2C and len(candidates) > 2:
+                    candidates = self.__random.sample(candidates, 2)
+
+                machine = min(candidates, key=lambda machine: machine.score)
+
+            machine.acquire(now_s)
+            return machine.prefix
+
+    def get_states(self):
+        """Describe every machine: its circuit breaker and its statistics.
+
+        :rtype: list of :class:`MachineState`
+        """
+
+        now_s = time.time()
+
+        with self.__lock:
+            states = []
+            for machine in self.__machines:
+                if machine.breaker_state == B_OPEN:
+                    retry_in_s = max(0.0, machine.open_until_s - now_s)
+                else:
+                    retry_in_s = None
+
+                states.append(MachineState(
+                    prefix=machine.prefix, 
+                    breaker_state=machine.breaker_state, 
+                    consecutive_failures=machine.consecutive_failures, 
+                    open_count=machine.open_count, 
+                    retry_in_s=retry_in_s, 
+                    probes_in_flight=machine.probes_in_flight, 
+                    latency_s=machine.latency_s, 
+                    error_rate=machine.error_rate, 
+                    is_current=machine.prefix == self.__prefix, 
+                    is_leader=machine.prefix == self.__leader_prefix))
+
+            return states
+
+    def set_leader(self, prefix):
+        """Record the client-facing URL prefix of the leader.
+
+        :param prefix: URL prefix
+        :type prefix: string
+        """
+
+        with self.__lock:
+            if prefix != self.__leader_prefix:
+                _logger.debug("The leader is now: %s", prefix)
+                self.__leader_prefix = prefix
+
+    def set_leader_by_peer(self, peer_prefix):
+        """Record the leader given its peer (raft) URL prefix, as reported by 
+        the cluster.
+
+        :param peer_prefix: Peer URL prefix
+        :type peer_prefix: string
+
+        :returns: Whether the corresponding client-facing prefix is known
+        :rtype: bool
+        """
+
+        with self.__lock:
+            prefix = self.__peer_prefixes.get(peer_prefix)
+
+            if prefix is None:
+                # We weren't told the peer URLs (the machines were given to 
+                # us, or cached). Most clusters run the peer and client 
+                # listeners on the same host, so settle for a unique match 
+                # on the hostname.
+                host = urlparse(peer_prefix).hostname
+                matches = [machine.prefix 
+                           for machine 
+                           in self.__machines 
+                           if urlparse(machine.prefix).hostname == host]
+
+                if len(matches) != 1:
+                    _logger.debug("Could not identify the client prefix of "
+                                  "leader [%s].", peer_prefix)
+
+                    return False
+
+                prefix = matches[0]
+
+        self.set_leader(prefix)
+        return True
+
+    def invalidate_leader(self):
+        """Forget the leader, so that it's looked-up again."""
+
+        with self.__lock:
+            self.__leader_prefix = None
+
+    def observe_term(self, term):
+        """Track the raft term reported by the cluster. A new term means that 
+        there was an election, so the leader may have moved.
+
+        :param term: Raft term
+        :type term: int
+        """
+
+        with self.__lock:
+            if term == self.__raft_term:
+                return
+
+            if self.__raft_term is not None:
+                _logger.debug("Raft term changed (%s -> %s). Forgetting the "
+                              "leader.", self.__raft_term, term)
+
+                self.__leader_prefix = None
+
+            self.__raft_term = term
+
+    @property
+    def leader_prefix(self):
+        """Return the client-facing URL prefix of the leader, or None if it's 
+        not known or its circuit breaker is open.
+
+        :rtype: string or None
+        """
+
+        with self.__lock:
+            if self.__leader_prefix is None:
+                return None
+
+            machine = self.__find(self.__leader_prefix)
+            if machine is not None and \
+               machine.breaker_state == B_OPEN:
+                return None
+
+            return self.__leader_prefix
+
+    def get_hedge_delay(self, percentile):
+        """Return how long to wait on a read before sending the same read to a 
+        second machine: the given percentile of the recent read latencies.
+
+        :param percentile: Percentile (0-100)
+        :type percentile: float
+
+        :rtype: float
+        """
+
+        with self.__lock:
+            samples = sorted(self.__read_latencies)
+
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_S
+
+        i = min(len(samples) - 1, int(len(samples) * percentile / 100.0))
+        return max(samples[i], HEDGE_MIN_DELAY_S)
+
+    @property
+    def prefix(self):
+        """Return the URL prefix of the current machine.
+
+        :rtype: string
+        """
+
+        return self.__prefix
+
+    @property
+    def machines(self):
+        """Return the URL prefixes of the known machines.
+
+        :rtype: list of string
+        """
+
+        with self.__lock:
+            return [machine.prefix for machine in self.__machines]
+
+    @property
+    def is_discovered(self):
+        """Have we been given a list of machines (from the cluster, the cache, 
+        or the caller)?
+
+        :rtype: bool
+        """
+
+        return self.__is_discovered
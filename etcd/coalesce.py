@@ -0,0 +1,163 @@
+"""Coalescing of identical requests that are in flight at the same time 
+("single-flight"), so that many callers asking for the same thing at once 
+only cost the cluster one request.
+"""
+
+import collections
+import copy
+import threading
+
+from etcd.exceptions import EtcdTimeoutError
+
+CoalescingStats = collections.namedtuple('CoalescingStats', 
+                                         ['sent', 'merged'])
+
+
+def get_coalescing_key(version, path, parameters, module, 
+                       write_generation=0):
+    """Return the key that identifies a read for coalescing. Reads are only 
+    merged if they'd produce the same response, and if no write of the 
+    client's was made between them (see 
+    :meth:`etcd.client._ClientBase.observe_write`).
+
+    :rtype: tuple
+    """
+
+    return (version, path, module, write_generation, 
+            tuple(sorted(parameters.items())))
+
+
+def copy_error(error):
+    """Return a copy of an error that a merged call raised, so that every 
+    caller raises an exception of its own (with its own traceback).
+
+    :param error: The error that the call raised
+    :type error: Exception
+
+    :rtype: Exception
+    """
+
+    try:
+        fresh = copy.copy(error)
+    except Exception:
+        return error
+
+    fresh.__cause__ = error
+    return fresh
+
+def is_borrowed_timeout(error, deadline):
+    """Did a merged call fail only because the deadline of the caller that 
+    started it passed, while this caller still has time (or no deadline)? 
+    Such a caller runs the call itself, rather than inheriting the timeout.
+
+    :param error: The error that the call raised
+    :type error: Exception
+
+    :param deadline: The deadline of this caller
+    :type deadline: :class:`etcd.deadline.Deadline` or None
+
+    :rtype: bool
+    """
+
+    return isinstance(error, EtcdTimeoutError) is True and \
+           (deadline is None or deadline.is_expired is False)
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Runs a call once for all of the threads that ask for it with the same 
+    key while it's in flight. They all receive the same result (or a copy of 
+    the same error). Every caller waits within its own deadline, and a caller 
+    whose merged call timed-out under another caller's deadline runs the call 
+    again itself.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__calls = {}
+        self.__sent = 0
+        self.__merged = 0
+
+    def do(self, key, cb, deadline=None):
+        """Run the callback, or wait for the identical call that's already 
+        running.
+
+        :param key: Identifies identical calls
+        :type key: hashable
+
+        :param cb: The call
+        :type cb: callable
+
+        :param deadline: How long to wait for an identical call
+        :type deadline: :class:`etcd.deadline.Deadline` or None
+
+        :returns: The result of the callback
+
+        :raises: :class:`etcd.exceptions.EtcdTimeoutError`
+        """
+
+        is_retry = False
+        while True:
+            (call, is_leader) = self.__join(key)
+            if is_leader is True:
+                return self.__run(key, call, cb)
+
+            timeout_s = deadline.remaining_s if deadline is not None else None
+            if call.event.wait(timeout_s) is False:
+                raise EtcdTimeoutError("Timed-out while waiting for an "
+                                       "identical request: %s" % (key,))
+
+            if call.error is None:
+                return call.result
+
+            # The call ran under the deadline of the caller that started it.
+            if is_retry is False and \
+               is_borrowed_timeout(call.error, deadline) is True:
+                is_retry = True
+                continue
+
+            raise copy_error(call.error)
+
+    def __join(self, key):
+        with self.__lock:
+            call = self.__calls.get(key)
+            if call is None:
+                call = _Call()
+                self.__calls[key] = call
+                self.__sent += 1
+
+                return (call, True)
+
+            self.__merged += 1
+            return (call, False)
+
+    def __run(self, key, call, cb):
+        try:
+            call.result = cb()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+
+            call.event.set()
+
+        return call.result
+
+    @property
+    def stats(self):
+        """Return how many calls were made, and how many were merged into 
+        them.
+
+        :rtype: :class:`CoalescingStats`
+        """
+
+        with self.__lock:
+            return CoalescingStats(sent=self.__sent, merged=self.__merged)
@@ -0,0 +1,85 @@
+"""Codecs that carry binary values. The server stores every value as a 
+(unicode) string, so bytes have to be given a transport encoding that 
+survives that. The codec of a client is used by the calls that take and 
+return bytes.
+"""
+
+import base64
+import binascii
+import codecs
+
+
+class ValueCodec(object):
+    """Base-class of value codecs."""
+
+    name = None
+
+    def encode(self, value):
+        """Encode bytes into the string that will be stored.
+
+        :param value: Value
+        :type value: bytes, bytearray, or memoryview
+
+        :rtype: string
+        """
+
+        raise NotImplementedError()
+
+    def decode(self, value):
+        """Decode a stored string into bytes.
+
+        :param value: Stored value
+        :type value: string
+
+        :rtype: bytes
+        """
+
+        raise NotImplementedError()
+
+
+class Utf8Codec(ValueCodec):
+    """Store the bytes as they are. They must be valid UTF-8, or the server 
+    will replace the invalid sequences.
+    """
+
+    name = 'utf8'
+
+    def encode(self, value):
+        return codecs.decode(value, 'utf-8')
+
+    def decode(self, value):
+        return value.encode('utf-8')
+
+
+class Base64Codec(ValueCodec):
+    """Store the bytes as base64. Any bytes can be stored, at the cost of a 
+    third more space.
+    """
+
+    name = 'base64'
+
+    def encode(self, value):
+        # A memoryview is encoded without being copied first.
+        return base64.b64encode(value).decode('ascii')
+
+    def decode(self, value):
+        # This reads the (ASCII) string directly.
+        return binascii.a2b_base64(value)
+
+
+_CODECS = dict([(cls.name, cls) for cls in (Utf8Codec, Base64Codec)])
+
+
+def get_codec(name):
+    """Return an instance of the codec with the given name.
+
+    :param name: Name ("utf8" or "base64")
+    :type name: string
+
+    :rtype: :class:`ValueCodec`
+    """
+
+    try:
+        return _CODECS[name]()
+    except KeyError:
+        raise ValueError("Value codec not supported: %s" % (name))
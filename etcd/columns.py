@@ -0,0 +1,217 @@
+"""A columnar form of a (recursive) directory listing, for jobs that sweep
+very large trees and only need the keys, values, and indexes. The leaves are
+flattened straight from the decoded JSON into one column per attribute,
+without building any node objects, and the columns can be filtered as a
+whole.
+"""
+
+import array
+import itertools
+
+from etcd.rfc3339 import parse_epoch_s
+
+NO_TTL = -1
+"The TTL of a leaf that doesn't expire."
+
+NO_EXPIRATION = float('nan')
+"The expiration of a leaf that doesn't expire. It fails every comparison."
+
+
+class ListingColumns(object):
+    """The leaves (the nodes that aren't directories) of a listing, as
+    parallel columns:
+
+    - *keys*, *values*: lists of strings
+    - *created_indexes*, *modified_indexes*, *ttls*: integer arrays (a TTL is
+      NO_TTL for a leaf that doesn't expire)
+    - *expirations*: array of epoch seconds (NO_EXPIRATION for a leaf that
+      doesn't expire)
+
+    Every filter returns a new instance with the rows that match, so filters
+    can be chained.
+    """
+
+    def __init__(self, keys=None, values=None, created_indexes=None,
+                 modified_indexes=None, ttls=None, expirations=None):
+        self.keys = keys if keys is not None else []
+        self.values = values if values is not None else []
+
+        self.created_indexes = created_indexes \
+                                if created_indexes is not None \
+                                else array.array('q')
+
+        self.modified_indexes = modified_indexes \
+                                    if modified_indexes is not None \
+                                    else array.array('q')
+
+        self.ttls = ttls if ttls is not None else array.array('q')
+
+        self.expirations = expirations \
+                            if expirations is not None \
+                            else array.array('d')
+
+    def __repr__(self):
+        return ('<LISTING-COLUMNS COUNT=(%d)>' % (len(self.keys)))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        """Iterate the rows.
+
+        :returns: Generator of (key, value, created_index, modified_index,
+                  ttl, expiration) tuples
+        :rtype: generator
+        """
+
+        return zip(self.keys, self.values, self.created_indexes,
+                   self.modified_indexes, self.ttls, self.expirations)
+
+    @classmethod
+    def from_decoded(cls, response_raw):
+        """Flatten the leaves of a decoded listing.
+
+        :param response_raw: Decoded response
+        :type response_raw: dictionary
+
+        :rtype: :class:`ListingColumns`
+        """
+
+        columns = cls()
+
+        keys_append = columns.keys.append
+        values_append = columns.values.append
+        created_append = columns.created_indexes.append
+        modified_append = columns.modified_indexes.append
+        ttls_append = columns.ttls.append
+        expirations_append = columns.expirations.append
+
+        # Walk the tree without recursion, since it can be deep.
+        pending = [response_raw['node']]
+        while pending:
+            node = pending.pop()
+
+            if node.get('dir') is True:
+                children = node.get('nodes')
+                if children:
+                    # Reversed, so that the children are popped in order.
+                    pending.extend(reversed(children))
+
+                continue
+
+            keys_append(node['key'])
+            values_append(node.get('value'))
+            created_append(node['createdIndex'])
+            modified_append(node['modifiedIndex'])
+
+            expiration = node.get('expiration')
+            if expiration is None:
+                ttls_append(NO_TTL)
+                expirations_append(NO_EXPIRATION)
+            else:
+                ttls_append(node['ttl'])
+                expirations_append(parse_epoch_s(expiration))
+
+        return columns
+
+    def select(self, mask):
+        """Return the rows whose flags are true.
+
+        :param mask: One flag per row
+        :type mask: iterable of bool
+
+        :rtype: :class:`ListingColumns`
+        """
+
+        mask = list(mask)
+        if len(mask) != len(self.keys):
+            raise ValueError("Mask has (%d) flags for (%d) rows." %
+                             (len(mask), len(self.keys)))
+
+        compress = itertools.compress
+
+        return self.__class__(
+                keys=list(compress(self.keys, mask)),
+                values=list(compress(self.values, mask)),
+                created_indexes=array.array(
+                    'q', compress(self.created_indexes, mask)),
+                modified_indexes=array.array(
+                    'q', compress(self.modified_indexes, mask)),
+                ttls=array.array('q', compress(self.ttls, mask)),
+                expirations=array.array(
+                    'd', compress(self.expirations, mask)))
+
+    def filter_prefix(self, prefix):
+        """Return the rows whose key starts with the given prefix.
+
+        :param prefix: Key prefix
+        :type prefix: string
+
+        :rtype: :class:`ListingColumns`
+        """
+
+        return self.select([key.startswith(prefix) for key in self.keys])
+
+    def filter_modified_index(self, min_index=None, max_index=None):
+        """Return the rows that were last modified within the given
+        (inclusive) range of indexes.
+
+        :rtype: :class:`ListingColumns`
+        """
+
+        return self.select(_get_range_mask(self.modified_indexes,
+                                           min_index, max_index))
+
+    def filter_created_index(self, min_index=None, max_index=None):
+        """Return the rows that were created within the given (inclusive)
+        range of indexes.
+
+        :rtype: :class:`ListingColumns`
+        """
+
+        return self.select(_get_range_mask(self.created_indexes,
+                                           min_index, max_index))
+
+    def filter_ttl(self, min_ttl=None, max_ttl=None):
+        """Return the rows that expire, and whose TTL is within the given
+        (inclusive) range.
+
+        :rtype: :class:`ListingColumns`
+        """
+
+        if min_ttl is None or min_ttl < 0:
+            min_ttl = 0
+
+        return self.select(_get_range_mask(self.ttls, min_ttl, max_ttl))
+
+    def filter_expires_before(self, epoch_s):
+        """Return the rows that expire before the given time.
+
+        :param epoch_s: Time, as epoch seconds
+        :type epoch_s: float
+
+        :rtype: :class:`ListingColumns`
+        """
+
+        return self.select([expiration < epoch_s
+                            for expiration
+                            in self.expirations])
+
+    def filter_persistent(self):
+        """Return the rows that don't expire.
+
+        :rtype: :class:`ListingColumns`
+        """
+
+        return self.select([ttl == NO_TTL for ttl in self.ttls])
+
+
+def _get_range_mask(column, min_value, max_value):
+    if min_value is None and max_value is None:
+        return [True] * len(column)
+    elif min_value is None:
+        return [value <= max_value for value in column]
+    elif max_value is None:
+        return [value >= min_value for value in column]
+    else:
+        return [min_value <= value <= max_value for value in column]
@@ -1,8 +1,11 @@
+import copy
+
 from requests.exceptions import HTTPError, ChunkedEncodingError
 from requests.status_codes import codes
 
 from etcd.exceptions import EtcdPreconditionException, EtcdEmptyResponseError,\
-                            EtcdWaitFaultException, translate_exceptions
+                            EtcdWaitFaultException, translate_exceptions, \
+                            set_error_indexes
 
 
 class CommonOps(object):
@@ -10,10 +13,66 @@ class CommonOps(object):
 
     :param client: Client instance.
     :type client: :class:`etcd.client.Client`
+
+    :param return_decoded: Have the calls return the decoded document and the 
+                           indexes reported with it (see *decoded*).
+    :type return_decoded: bool
     """
 
-    def __init__(self, client):
+    def __init__(self, client, return_decoded=False):
         self.__client = client
+        self.__return_decoded = return_decoded
+        self.__decoded = self if return_decoded is True else None
+
+    def send(self, *args, **kwargs):
+        """Send a request through the client, in the mode of these calls. 
+        This takes the same parameters as :meth:`etcd.client.Client.send`.
+        """
+
+        if self.__return_decoded is True:
+            kwargs.setdefault('return_decoded', True)
+
+        return self.client.send(*args, **kwargs)
+
+    @property
+    def decoded(self):
+        """Return these same calls, but returning a 
+        :class:`etcd.response.DecodedResponse` (the decoded document and the 
+        indexes reported with it) instead of a 
+        :class:`etcd.response.ResponseV2`. No node objects are built. Errors 
+        are translated the same way.
+
+        :rtype: :class:`CommonOps`
+        """
+
+        if self.__decoded is None:
+            decoded = copy.copy(self)
+            decoded.__return_decoded = True
+            decoded.__decoded = decoded
+
+            self.__decoded = decoded
+
+        return self.__decoded
+
+    @property
+    def is_decoded(self):
+        """Do these calls return decoded documents rather than responses?
+
+        :rtype: bool
+        """
+
+        return self.__return_decoded
+
+    def in_same_mode(self, ops):
+        """Return the given calls in the same mode as these.
+
+        :param ops: 'ops' instance
+        :type ops: :class:`CommonOps`
+
+        :rtype: :class:`CommonOps`
+        """
+
+        return ops.decoded if self.__return_decoded is True else ops
 
     def get_text(self, reason, path, version=2):
         """Execute a request that will return flat text.
@@ -37,7 +96,11 @@ class CommonOps(object):
 
         self.client.debug("TEXT URL (%s) = [%s]" % (reason, url))
 
-        r = self.client.session.get(url)
+        r = self.client.session.get(url, 
+                                    verify=self.client.ssl_verify, 
+                                    cert=self.client.ssl_cert, 
+                                    timeout=self.client.get_timeout(False))
+
         r.raise_for_status()
 
         return r.text
@@ -66,7 +129,8 @@ class CommonOps(object):
         return ('/keys' + path)
 
     def compare_and_delete(self, path, is_dir, current_value=None, 
-                           current_index=None, is_recursive=None):
+                           current_index=None, is_recursive=None, 
+                           timeout=None):
         """The base compare-and-delete function for atomic deletes. A  
         combination of criteria may be used if necessary.
         
@@ -82,6 +146,10 @@ class CommonOps(object):
         :param current_index: Current index to check
         :type current_index: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
@@ -111,17 +179,20 @@ class CommonOps(object):
         
 
         try:
-            return self.client.send(2, 'delete', fq_path, 
-                                    parameters=parameters,
-                                    data=data)
+            return self.send(2, 'delete', fq_path, 
+                             parameters=parameters,
+                             data=data, 
+                             timeout=timeout)
         except HTTPError as e:
             if e.response.status_code == codes.precondition_failed:
-                raise EtcdPreconditionException()
+                raise set_error_indexes(EtcdPreconditionException(), 
+                                        e.response)
 
             raise
 
     @translate_exceptions
-    def wait(self, path, recursive=False, force_consistent=False):
+    def wait(self, path, recursive=False, force_consistent=False, 
+             timeout=None):
         """Long-poll on the given path until it changes.
 
         :param path: Node key
@@ -131,10 +202,15 @@ class CommonOps(object):
                           its descendants.
         :type recursive: bool
 
+        :param timeout: Number of seconds (or a deadline) to wait for a 
+                        change. By default, the client's *wait_timeout_s* 
+                        applies.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2` or None
 
-        :raises: KeyError
+        :raises: KeyError, :class:`etcd.exceptions.EtcdTimeoutError`
         """
 
         fq_path = self.get_fq_node_path(path)
@@ -148,7 +224,8 @@ class CommonOps(object):
             parameters['consistent'] = 'true'
 
         try:
-            return self.client.send(2, 'get', fq_path, parameters=parameters)
+            return self.send(2, 'get', fq_path, parameters=parameters, 
+                             timeout=timeout)
         except ChunkedEncodingError:
 # TODO(dustin): We need to document why we would get this. We don't remember 
 #               the context.
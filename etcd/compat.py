@@ -1,5 +1,29 @@
 try:
-    from urlparse import parse_qsl
+    from urlparse import parse_qsl, urlparse
     from urllib import urlencode
 except ImportError:
-    from urllib.parse import parse_qsl, urlencode
+    from urllib.parse import parse_qsl, urlparse, urlencode
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    from datetime import timezone
+except ImportError:
+    from datetime import tzinfo, timedelta
+
+    class _Utc(tzinfo):
+        def utcoffset(self, dt):
+            return timedelta(0)
+
+        def tzname(self, dt):
+            return 'UTC'
+
+        def dst(self, dt):
+            return timedelta(0)
+
+    UTC = _Utc()
+else:
+    UTC = timezone.utc
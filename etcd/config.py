@@ -1,6 +1,123 @@
 import os
 
 HOST_FAIL_WAIT_S = 5
-"Number of seconds that must elapse before we're allowed to retry a host."
+"Number of seconds that a host is skipped for after its circuit breaker first opens."
 
 ATOMIC_MAX_ATTEMPTS = int(os.environ.get('ETCD_ATOMIC_MAX_ATTEMPTS', '5'))
+
+ASYNC_CONNECTION_LIMIT = int(os.environ.get('PEC_ASYNC_CONNECTION_LIMIT', '0'))
+"Maximum number of connections that the asyncio client will open (0 is no limit)."
+
+POOL_MAXSIZE = int(os.environ.get('PEC_POOL_MAXSIZE', '64'))
+"Number of connections that Client keeps open to each machine. This should be at least the number of threads sharing the client."
+
+MACHINE_CACHE_MAX_AGE_S = int(os.environ.get('PEC_MACHINE_CACHE_MAX_AGE_S', '300'))
+"Number of seconds that a cached list of machines is trusted before it's retrieved from the cluster again."
+
+READ_SELECTION = os.environ.get('PEC_READ_SELECTION', 'p2c')
+"How reads that any machine can serve are distributed: 'p2c' (the better of two random machines), 'least_latency', or 'sticky' (the current machine)."
+
+LATENCY_EWMA_ALPHA = 0.3
+"Weight of the newest sample in the moving-averages of machine latency and error-rate."
+
+ERROR_PENALTY = 10.0
+"How strongly a machine's error-rate inflates its latency when choosing a machine."
+
+READ_EXPLORE_RATIO = 0.02
+"Fraction of reads sent to an arbitrary machine so that its latency is re-measured."
+
+HEDGE_READS = bool(int(os.environ.get('PEC_HEDGE_READS', '0')))
+"Whether a plain read that's slow to be answered is also sent to a second machine."
+
+HEDGE_PERCENTILE = float(os.environ.get('PEC_HEDGE_PERCENTILE', '95'))
+"Percentile of recent read latencies after which a read is hedged."
+
+HEDGE_SAMPLE_SIZE = 500
+"Number of recent read latencies that the hedging delay is derived from."
+
+HEDGE_MIN_SAMPLES = 20
+"Number of read latencies needed before the hedging delay is derived from them."
+
+HEDGE_DEFAULT_DELAY_S = 0.05
+"Hedging delay used until enough read latencies have been collected."
+
+HEDGE_MIN_DELAY_S = 0.002
+"Lower bound on the hedging delay, so that fast clusters aren't sent every read twice."
+
+ROUTE_TO_LEADER = bool(int(os.environ.get('PEC_ROUTE_TO_LEADER', '1')))
+"Whether writes and consistent reads are sent directly to the leader."
+
+LEADER_LOOKUP_INTERVAL_S = 1
+"Minimum number of seconds between look-ups of the leader."
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('PEC_BREAKER_FAILURE_THRESHOLD', '3'))
+"Number of consecutive connection failures that open a host's circuit breaker."
+
+BREAKER_MAX_BACKOFF_S = float(os.environ.get('PEC_BREAKER_MAX_BACKOFF_S', '60'))
+"Upper bound on the time that a host is skipped for while its breaker is open."
+
+BREAKER_HALF_OPEN_PROBES = 1
+"Number of simultaneous requests let through to a host whose breaker is half-open."
+
+BREAKER_PROBE_TIMEOUT_S = 30
+"Number of seconds after which a probe that never reported back is forgotten."
+
+CONNECT_TIMEOUT_S = float(os.environ.get('PEC_CONNECT_TIMEOUT_S', '5'))
+"Number of seconds to wait for a connection to a machine."
+
+READ_TIMEOUT_S = float(os.environ.get('PEC_READ_TIMEOUT_S', '30'))
+"Number of seconds to wait for a machine to respond to a request."
+
+WAIT_TIMEOUT_S = float(os.environ.get('PEC_WAIT_TIMEOUT_S', '0'))
+"Number of seconds to wait for a long-poll (like a wait or a lock acquisition) to respond (zero for no limit)."
+
+RETRY_MAX_RETRIES = int(os.environ.get('PEC_RETRY_MAX_RETRIES', '2'))
+"Number of times that a request that's safe to repeat is retried after a server-error, a timeout, or a truncated response."
+
+RETRY_INITIAL_BACKOFF_S = 0.05
+"Upper bound on the (randomized) delay before the first retry. It doubles with every retry."
+
+RETRY_MAX_BACKOFF_S = 1.0
+"Upper bound on the delay before any retry."
+
+RETRY_BUDGET_RATIO = float(os.environ.get('PEC_RETRY_BUDGET_RATIO', '0.1'))
+"Number of retries that every request earns for the client, so that retries can only add this fraction to the load."
+
+RETRY_BUDGET_MIN_PER_S = 10
+"Number of retries per second that the client may make regardless of how many requests it sends."
+
+COALESCE_READS = bool(int(os.environ.get('PEC_COALESCE_READS', '0')))
+"Whether identical plain reads that are in flight at the same time share one request."
+
+KEEP_RAW_NODES = bool(int(os.environ.get('PEC_KEEP_RAW_NODES', '1')))
+"Whether responses keep the decoded JSON of every node (as raw_node), rather than only the compact node objects."
+
+JSON_DECODER = os.environ.get('PEC_JSON_DECODER', '')
+"The JSON library to decode responses with (orjson, ujson, simplejson, or json). By default, the fastest one installed is used."
+
+STREAM_CHUNK_SIZE = 65536
+"Number of bytes read at a time from the body of a streamed listing."
+
+VALUE_CODEC = os.environ.get('PEC_VALUE_CODEC', 'base64')
+"The transport encoding of the values that are set and retrieved as bytes (base64 or utf8)."
+
+WATCH_RECONNECT_BACKOFF_S = 0.5
+"Number of seconds that a watch waits before trying again when no machine can be connected-to. It doubles with every failure."
+
+WATCH_MAX_RECONNECT_BACKOFF_S = 30
+"Upper bound on the time that a watch waits before trying again to connect."
+
+WATCH_MUX_POLL_TIMEOUT_S = 10
+"Number of seconds that a multiplexed long-poll waits for, at most, before it's sent again (which is when a widened group starts watching its new directory)."
+
+DISPATCH_WORKERS = int(os.environ.get('PEC_DISPATCH_WORKERS', '4'))
+"Number of threads that a watch dispatcher runs callbacks on."
+
+DISPATCH_MAX_PENDING = 100
+"Number of changes that a watch dispatcher can queue for any one key."
+
+DISPATCH_POLICY = os.environ.get('PEC_DISPATCH_POLICY', 'coalesce')
+"What a watch dispatcher does when a key's queue is full: 'coalesce', 'drop_oldest', or 'block'."
+
+WATCH_BUFFER_SIZE = 100
+"Number of changes that an asyncio watch receives ahead of its iteration."
@@ -0,0 +1,81 @@
+"""Deadlines, so that a compound operation (like an atomic-update, or a 
+request that fails-over between machines) can be bounded as a whole rather 
+than only in each of its individual requests.
+"""
+
+import time
+
+from etcd.exceptions import EtcdTimeoutError
+
+
+class Deadline(object):
+    """A point in time by which an operation must finish.
+
+    :param timeout_s: Number of seconds from now
+    :type timeout_s: float
+    """
+
+    def __init__(self, timeout_s):
+        self.__timeout_s = timeout_s
+        self.__expires_at_s = time.time() + timeout_s
+
+    def __repr__(self):
+        return ('<DEADLINE TIMEOUT=(%.3f)s REMAINING=(%.3f)s>' % 
+                (self.__timeout_s, self.remaining_s))
+
+    def check(self, reason):
+        """Raise if the deadline has passed.
+
+        :param reason: Brief phrase describing what was being attempted
+        :type reason: string
+
+        :raises: :class:`etcd.exceptions.EtcdTimeoutError`
+        """
+
+        if self.is_expired is True:
+            raise EtcdTimeoutError("Deadline of (%.3f)s passed while trying "
+                                   "to %s." % (self.__timeout_s, reason))
+
+    def clip(self, timeout_s):
+        """Return the given timeout, shortened so that it doesn't go past the 
+        deadline.
+
+        :param timeout_s: Number of seconds, or None for no timeout.
+        :type timeout_s: float or None
+
+        :rtype: float
+        """
+
+        remaining_s = self.remaining_s
+        if timeout_s is None or timeout_s > remaining_s:
+            return remaining_s
+
+        return timeout_s
+
+    @property
+    def remaining_s(self):
+        return max(0.0, self.__expires_at_s - time.time())
+
+    @property
+    def is_expired(self):
+        return time.time() >= self.__expires_at_s
+
+    @property
+    def timeout_s(self):
+        return self.__timeout_s
+
+
+def get_deadline(timeout):
+    """Return the deadline for the given timeout, which may already be a 
+    deadline (passed down from a compound operation).
+
+    :param timeout: Number of seconds, a deadline, or None for no deadline.
+    :type timeout: float, :class:`Deadline`, or None
+
+    :rtype: :class:`Deadline` or None
+    """
+
+    if timeout is None or isinstance(timeout, Deadline) is True:
+        return timeout
+
+    return Deadline(timeout)
@@ -1,18 +1,72 @@
 from requests.exceptions import HTTPError
 from requests.status_codes import codes
 
-from etcd.exceptions import EtcdAlreadyExistsException, translate_exceptions
+import etcd.config
+import etcd.json_decode
+
+from etcd.exceptions import EtcdAlreadyExistsException, \
+                            translate_exceptions, set_error_indexes
 from etcd.common_ops import CommonOps
+from etcd.columns import ListingColumns
+from etcd.stream import iter_leaves
 
 # TODO(dustin): We may need a directory-specific version of 
 #               translate_exceptions. We'll see.
 
 
+def translate_create_error(path, e):
+    """Return the exception that should be raised in place of the HTTPError 
+    raised for a directory-create, or None if the original should be re-raised.
+
+    :param path: Key
+    :type path: string
+
+    :param e: The error raised for the response
+    :type e: requests.HTTPError
+
+    :rtype: Exception or None
+    """
+
+    if e.response.status_code == codes.forbidden:
+        try:
+            j = etcd.json_decode.decode_response(e.response)
+        except ValueError:
+            pass
+        else:
+# TODO(dustin): Complain about this error message.
+            # "message" == "Not a file"
+            if j['errorCode'] == 102:
+                return set_error_indexes(EtcdAlreadyExistsException(path), 
+                                         e.response)
+
+    return None
+
+
+def get_list_parameters(recursive, force_consistent, force_quorum):
+    """Build the query parameters of a directory listing.
+
+    :rtype: dictionary
+    """
+
+    parameters = {}
+    if recursive is True:
+        parameters['recursive'] = 'true'
+
+    if force_consistent is True:
+        parameters['consistent'] = 'true'
+
+    if force_quorum is True:
+        parameters['quorum'] = 'true'
+
+    return parameters
+
+
 class DirectoryOps(CommonOps):
     """Functions specific to directory management."""
 
     @translate_exceptions
-    def list(self, path, recursive=False, force_consistent=False, force_quorum=False):
+    def list(self, path, recursive=False, force_consistent=False, 
+             force_quorum=False, timeout=None):
         """Return a list of the nodes.
 
         :param recursive: Return all children, and children-of-children.
@@ -22,26 +76,83 @@ class DirectoryOps(CommonOps):
                                  propagation is not a concern.
         :type force_consistent: bool
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         fq_path = self.get_fq_node_path(path)
+        parameters = get_list_parameters(recursive, force_consistent, 
+                                         force_quorum)
 
-        parameters = {}
-        if recursive is True:
-            parameters['recursive'] = 'true'
+        return self.send(2, 'get', fq_path, parameters=parameters, 
+                         timeout=timeout)
 
-        if force_consistent is True:
-            parameters['consistent'] = 'true'
+    @translate_exceptions
+    def list_stream(self, path, recursive=True, force_consistent=False, 
+                    force_quorum=False, timeout=None, 
+                    chunk_size=etcd.config.STREAM_CHUNK_SIZE):
+        """Return the leaves (the nodes that aren't directories) of the 
+        directory as they're received, rather than once the whole listing has 
+        been received and parsed. No node objects are built, and memory use 
+        doesn't grow with the size of the listing.
+
+        The request is sent (and any error raised) immediately. *timeout* 
+        doesn't cover the time that it takes to consume the listing, but every 
+        read of the body is still subject to the client's read-timeout.
 
-        if force_quorum is True:
-            parameters['quorum'] = 'true'
+        :param recursive: Return all children, and children-of-children.
+        :type recursive: bool
 
-        return self.client.send(2, 'get', fq_path, parameters=parameters)
+        :param chunk_size: Number of bytes to read from the body at a time
+        :type chunk_size: int
+
+        :returns: Generator of (key, value, modified_index, ttl) tuples
+        :rtype: generator of :class:`etcd.stream.StreamedLeaf`
+        """
+
+        fq_path = self.get_fq_node_path(path)
+        parameters = get_list_parameters(recursive, force_consistent, 
+                                         force_quorum)
+
+        r = self.client.send(2, 'get', fq_path, parameters=parameters, 
+                             timeout=timeout, stream=True)
+
+        return iter_leaves(r, chunk_size)
+
+    @translate_exceptions
+    def list_columns(self, path, recursive=True, force_consistent=False, 
+                     force_quorum=False, timeout=None):
+        """Return the leaves (the nodes that aren't directories) of the 
+        directory as columns of keys, values, indexes, and expirations, 
+        without building any node objects.
+
+        :param recursive: Return all children, and children-of-children.
+        :type recursive: bool
+
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
+        :returns: Columns
+        :rtype: :class:`etcd.columns.ListingColumns`
+        """
+
+        fq_path = self.get_fq_node_path(path)
+        parameters = get_list_parameters(recursive, force_consistent, 
+                                         force_quorum)
+
+        r = self.client.send(2, 'get', fq_path, parameters=parameters, 
+                             timeout=timeout, return_raw=True)
+
+        return ListingColumns.from_decoded(
+                etcd.json_decode.decode_response(r))
 
     @translate_exceptions
-    def create(self, path, ttl=None):
+    def create(self, path, ttl=None, timeout=None):
         """A normal node-set will implicitly create directories on the way to 
         setting a value. This call exists for when you'd like to -explicitly- 
         create one.
@@ -54,6 +165,10 @@ class DirectoryOps(CommonOps):
         :param ttl: Time until removed
         :type ttl: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         :raises: EtcdAlreadyExistsException
@@ -66,23 +181,18 @@ class DirectoryOps(CommonOps):
             data['ttl'] = ttl
 
         try:
-            return self.client.send(2, 'put', fq_path, data=data)
+            return self.send(2, 'put', fq_path, data=data, 
+                             timeout=timeout)
         except HTTPError as e:
-            if e.response.status_code == codes.forbidden:
-                try:
-                    j = e.response.json()
-                except ValueError:
-                    pass
-                else:
-# TODO(dustin): Complain about this error message.
-                    # "message" == "Not a file"
-                    if j['errorCode'] == 102:
-                        raise EtcdAlreadyExistsException(path)
+            r = translate_create_error(path, e)
+            if r is not None:
+                raise r
 
             raise
 
     @translate_exceptions
-    def delete(self, path, current_value=None, current_index=None):
+    def delete(self, path, current_value=None, current_index=None, 
+               timeout=None):
         """Delete the given directory. It must be empty.
 
         :param path: Key
@@ -91,21 +201,27 @@ class DirectoryOps(CommonOps):
         :param current_index: Current index to check
         :type current_index: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         if current_index is not None:
             return self.compare_and_delete(path, is_dir=True, 
-                                           current_index=current_index)
+                                           current_index=current_index, 
+                                           timeout=timeout)
 
         fq_path = self.get_fq_node_path(path)
 
         parameters = { 'dir': 'true' }
-        return self.client.send(2, 'delete', fq_path, parameters=parameters)
+        return self.send(2, 'delete', fq_path, parameters=parameters, 
+                         timeout=timeout)
 
     @translate_exceptions
-    def delete_if_index(self, path, current_index):
+    def delete_if_index(self, path, current_index, timeout=None):
         """Only delete the given directory if the node is at the given index. 
         It must be empty.
 
@@ -115,15 +231,20 @@ class DirectoryOps(CommonOps):
         :param current_index: Current index to check
         :type current_index: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         return self.compare_and_delete(path, is_dir=True, 
-                                       current_index=current_index)
+                                       current_index=current_index, 
+                                       timeout=timeout)
 
     @translate_exceptions
-    def delete_recursive(self, path, current_index=None):
+    def delete_recursive(self, path, current_index=None, timeout=None):
         """Delete the given directory, along with any children.
 
         :param path: Key
@@ -132,21 +253,28 @@ class DirectoryOps(CommonOps):
         :param current_index: Current index to check
         :type current_index: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         if current_index is not None:
             return self.compare_and_delete(path, is_recursive=True,
-                                           current_index=current_index)
+                                           current_index=current_index, 
+                                           timeout=timeout)
 
         fq_path = self.get_fq_node_path(path)
 
         parameters = { 'dir': 'true', 'recursive': 'true' }
-        return self.client.send(2, 'delete', fq_path, parameters=parameters)
+        return self.send(2, 'delete', fq_path, parameters=parameters, 
+                         timeout=timeout)
 
     @translate_exceptions
-    def delete_recursive_if_index(self, path, current_index):
+    def delete_recursive_if_index(self, path, current_index, 
+                                  timeout=None):
         """Only delete the given directory (and its children) if the node is at 
         the given index. 
 
@@ -156,9 +284,14 @@ class DirectoryOps(CommonOps):
         :param current_index: Current index to check
         :type current_index: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         return self.compare_and_delete(path, is_recursive=True, 
-                                       current_index=current_index)
+                                       current_index=current_index, 
+                                       timeout=timeout)
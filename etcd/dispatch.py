@@ -0,0 +1,289 @@
+"""Delivery of watched changes to callbacks. One thread watches, and a fixed
+pool of workers runs the callbacks. The changes to any one key are handled in
+order, one at a time, while the changes to different keys are handled in
+parallel, so a slow callback only holds up the key that it's handling.
+"""
+
+import collections
+import logging
+import threading
+import time
+
+import etcd.config
+
+from etcd.multiplex import PrefixTrie
+from etcd.response import A_DELETE, A_CAD, A_EXPIRE
+from etcd.watch import Watcher
+
+_logger = logging.getLogger(__name__)
+
+POLICY_BLOCK = 'block'
+"Stop watching until the key's queue has room."
+
+POLICY_DROP_OLDEST = 'drop_oldest'
+"Drop the oldest change that's queued for the key."
+
+POLICY_COALESCE = 'coalesce'
+"Replace the changes that are queued for the key with the latest one."
+
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_COALESCE)
+
+
+class WatchDispatcher(object):
+    """Watches a node (or, recursively, a directory) and calls the callbacks
+    registered for the keys that change, on a pool of worker threads.
+
+    Every key has its own queue of changes, holding up to *max_pending*.
+    When the queue of a key is full, the policy applies: POLICY_COALESCE (the
+    default) replaces the queued changes with the latest one (a callback then
+    sees the latest state, if not every step), POLICY_DROP_OLDEST drops the
+    oldest change that's queued, and POLICY_BLOCK stops the watch until
+    there's room (so nothing is lost, but a slow callback on one key holds up
+    every other key). *dropped_count* counts the changes that were dropped.
+
+    A callback is given the :class:`etcd.watch.WatchEvent`. Whatever it
+    raises is logged.
+
+    :param client: Client instance
+    :type client: :class:`etcd.client.Client`
+
+    :param path: Key
+    :type path: string
+
+    :param recursive: Watch the descendants of the node.
+    :type recursive: bool
+
+    :param index: Index to watch from (see :class:`etcd.watch.Watcher`)
+    :type index: int or None
+
+    :param workers: Number of worker threads
+    :type workers: int
+
+    :param max_pending: Number of changes that can be queued for each key
+    :type max_pending: int
+
+    :param policy: POLICY_COALESCE, POLICY_DROP_OLDEST, or POLICY_BLOCK
+    :type policy: string
+
+    :param poll_timeout: Number of seconds that a single long-poll may wait
+                         for.
+    :type poll_timeout: float or None
+    """
+
+    def __init__(self, client, path, recursive=True, index=None,
+                 workers=etcd.config.DISPATCH_WORKERS,
+                 max_pending=etcd.config.DISPATCH_MAX_PENDING,
+                 policy=etcd.config.DISPATCH_POLICY, poll_timeout=None):
+        if policy not in POLICIES:
+            raise ValueError("Backpressure policy not supported: %s" %
+                             (policy,))
+
+        if workers < 1 or max_pending < 1:
+            raise ValueError("Workers and queue size must be at least one.")
+
+        self.__watcher = Watcher(client, path, recursive=recursive,
+                                 index=index, poll_timeout=poll_timeout)
+
+        self.__workers = workers
+        self.__max_pending = max_pending
+        self.__policy = policy
+
+        self.__condition = threading.Condition()
+        self.__trie = PrefixTrie()
+
+        # The changes that are queued, by key, and the keys that are either
+        # waiting for a worker or being handled by one.
+        self.__pending = {}
+        self.__ready = collections.deque()
+        self.__scheduled = set()
+
+        self.__dropped_count = 0
+        self.__threads = None
+        self.__is_stopped = False
+
+    def __repr__(self):
+        return ('<WATCH-DISPATCHER [%s] WORKERS=(%d) POLICY=[%s]>' %
+                (self.__watcher.path, self.__workers, self.__policy))
+
+    def add_callback(self, path, callback, recursive=False):
+        """Call the given callback for every change to a key (or,
+        recursively, to a directory).
+
+        :param path: Key
+        :type path: string
+
+        :param callback: Function that takes a
+                         :class:`etcd.watch.WatchEvent`
+        :type callback: callable
+
+        :param recursive: Include changes to the descendants.
+        :type recursive: bool
+        """
+
+        with self.__condition:
+            self.__trie.add(path, callback, recursive)
+
+    def remove_callback(self, path, callback):
+        """Stop calling a callback for a key. Changes that are already queued
+        are still handled.
+
+        :param path: Key
+        :type path: string
+
+        :param callback: The callback that was added
+        :type callback: callable
+        """
+
+        with self.__condition:
+            self.__trie.remove(path, callback)
+
+    def start(self):
+        """Start watching, and start the workers.
+
+        :returns: The dispatcher
+        :rtype: :class:`WatchDispatcher`
+        """
+
+        if self.__threads is not None:
+            raise ValueError("Dispatcher has already been started.")
+
+        path = self.__watcher.path
+        threads = [threading.Thread(target=self.__watch,
+                                    name='etcd-dispatch-watch-%s' % (path,))]
+
+        for i in range(self.__workers):
+            threads.append(threading.Thread(
+                            target=self.__work,
+                            name='etcd-dispatch-worker-%s-%d' % (path, i)))
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        self.__threads = threads
+        return self
+
+    def stop(self):
+        """Stop watching and discard the changes that are queued. Callbacks
+        that are running are allowed to finish, but the long-poll that's open
+        isn't waited for.
+        """
+
+        self.__watcher.close()
+
+        with self.__condition:
+            self.__is_stopped = True
+
+            self.__pending.clear()
+            self.__ready.clear()
+            self.__condition.notify_all()
+
+    def __watch(self):
+        watcher = self.__watcher
+
+        while self.__is_stopped is False:
+            try:
+                event = watcher.poll()
+            except Exception:
+                _logger.exception("Watch of [%s] failed.", watcher.path)
+                time.sleep(etcd.config.WATCH_RECONNECT_BACKOFF_S)
+                continue
+
+            if event is not None:
+                self.__dispatch(event)
+
+    def __dispatch(self, event):
+        node = event.node
+        is_removal = event.action in (A_DELETE, A_CAD, A_EXPIRE) and \
+                     node.is_directory is True
+
+        key = node.key
+
+        with self.__condition:
+            callbacks = self.__trie.match(key, is_removal)
+            if not callbacks:
+                return
+
+            while True:
+                if self.__is_stopped is True:
+                    return
+
+                queue_ = self.__pending.get(key)
+                if queue_ is None:
+                    queue_ = self.__pending[key] = collections.deque()
+
+                if len(queue_) < self.__max_pending:
+                    break
+
+                if self.__policy == POLICY_DROP_OLDEST:
+                    queue_.popleft()
+                    self.__dropped_count += 1
+                    break
+                elif self.__policy == POLICY_COALESCE:
+                    self.__dropped_count += len(queue_)
+                    queue_.clear()
+                    break
+
+                # POLICY_BLOCK
+                self.__condition.wait()
+
+            queue_.append((event, callbacks))
+
+            if key not in self.__scheduled:
+                self.__scheduled.add(key)
+                self.__ready.append(key)
+                self.__condition.notify_all()
+
+    def __work(self):
+        condition = self.__condition
+
+        while True:
+            with condition:
+                while not self.__ready and self.__is_stopped is False:
+                    condition.wait()
+
+                if self.__is_stopped is True:
+                    return
+
+                key = self.__ready.popleft()
+                (event, callbacks) = self.__pending[key].popleft()
+
+                # A dispatch that was blocked on this key may go ahead.
+                condition.notify_all()
+
+            for callback in callbacks:
+                try:
+                    callback(event)
+                except Exception:
+                    _logger.exception("Callback for [%s] failed: %s", key,
+                                      callback)
+
+            with condition:
+                queue_ = self.__pending.get(key)
+                if queue_:
+                    # The key's next change goes to the back of the line, so
+                    # that a busy key doesn't starve the others.
+                    self.__ready.append(key)
+                    condition.notify_all()
+                else:
+                    self.__pending.pop(key, None)
+                    self.__scheduled.discard(key)
+
+    @property
+    def dropped_count(self):
+        """Return the number of changes that were dropped (or coalesced)
+        because a key's queue was full.
+
+        :rtype: int
+        """
+
+        return self.__dropped_count
+
+    @property
+    def index(self):
+        """Return the index that the watch will report changes from.
+
+        :rtype: int or None
+        """
+
+        return self.__watcher.index
@@ -1,11 +1,20 @@
+import inspect
+
 import requests
 import requests.status_codes
 
+import etcd.json_decode
+import etcd.response
+
+_isawaitable = getattr(inspect, 'isawaitable', lambda o: False)
+
 
 class EtcdException(Exception):
-    """The base exception for the client."""
+    """The base exception for the client. If it stands for an error response, 
+    *indexes* has the indexes that the server reported with it.
+    """
 
-    pass
+    indexes = None
 
 
 class EtcdError(EtcdException):
@@ -38,29 +47,109 @@ class EtcdAtomicWriteError(EtcdError):
     pass
 
 
+class EtcdTimeoutError(EtcdError):
+    """Raised when a request, or an operation composed of several requests, 
+    doesn't finish within its timeout.
+    """
+
+    pass
+
+
+class EtcdIndexClearedError(EtcdError):
+    """Raised when the changes from the index that a wait asked for have 
+    already been cleared from the server's (limited) history.
+    """
+
+    pass
+
+
+class EtcdAllMachinesFailedError(EtcdError, SystemError):
+    """Raised when none of the machines could be connected-to for a request 
+    (every one of them was tried). It's a SystemError, as this used to be.
+    """
+
+    pass
+
+
+def set_error_indexes(error, r):
+    """Attach the indexes reported with an error response (as *indexes*) to 
+    the exception raised in its place.
+
+    :param error: Exception
+    :type error: Exception
+
+    :param r: Raw response
+    :type r: requests.models.Response
+
+    :returns: The exception
+    :rtype: Exception
+    """
+
+    error.indexes = etcd.response.get_response_indexes(r)
+    return error
+
+def translate_http_error(path, e):
+    """Return the exception that should be raised in place of the given 
+    HTTPError, or None if the original should be re-raised. The exception 
+    has the indexes reported with the response as *indexes* (even a 
+    KeyError).
+
+    :param path: Node key
+    :type path: string
+
+    :param e: The error raised for the response
+    :type e: requests.HTTPError
+
+    :rtype: Exception or None
+    """
+
+    # We're only concerned with generating KeyError's when appropriate.
+
+    if e.response.status_code == \
+            requests.status_codes.codes.precondition_failed:
+        return set_error_indexes(EtcdPreconditionException(), e.response)
+    elif e.response.status_code == \
+            requests.status_codes.codes.not_found:
+        try:
+            j = etcd.json_decode.decode_response(e.response)
+        except ValueError:
+            return None
+
+        if j['errorCode'] != 100:
+            return None
+
+        return set_error_indexes(KeyError(path), e.response)
+    elif e.response.status_code == \
+            requests.status_codes.codes.bad_request:
+        try:
+            j = etcd.json_decode.decode_response(e.response)
+        except ValueError:
+            return None
+
+        if j.get('errorCode') != 401:
+            return None
+
+        return set_error_indexes(EtcdIndexClearedError(j.get('message')), 
+                                 e.response)
+
+    return None
+
 def translate_exceptions(method):
    def op_wrapper(self, path, *args, **kwargs):
         try:
-            return method(self, path, *args, **kwargs)
+            result = method(self, path, *args, **kwargs)
         except requests.HTTPError as e:
-            # We're only concerned with generating KeyError's when appropriate.
-
-            if e.response.status_code == \
-                    requests.status_codes.codes.precondition_failed:
-                r = EtcdPreconditionException()
-            elif e.response.status_code == \
-                    requests.status_codes.codes.not_found:
-                try:
-                    j = e.response.json()
-                except ValueError:
-                    raise
-
-                if j['errorCode'] != 100:
-                    raise
-
-                r = KeyError(path)
-            else:
+            r = translate_http_error(path, e)
+            if r is None:
                 raise
+        else:
+            # The asyncio client returns a coroutine, which will only fail 
+            # once it's awaited.
+            if _isawaitable(result) is True:
+                from etcd.async_ops import translate_awaitable
+                return translate_awaitable(path, result)
+
+            return result
 
         raise r
 
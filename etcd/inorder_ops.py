@@ -22,7 +22,7 @@ class _InOrder(CommonOps):
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
-        return self.client.directory.create(self.__path)
+        return self.in_same_mode(self.client.directory).create(self.__path)
 
     def delete(self):
         """Delete the directory.
@@ -30,10 +30,12 @@ class _InOrder(CommonOps):
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
-        return self.client.directory.delete_recursive(self.__path)
+        return self.in_same_mode(self.client.directory).delete_recursive(
+                self.__path)
 
     def pop(self, name):
-        self.client.node.delete(self.__path + '/' + name)
+        return self.in_same_mode(self.client.node).delete(
+                self.__path + '/' + name)
 
     def add(self, value):
         """Add an in-order value.
@@ -48,7 +50,7 @@ class _InOrder(CommonOps):
 # TODO: Can we send a TTL?
 
         fq_path = self.get_fq_node_path(self.__path)
-        return self.client.send(2, 'post', fq_path, value=value)
+        return self.send(2, 'post', fq_path, value=value)
 
     def list(self, sorted=False):
         """Return a list of the inserted nodes.
@@ -64,7 +66,7 @@ class _InOrder(CommonOps):
         if sorted is True:
             parameters['sorted'] = 'true'
 
-        return self.client.send(2, 'get', self.__path, parameters=parameters)
+        return self.send(2, 'get', self.__path, parameters=parameters)
 
 
 class InOrderOps(CommonOps):
@@ -80,4 +82,4 @@ class InOrderOps(CommonOps):
         :rtype: :class:`etcd.inorder_ops._InOrder`
         """
 
-        return _InOrder(path, self.client)
+        return _InOrder(path, self.client, return_decoded=self.is_decoded)
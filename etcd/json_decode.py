@@ -0,0 +1,114 @@
+"""The one place that response bodies are decoded. The fastest JSON decoder
+that's installed is chosen at import-time (orjson, ujson, simplejson, and then
+the standard library), and bodies are decoded straight from the bytes that
+were received rather than from a decoded string.
+"""
+
+import importlib
+import logging
+
+import etcd.config
+
+_logger = logging.getLogger(__name__)
+
+DECODER_NAMES = ('orjson', 'ujson', 'simplejson', 'json')
+"The decoders that are looked for, fastest first."
+
+
+def _get_loads(name):
+    """Return the decode function of the given JSON library, or None if it's
+    not installed.
+
+    :param name: Module name
+    :type name: string
+
+    :rtype: callable or None
+    """
+
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        return None
+
+    return module.loads
+
+def _find_decoder(preferred=None):
+    """Return the name and decode function of the first decoder available.
+    The preferred one, if given and installed, comes first.
+
+    :rtype: tuple
+    """
+
+    names = DECODER_NAMES
+    if preferred:
+        if preferred not in DECODER_NAMES:
+            raise ValueError("JSON decoder not supported: %s" % (preferred))
+
+        names = (preferred,) + names
+
+    for name in names:
+        loads = _get_loads(name)
+        if loads is not None:
+            return (name, loads)
+
+_decoder_name, _loads = _find_decoder(etcd.config.JSON_DECODER)
+_logger.debug("Decoding JSON with: %s", _decoder_name)
+
+def get_decoder_name():
+    """Return the name of the decoder being used.
+
+    :rtype: string
+    """
+
+    return _decoder_name
+
+def set_decoder(loads, name=None):
+    """Replace the decoder. It will be given bytes and has to raise a
+    ValueError (or a subclass) for anything that it can't decode.
+
+    :param loads: Decode function
+    :type loads: callable
+
+    :param name: Name that identifies the decoder
+    :type name: string
+    """
+
+    global _decoder_name, _loads
+
+    if name is None:
+        name = getattr(loads, '__module__', None) or repr(loads)
+
+    _decoder_name = name
+    _loads = loads
+
+def decode(content):
+    """Decode a JSON body.
+
+    :param content: Body, as received
+    :type content: bytes
+
+    :returns: Decoded document
+    :rtype: dict
+
+    :raises: ValueError if the body isn't valid JSON (including when it's
+             empty).
+    """
+
+    if not content:
+        raise ValueError("Empty JSON document.")
+
+    return _loads(content)
+
+def decode_response(r):
+    """Decode the body of a response.
+
+    :param r: Response
+    :type r: requests.models.Response
+
+    :returns: Decoded document
+    :rtype: dict
+
+    :raises: ValueError if the body isn't valid JSON.
+    """
+
+    return decode(r.content)
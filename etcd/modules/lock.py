@@ -20,7 +20,17 @@ class _LockBase(object):
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.release()
 
-    def acquire(self):
+    def acquire(self, timeout=None):
+        """Block until the lock is acquired.
+
+        :param timeout: Number of seconds (or a deadline) to wait for the 
+                        lock. By default, the client's *wait_timeout_s* 
+                        applies.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
+        :raises: :class:`etcd.exceptions.EtcdTimeoutError`
+        """
+
         raise NotImplementedError()
 
     def renew(self, ttl):
@@ -54,7 +64,7 @@ class _Lock(_LockBase):
 
         self.__index = None
 
-    def acquire(self):
+    def acquire(self, timeout=None):
         self.client.debug("Acquiring lock: %s" % (self.path))
 
         parameters = { 'ttl': self.ttl }
@@ -65,7 +75,8 @@ class _Lock(_LockBase):
                                self.path, 
                                module='lock', 
                                parameters=parameters,
-                               return_raw=True)
+                               return_raw=True,
+                               timeout=timeout)
         except HTTPError as e:
           if e.response.status_code == codes.internal_server_error:
             self.client.debug("There was a server-error while trying to "
@@ -160,7 +171,7 @@ class _ReentrantLock(_LockBase):
 
         self.__instance_value = instance_value
 
-    def acquire(self):
+    def acquire(self, timeout=None):
         self.client.debug("Acquiring rlock [%s]: %s" % 
                           (self.__instance_value, self.path))
 
@@ -173,7 +184,8 @@ class _ReentrantLock(_LockBase):
                            module='lock', 
                            parameters=parameters,
                            value=self.__instance_value,
-                           return_raw=True)
+                           return_raw=True,
+                           timeout=timeout)
         except HTTPError as e:
           if e.response.status_code == codes.internal_server_error:
             self.client.debug("There was a server-error while trying to "
@@ -0,0 +1,538 @@
+"""Many watches over few long-polls. Subscriptions to keys (or, recursively,
+to directories) are grouped by their top-level directories, and every group
+is served by a single recursive watch of the deepest directory that all of
+its subscriptions share. Every change is routed to the subscriptions that it
+matches through a trie of path segments.
+"""
+
+import logging
+import threading
+
+import etcd.config
+
+from etcd.compat import queue
+from etcd.response import A_DELETE, A_CAD, A_EXPIRE
+from etcd.watch import Watcher, get_listing_index
+
+_logger = logging.getLogger(__name__)
+
+
+def split_path(path):
+    """Return the segments of a key.
+
+    :param path: Key
+    :type path: string
+
+    :rtype: tuple of string
+    """
+
+    return tuple([segment for segment in path.split('/') if segment])
+
+def join_path(segments):
+    """Return the key for the given segments.
+
+    :param segments: Path segments
+    :type segments: sequence of string
+
+    :rtype: string
+    """
+
+    return '/' + '/'.join(segments)
+
+def get_common_ancestor(paths):
+    """Return the deepest key that all of the given keys are (or are under).
+
+    :param paths: Keys
+    :type paths: iterable of string
+
+    :rtype: string
+    """
+
+    common = None
+    for path in paths:
+        segments = split_path(path)
+        if common is None:
+            common = segments
+            continue
+
+        i = 0
+        while i < len(common) and i < len(segments) and \
+              common[i] == segments[i]:
+            i += 1
+
+        common = common[:i]
+
+    return join_path(common or ())
+
+
+class _TrieNode(object):
+    __slots__ = ('children', 'exact', 'recursive')
+
+    def __init__(self):
+        self.children = {}
+
+        # The subscriptions to this key only, and to it and its descendants.
+        self.exact = set()
+        self.recursive = set()
+
+
+class PrefixTrie(object):
+    """Subscriptions, by the segments of their keys."""
+
+    def __init__(self):
+        self.__root = _TrieNode()
+
+    def add(self, path, subscription, recursive=False):
+        node = self.__root
+        for segment in split_path(path):
+            child = node.children.get(segment)
+            if child is None:
+                child = _TrieNode()
+                node.children[segment] = child
+
+            node = child
+
+        if recursive is True:
+            node.recursive.add(subscription)
+        else:
+            node.exact.add(subscription)
+
+    def remove(self, path, subscription):
+        segments = split_path(path)
+
+        trail = [self.__root]
+        for segment in segments:
+            try:
+                trail.append(trail[-1].children[segment])
+            except KeyError:
+                return
+
+        node = trail[-1]
+        node.exact.discard(subscription)
+        node.recursive.discard(subscription)
+
+        # Prune the nodes that no longer lead anywhere.
+        for i in range(len(segments) - 1, -1, -1):
+            node = trail[i + 1]
+            if node.children or node.exact or node.recursive:
+                break
+
+            del trail[i].children[segments[i]]
+
+    def match(self, path, include_descendants=False):
+        """Return the subscriptions that a change to the given key concerns:
+        the recursive ones to it or to any of its ancestors, the ones to it
+        exactly, and (for the deletion of a directory) the ones to any of its
+        descendants.
+
+        :param path: Key
+        :type path: string
+
+        :param include_descendants: Include the subscriptions to descendants.
+        :type include_descendants: bool
+
+        :rtype: set
+        """
+
+        matched = set()
+
+        node = self.__root
+        matched.update(node.recursive)
+
+        for segment in split_path(path):
+            node = node.children.get(segment)
+            if node is None:
+                return matched
+
+            matched.update(node.recursive)
+
+        matched.update(node.exact)
+
+        if include_descendants is True:
+            pending = list(node.children.values())
+            while pending:
+                node = pending.pop()
+                matched.update(node.exact)
+                matched.update(node.recursive)
+                pending.extend(node.children.values())
+
+        return matched
+
+
+class Subscription(object):
+    """The changes to a key (or, recursively, to a directory) that a
+    multiplexer has routed, in order. Iterate it, or call *get()*. If the
+    watch that serves it fails for good, the error is raised by both once the
+    changes before it have been taken.
+
+    :param multiplexer: The multiplexer that feeds it
+    :type multiplexer: :class:`WatchMultiplexer`
+
+    :param path: Key
+    :type path: string
+
+    :param recursive: Whether changes to descendants are included
+    :type recursive: bool
+
+    :param start_index: Index of the first change to report
+    :type start_index: int or None
+    """
+
+    def __init__(self, multiplexer, path, recursive, start_index=None):
+        self.__multiplexer = multiplexer
+        self.__path = path
+        self.__recursive = recursive
+
+        # The index of the next change to report. A watch that's rewound 
+        # repeats changes that were already reported.
+        self.__next_index = start_index
+        self.__queue = queue.Queue()
+        self.__is_closed = False
+        self.__error = None
+
+    def __repr__(self):
+        return ('<SUBSCRIPTION [%s] RECURSIVE=[%s]>' %
+                (self.__path, self.__recursive))
+
+    def __iter__(self):
+        while self.__is_closed is False:
+            event = self.__queue.get()
+            if event is None:
+                self.__raise_error()
+                break
+
+            yield event
+
+    def __raise_error(self):
+        if self.__error is not None:
+            # Leave the marker for whoever asks next.
+            self.__queue.put(None)
+            raise self.__error
+
+    def deliver(self, event):
+        """Queue a change. It's called by the multiplexer.
+
+        :param event: Change
+        :type event: :class:`etcd.watch.WatchEvent`
+        """
+
+        # Synthetic changes always count (a delete carries the last node that 
+        # was known).
+        if event.is_synthetic is False:
+            modified_index = event.node.modified_index
+            if self.__next_index is not None and \
+               modified_index < self.__next_index:
+                return
+
+            self.__next_index = modified_index + 1
+
+        self.__queue.put(event)
+
+    def get(self, timeout=None):
+        """Return the next change.
+
+        :param timeout: Number of seconds to wait for
+        :type timeout: float or None
+
+        :returns: The change, or None if there wasn't one in time (or the
+                  subscription was closed).
+        :rtype: :class:`etcd.watch.WatchEvent` or None
+        """
+
+        if self.__is_closed is True:
+            return None
+
+        try:
+            event = self.__queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        if event is None:
+            self.__raise_error()
+
+        return event
+
+    def fail(self, error):
+        """End the subscription with an error. It's called by the 
+        multiplexer when the watch can't go on.
+
+        :param error: The error that the watch raised
+        :type error: Exception
+        """
+
+        self.__error = error
+        self.__queue.put(None)
+
+    def close(self):
+        """Unsubscribe. Anything that's iterating it stops."""
+
+        if self.__is_closed is True:
+            return
+
+        self.__multiplexer.unsubscribe(self)
+
+        self.__is_closed = True
+        self.__queue.put(None)
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def recursive(self):
+        return self.__recursive
+
+
+class _WatchGroup(object):
+    """The subscriptions under one top-level directory, and the thread that
+    watches for all of them.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.paths = {}
+        self.path = None
+        self.thread = None
+
+        # The index that the watch has to (re)start from, at the latest, for 
+        # the subscriptions that were made since it started.
+        self.index = None
+
+
+class WatchMultiplexer(object):
+    """Serves any number of subscriptions to keys (and, recursively, to
+    directories) with one long-poll (and one thread) for every top-level
+    directory that they're under, rather than one for each.
+
+    Each group's watch is of the deepest directory that all of its
+    subscriptions share. Every subscription starts from the index that a
+    consistent read of its key shows. When a subscription is made, the
+    group's watch is restarted once its current long-poll ends (so, within
+    *poll_timeout*), from that index or from the index that it had reached,
+    whichever is earlier, and on the wider directory if the subscription is
+    outside of the current one. So no change is missed, and the changes that
+    are seen again aren't reported twice. The watches resync themselves like
+    :class:`etcd.watch.Watcher`.
+
+    :param client: Client instance
+    :type client: :class:`etcd.client.Client`
+
+    :param root_depth: Number of path segments that the subscriptions are
+                       grouped by
+    :type root_depth: int
+
+    :param poll_timeout: Number of seconds that a single long-poll may wait
+                         for.
+    :type poll_timeout: float
+    """
+
+    def __init__(self, client, root_depth=1,
+                 poll_timeout=etcd.config.WATCH_MUX_POLL_TIMEOUT_S):
+        self.__client = client
+        self.__root_depth = root_depth
+        self.__poll_timeout = poll_timeout
+
+        self.__lock = threading.Lock()
+        self.__trie = PrefixTrie()
+        self.__groups = {}
+        self.__is_closed = False
+
+    def __repr__(self):
+        return ('<WATCH-MULTIPLEXER GROUPS=(%d)>' % (len(self.__groups)))
+
+    def subscribe(self, path, recursive=False):
+        """Subscribe to the changes to a key (or, recursively, to a
+        directory) from now on. "Now" is the index that a consistent read of
+        the key shows, so this sends a request.
+
+        :param path: Key
+        :type path: string
+
+        :param recursive: Include changes to the descendants.
+        :type recursive: bool
+
+        :rtype: :class:`Subscription`
+
+        :raises: Whatever the read raises, other than KeyError.
+        """
+
+        self.__client.node.validate_path(path)
+
+        start_index = self.__read_index(path)
+
+        subscription = Subscription(self, path, recursive, start_index)
+        root = join_path(split_path(path)[:self.__root_depth])
+
+        with self.__lock:
+            if self.__is_closed is True:
+                raise ValueError("Multiplexer is closed.")
+
+            self.__trie.add(path, subscription, recursive)
+
+            group = self.__groups.get(root)
+            if group is None:
+                group = self.__groups[root] = _WatchGroup(root)
+
+            # The watch starts from the read (rather than from whenever its 
+            # next long-poll is sent), or from before it.
+            if group.index is None or \
+               (start_index is not None and start_index < group.index):
+                group.index = start_index
+
+            group.paths[subscription] = path
+            group.path = get_common_ancestor(group.paths.values())
+
+            if group.thread is None:
+                group.thread = threading.Thread(
+                                target=self.__watch,
+                                args=(group,),
+                                name='etcd-watch-%s' % (root,))
+
+                group.thread.daemon = True
+                group.thread.start()
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Drop a subscription. A group without any subscriptions left stops
+        watching once its current long-poll ends.
+
+        :param subscription: Subscription
+        :type subscription: :class:`Subscription`
+        """
+
+        path = subscription.path
+        root = join_path(split_path(path)[:self.__root_depth])
+
+        with self.__lock:
+            self.__trie.remove(path, subscription)
+
+            group = self.__groups.get(root)
+            if group is None or group.paths.pop(subscription, None) is None:
+                return
+
+            if group.paths:
+                group.path = get_common_ancestor(group.paths.values())
+            else:
+                group.path = None
+                del self.__groups[root]
+
+    def close(self):
+        """Drop every subscription."""
+
+        with self.__lock:
+            self.__is_closed = True
+            subscriptions = [subscription
+                             for group
+                             in self.__groups.values()
+                             for subscription
+                             in group.paths]
+
+        for subscription in subscriptions:
+            subscription.close()
+
+    def __read_index(self, path):
+        """Return the index that follows the state that a consistent read of 
+        the key sees.
+        """
+
+        try:
+            r = self.__client.node.get(path, force_consistent=True)
+        except KeyError as e:
+            listed = {}
+
+            indexes = getattr(e, 'indexes', None)
+            etcd_index = indexes.etcd_index if indexes is not None else None
+        else:
+            listed = { r.node.key: r.node }
+            etcd_index = r.etcd_index
+
+        return get_listing_index(listed, etcd_index)
+
+    def __watch(self, group):
+        watcher = None
+
+        while True:
+            with self.__lock:
+                path = group.path
+                rewind_index = group.index
+                group.index = None
+
+            if path is None:
+                break
+
+            if watcher is None or watcher.path != path or \
+               rewind_index is not None:
+                # The next watch carries on from wherever this one got to, 
+                # unless a new subscription started before that.
+                index = watcher.index if watcher is not None else None
+                if index is None or \
+                   (rewind_index is not None and rewind_index < index):
+                    index = rewind_index
+
+                _logger.debug("Watching [%s] from index (%s) for group "
+                              "[%s].", path, index, group.root)
+
+                watcher = Watcher(self.__client, path, recursive=True,
+                                  index=index,
+                                  poll_timeout=self.__poll_timeout)
+
+            try:
+                event = watcher.poll()
+            except Exception as e:
+                # The watcher rides out whatever is transient (timeouts, 
+                # machines that are down, and cleared history), so this won't 
+                # go away by trying again.
+                _logger.exception("Watch of [%s] failed.", path)
+
+                self.__fail_group(group, e)
+                return
+
+            if event is not None:
+                self.__route(event)
+
+        _logger.debug("Group [%s] has no subscriptions left.", group.root)
+
+    def __fail_group(self, group, error):
+        """Drop the subscriptions of a group whose watch can't go on, and 
+        hand them the error.
+        """
+
+        with self.__lock:
+            subscriptions = list(group.paths)
+
+            for subscription in subscriptions:
+                self.__trie.remove(subscription.path, subscription)
+
+            group.paths.clear()
+            group.path = None
+
+            if self.__groups.get(group.root) is group:
+                del self.__groups[group.root]
+
+        for subscription in subscriptions:
+            subscription.fail(error)
+
+    def __route(self, event):
+        node = event.node
+        is_removal = event.action in (A_DELETE, A_CAD, A_EXPIRE) and \
+                     node.is_directory is True
+
+        with self.__lock:
+            subscriptions = self.__trie.match(node.key, is_removal)
+
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    @property
+    def group_paths(self):
+        """Return the directory that each group is watching, by top-level
+        directory.
+
+        :rtype: dictionary
+        """
+
+        with self.__lock:
+            return dict([(root, group.path)
+                         for (root, group)
+                         in self.__groups.items()])
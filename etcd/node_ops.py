@@ -8,16 +8,36 @@ import etcd.config
 from etcd.exceptions import EtcdPreconditionException, EtcdAtomicWriteError, \
                             translate_exceptions
 from etcd.common_ops import CommonOps
-from etcd.response import ResponseV2 
+from etcd.response import ResponseV2, DecodedResponse
+from etcd.deadline import get_deadline
 
 _logger = logging.getLogger(__name__)
 
 
+def get_value_and_index(response):
+    """Return the value and the modified-index of the node of a response, in 
+    either of the modes that the calls can return it in.
+
+    :param response: Response
+    :type response: :class:`etcd.response.ResponseV2` or 
+                    :class:`etcd.response.DecodedResponse`
+
+    :rtype: tuple
+    """
+
+    if isinstance(response, DecodedResponse) is True:
+        node = response.raw_response['node']
+        return (node['value'], node['modifiedIndex'])
+
+    return (response.node.value, response.node.modified_index)
+
+
 class NodeOps(CommonOps):
     """Common key-value functions."""
 
     @translate_exceptions
-    def get(self, path, force_consistent=False, force_quorum=False):
+    def get(self, path, force_consistent=False, force_quorum=False, 
+            timeout=None):
         """Get the given node.
 
         :param path: Node key
@@ -27,6 +47,10 @@ class NodeOps(CommonOps):
                                  propagation is not a concern.
         :type force_consistent: bool
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
 
@@ -41,10 +65,11 @@ class NodeOps(CommonOps):
             parameters['quorum'] = 'true'
 
         fq_path = self.get_fq_node_path(path)
-        return self.client.send(2, 'get', fq_path, parameters=parameters)
+        return self.send(2, 'get', fq_path, parameters=parameters, 
+                         timeout=timeout)
 
     @translate_exceptions
-    def set(self, path, value, ttl=None):
+    def set(self, path, value, ttl=None, timeout=None):
         """Set the given node.
 
         :param path: Node key
@@ -56,6 +81,10 @@ class NodeOps(CommonOps):
         :param ttl: Number of seconds until expiration
         :type ttl: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
@@ -66,10 +95,60 @@ class NodeOps(CommonOps):
         if ttl is not None:
             data['ttl'] = ttl
 
-        return self.client.send(2, 'put', fq_path, value, data=data)
+        return self.send(2, 'put', fq_path, value, data=data, 
+                         timeout=timeout)
+
+    def get_bytes(self, path, force_consistent=False, force_quorum=False, 
+                  timeout=None):
+        """Get the value of the given node as bytes, decoding it with the 
+        client's value codec.
+
+        :param path: Node key
+        :type path: string
+
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
+        :returns: Value
+        :rtype: bytes
+
+        :raises: KeyError
+        """
+
+        response = self.get(path, force_consistent=force_consistent, 
+                            force_quorum=force_quorum, timeout=timeout)
+
+        (value, _) = get_value_and_index(response)
+        return self.client.value_codec.decode(value)
+
+    def set_bytes(self, path, value, ttl=None, timeout=None):
+        """Set the given node to a binary value, encoding it with the 
+        client's value codec.
+
+        :param path: Node key
+        :type path: string
+
+        :param value: Value to assign
+        :type value: bytes, bytearray, or memoryview
+
+        :param ttl: Number of seconds until expiration
+        :type ttl: int or None
+
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
+        :returns: Response object
+        :rtype: :class:`etcd.response.ResponseV2`
+        """
+
+        return self.set(path, self.client.value_codec.encode(value), ttl=ttl, 
+                        timeout=timeout)
 
     @translate_exceptions
-    def delete(self, path, current_value=None, current_index=None):
+    def delete(self, path, current_value=None, current_index=None, 
+               timeout=None):
         """Delete the given node.
 
         :param path: Node key
@@ -81,6 +160,10 @@ class NodeOps(CommonOps):
         :param current_index: Current index to check
         :type current_index: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
@@ -88,13 +171,14 @@ class NodeOps(CommonOps):
         if current_value is not None or current_index is not None:
             return self.compare_and_delete(path, is_dir=False, 
                                            current_value=current_value, 
-                                           current_index=current_index)
+                                           current_index=current_index, 
+                                           timeout=timeout)
 
         fq_path = self.get_fq_node_path(path)
-        return self.client.send(2, 'delete', fq_path)
+        return self.send(2, 'delete', fq_path, timeout=timeout)
 
     @translate_exceptions
-    def delete_if_value(self, path, current_value):
+    def delete_if_value(self, path, current_value, timeout=None):
         """Only delete the given node if it's at the given value. 
 
         :param path: Key
@@ -103,15 +187,20 @@ class NodeOps(CommonOps):
         :param current_value: Current value to check
         :type current_value: string
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         return self.compare_and_delete(path, is_dir=False, 
-                                       current_value=current_value)
+                                       current_value=current_value, 
+                                       timeout=timeout)
 
     @translate_exceptions
-    def delete_if_index(self, path, current_index):
+    def delete_if_index(self, path, current_index, timeout=None):
         """Only delete the given node if it's at the given index. 
 
         :param path: Key
@@ -120,16 +209,22 @@ class NodeOps(CommonOps):
         :param current_index: Current index to check
         :type current_index: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         return self.compare_and_delete(path, is_dir=False, 
-                                       current_index=current_index)
+                                       current_index=current_index, 
+                                       timeout=timeout)
 
     @translate_exceptions
     def compare_and_swap(self, path, value, current_value=None, 
-                         current_index=None, prev_exists=None, ttl=None):
+                         current_index=None, prev_exists=None, ttl=None, 
+                         timeout=None):
         """The base compare-and-swap function for atomic comparisons. A  
         combination of criteria may be used if necessary.
 
@@ -151,6 +246,10 @@ class NodeOps(CommonOps):
         :param ttl: The number of seconds until the node expires
         :type ttl: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
 
@@ -173,16 +272,16 @@ class NodeOps(CommonOps):
                                              else 'false'
 
         if not parameters:
-            return self.set(path, value, ttl=ttl)
+            return self.set(path, value, ttl=ttl, timeout=timeout)
 
         if ttl is not None:
             data['ttl'] = ttl
 
-        return self.client.send(2, 'put', fq_path, value, data=data, 
-                                parameters=parameters)
+        return self.send(2, 'put', fq_path, value, data=data, 
+                         parameters=parameters, timeout=timeout)
 
     @translate_exceptions
-    def create_only(self, path, value, ttl=None):
+    def create_only(self, path, value, ttl=None, timeout=None):
         """A convenience function that will only set a node if it doesn't 
         already exist.
 
@@ -195,15 +294,20 @@ class NodeOps(CommonOps):
         :param ttl: The number of seconds until the node expires
         :type ttl: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         # This will have a return "action" of "create".
-        return self.compare_and_swap(path, value, prev_exists=False, ttl=ttl)
+        return self.compare_and_swap(path, value, prev_exists=False, ttl=ttl, 
+                                     timeout=timeout)
 
     @translate_exceptions
-    def update_only(self, path, value, ttl=None):
+    def update_only(self, path, value, ttl=None, timeout=None):
         """A convenience function that will only set a node if it already
         exists.
 
@@ -216,15 +320,21 @@ class NodeOps(CommonOps):
         :param ttl: The number of seconds until the node expires
         :type ttl: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         # This will have a return "action" of "update".
-        return self.compare_and_swap(path, value, prev_exists=True, ttl=ttl)
+        return self.compare_and_swap(path, value, prev_exists=True, ttl=ttl, 
+                                     timeout=timeout)
 
     @translate_exceptions
-    def update_if_index(self, path, value, current_index, ttl=None):
+    def update_if_index(self, path, value, current_index, ttl=None, 
+                        timeout=None):
         """A convenience function that will only set a node if its existing
         "modified index" matches.
 
@@ -240,15 +350,21 @@ class NodeOps(CommonOps):
         :param ttl: The number of seconds until the node expires
         :type ttl: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         # This will have a return "action" of "compareAndSwap".
-        return self.compare_and_swap(path, value, current_index=current_index, ttl=ttl)
+        return self.compare_and_swap(path, value, current_index=current_index, 
+                                     ttl=ttl, timeout=timeout)
 
     @translate_exceptions
-    def update_if_value(self, path, value, current_value, ttl=None):
+    def update_if_value(self, path, value, current_value, ttl=None, 
+                        timeout=None):
         """A convenience function that will only set a node if its existing value
         matches.
 
@@ -264,42 +380,64 @@ class NodeOps(CommonOps):
         :param ttl: The number of seconds until the node expires
         :type ttl: int or None
 
+        :param timeout: Number of seconds (or a deadline) to finish within, 
+                        including any fail-over.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
         :returns: Response object
         :rtype: :class:`etcd.response.ResponseV2`
         """
 
         # This will have a return "action" of "compareAndSwap".
-        return self.compare_and_swap(path, value, current_value=current_value, ttl=ttl)
+        return self.compare_and_swap(path, value, current_value=current_value, 
+                                     ttl=ttl, timeout=timeout)
 
     @translate_exceptions
-    def wait(self, path, force_consistent=False):
-        return super(NodeOps, self).wait(path, force_consistent=force_consistent)
+    def wait(self, path, force_consistent=False, timeout=None):
+        return super(NodeOps, self).wait(path, 
+                                         force_consistent=force_consistent, 
+                                         timeout=timeout)
 
     @translate_exceptions
     def atomic_update(self, path, update_value_cb,
-                      max_attempts=etcd.config.ATOMIC_MAX_ATTEMPTS, ttl=None):
+                      max_attempts=etcd.config.ATOMIC_MAX_ATTEMPTS, ttl=None, 
+                      timeout=None):
         """Retrieve the value for the given path, pass it to the callback, get 
         an update value back, and try updating. Loop until the update can be 
-        performed atomically.
+        performed atomically. If an update fails in a way that doesn't show 
+        whether it was applied (a timeout or a server-error), the error is 
+        raised rather than trying again, so that the update is never applied 
+        twice.
 
         :param path: Node key
         :type path: string
 
         :param update_value_cb: Callback
         :type update_value_cb: callback
+
+        :param timeout: Number of seconds (or a deadline) that all of the 
+                        attempts must finish within.
+        :type timeout: float or :class:`etcd.deadline.Deadline` or None
+
+        :raises: :class:`etcd.exceptions.EtcdAtomicWriteError`, 
+                 :class:`etcd.exceptions.EtcdTimeoutError`
         """
 
+        deadline = get_deadline(timeout)
+
         i = max_attempts
         while i > 0:
-            response = self.get(path)
-            value = update_value_cb(response.node.value)
+            response = self.get(path, timeout=deadline)
+            (current_value, modified_index) = get_value_and_index(response)
+            value = update_value_cb(current_value)
 
             try:
                 return self.update_if_index(
                         path, 
                         value, 
-                        response.node.modified_index, 
-                        ttl=ttl)
+                        modified_index, 
+                        ttl=ttl, 
+                        timeout=deadline)
             except EtcdPreconditionException:
                 pass
 
@@ -1,12 +1,9 @@
-import pytz
-import simplejson
-
 import etcd.exceptions
+import etcd.json_decode
+import etcd.rfc3339
 
 from collections import namedtuple
 from os.path import basename
-from pytz import timezone
-from datetime import datetime, timedelta
 
 A__PREVNODE = '_(pnode)'
 
@@ -17,78 +14,152 @@ A_CREATE = 'create'
 A_DELETE = 'delete'
 A_CAS = 'compareAndSwap'
 A_CAD = 'compareAndDelete'
+A_EXPIRE = 'expire'
+
+SORT_CREATED_INDEX = 'created_index'
+SORT_MODIFIED_INDEX = 'modified_index'
+
+# Distinguishes an attribute that hasn't been derived yet from one that was 
+# derived as None.
+_UNSET = object()
+
+ResponseIndexes = namedtuple('ResponseIndexes', 
+                             ['etcd_index', 'raft_index', 'raft_term'])
+
+
+def _get_header_int(headers, name):
+    value = headers.get(name)
+    return int(value) if value is not None else None
+
+def _get_header_indexes(headers):
+    return ResponseIndexes(
+            etcd_index=_get_header_int(headers, 'X-Etcd-Index'),
+            raft_index=_get_header_int(headers, 'X-Raft-Index'),
+            raft_term=_get_header_int(headers, 'X-Raft-Term'))
+
+def get_response_indexes(r):
+    """Return the indexes that the server reported in the headers of a 
+    response (whether or not it was successful). The etcd-index is the index 
+    of the latest change in the cluster as of the response, so a watch that 
+    starts right after it misses nothing.
+
+    :param r: Raw response
+    :type r: requests.models.Response
+
+    :returns: Indexes (each None if not reported)
+    :rtype: :class:`ResponseIndexes`
+    """
+
+    return _get_header_indexes(r.headers)
+
+
+DecodedResponse = namedtuple('DecodedResponse', 
+                             ['raw_response', 'indexes', 'retry_count'])
+
+
+def _decode_body(response):
+    content = response.content
+
+    # Bug #1120: Wait will timeout with a JSON-message of zero-length.
+    if not content:
+        raise etcd.exceptions.EtcdEmptyResponseError()
+
+    return etcd.json_decode.decode(content)
+
+def build_decoded_response(response, retry_count=0):
+    """Decode a response without building any node objects.
 
-def _build_node_object(action, node):
+    :param response: Raw Requests response object
+    :type response: requests.models.Response
+
+    :param retry_count: Number of times that the request was retried
+    :type retry_count: int
+
+    :returns: Decoded document, the indexes reported with it, and the 
+              number of retries
+    :rtype: :class:`DecodedResponse`
+    """
+
+    return DecodedResponse(raw_response=_decode_body(response), 
+                           indexes=get_response_indexes(response), 
+                           retry_count=retry_count)
+
+def _build_node_object(action, node, keep_raw=True, interned=None):
     if 'dir' not in node:
         node['dir'] = False
 
     if node['dir'] == True:
-        if action in (A_DELETE, A_CAD):
-            return ResponseV2DeletedDirectoryNode(action, node)
+        if action in (A_DELETE, A_CAD, A_EXPIRE):
+            return ResponseV2DeletedDirectoryNode(action, node, keep_raw, 
+                                                  interned)
 # TODO: Specifically, what actions can happen for a DIRECTORY?
         else:
-            return ResponseV2AliveDirectoryNode(action, node)
+            return ResponseV2AliveDirectoryNode(action, node, keep_raw, 
+                                                interned)
     else:
-        if action in (A_DELETE, A_CAD):
-            return ResponseV2DeletedNode(action, node)
+        if action in (A_DELETE, A_CAD, A_EXPIRE):
+            return ResponseV2DeletedNode(action, node, keep_raw, interned)
 # TODO: Specifically, what actions can happen for a non-directory?
         else:
-            return ResponseV2AliveNode(action, node)
+            return ResponseV2AliveNode(action, node, keep_raw, interned)
 
 
 class ResponseV2BasicNode(object):
-    """Base-class representing all nodes: deleted, alive, or a collection.
+    """Base-class representing all nodes: deleted, alive, or a collection. 
+    Nothing is parsed until it's asked for, so a caller only pays for the 
+    attributes that it reads.
+
+    The node classes have no per-instance dictionary. When *keep_raw* is 
+    False, the node dictionary isn't kept either (*raw_node* is None): only 
+    the key, indexes, value, and TTL are, and the key is stored as its 
+    parent's path (shared by all of the siblings, through *interned*) and its 
+    name.
 
     :param action: Action type
     :param node: Node dictionary
+    :param keep_raw: Whether to keep the node dictionary as *raw_node*
+    :param interned: Parent paths already stored by other nodes of the same 
+                     response, by themselves.
 
     :type action: string
     :type node: dictionary
+    :type keep_raw: bool
+    :type interned: dictionary or None
 
     :returns: Response object
     :rtype: etcd.response.ResponseV2
     """
 
-    def __init__(self, action, node):
+    __slots__ = ('action', 'raw_node', 'created_index', 'modified_index', 
+                 'ttl', '__key_parent', '__key_name', '__expiration_phrase', 
+                 '__is_hidden', '__expiration')
+
+    def __init__(self, action, node, keep_raw=True, interned=None):
         self.action = action
-        self.raw_node = node
         self.created_index = node['createdIndex']
         self.modified_index = node['modifiedIndex']
-        self.key = node['key']
+        self.ttl = node.get('ttl')
 
-        # This is as involved as we'll get with whether nodes are hidden. Any 
-        # more, and we'd have to manage and, therefore, translate every key 
-        # reported by the server.
-        self.is_hidden = basename(node['key']).startswith('_')
+        self.__expiration_phrase = node.get('expiration')
+        self.__is_hidden = None
+        self.__expiration = _UNSET
 
-        # >> Process TTL-related stuff. 
-
-        try:
-            expiration = node['expiration']
-        except KeyError:
-            self.expiration = None
-            self.ttl = None
-            self.ttl_phrase = 'None'
+        if keep_raw is True:
+            self.raw_node = node
         else:
-            self.ttl = node['ttl']
-
-            first_part = expiration[:19]
-            naive_dt = datetime.strptime(first_part, '%Y-%m-%dT%H:%M:%S')
-            tz_offset_hours = int(expiration[-5:-3])
-            tz_offset_minutes = int(expiration[-2:])
+            self.raw_node = None
 
-            tz_offset = timedelta(seconds=(tz_offset_hours * 60 * 60 + 
-                                           tz_offset_minutes * 60))
+            key = node['key']
+            i = key.rfind('/') + 1
 
-            self.expiration = (naive_dt + tz_offset).replace(tzinfo=pytz.UTC)
-            self.ttl_phrase = ('%d: %s' % (self.ttl, self.expiration))
+            parent = key[:i]
+            if interned is not None:
+                parent = interned.setdefault(parent, parent)
 
-        # <<
+            self.__key_parent = parent
+            self.__key_name = key[i:]
 
-        try:
-            self.initialize(node)
-        except NotImplementedError:
-            pass
+        self.initialize(node)
 
     def initialize(self, node):
         """This function acts as the constructor for subclasses.
@@ -97,7 +168,7 @@ class ResponseV2BasicNode(object):
         :type node: dictionary
         """
 
-        raise NotImplementedError()
+        pass
 
     def __repr__(self):
         return ('<NODE(%s) [%s] [%s] IS_HID=[%s] IS_DEL=[%s] IS_DIR=[%s] '
@@ -107,6 +178,52 @@ class ResponseV2BasicNode(object):
                  self.is_collection, self.ttl_phrase, self.created_index, 
                  self.modified_index))
 
+    @property
+    def key(self):
+        if self.raw_node is not None:
+            return self.raw_node['key']
+
+        return self.__key_parent + self.__key_name
+
+    @property
+    def is_hidden(self):
+        """Is the node hidden (its name starts with an underscore)?
+
+        :rtype: bool
+        """
+
+        # This is as involved as we'll get with whether nodes are hidden. Any 
+        # more, and we'd have to manage and, therefore, translate every key 
+        # reported by the server.
+
+        if self.__is_hidden is None:
+            self.__is_hidden = basename(self.key).startswith('_')
+
+        return self.__is_hidden
+
+    @property
+    def expiration(self):
+        """Return when the node expires.
+
+        :rtype: datetime.datetime or None
+        """
+
+        if self.__expiration is _UNSET:
+            if self.__expiration_phrase is None:
+                self.__expiration = None
+            else:
+                self.__expiration = \
+                    etcd.rfc3339.parse(self.__expiration_phrase)
+
+        return self.__expiration
+
+    @property
+    def ttl_phrase(self):
+        if self.expiration is None:
+            return 'None'
+
+        return ('%d: %s' % (self.ttl, self.expiration))
+
     @property
     def is_deleted(self):
         """Is the node deleted?
@@ -139,13 +256,29 @@ class ResponseV2BasicNode(object):
 class ResponseV2AliveNode(ResponseV2BasicNode):
     "Base-class representing a single, non-deleted node."
 
+    __slots__ = ('value',)
+
     def initialize(self, node):
         self.value = node['value']
 
+    def get_bytes(self, codec):
+        """Return the value as bytes.
+
+        :param codec: Transport encoding that the value was stored with (see 
+                      :attr:`etcd.client.Client.value_codec`)
+        :type codec: :class:`etcd.codec.ValueCodec`
+
+        :rtype: bytes
+        """
+
+        return codec.decode(self.value)
+
 
 class ResponseV2DeletedNode(ResponseV2BasicNode):
     "Represents a single, deleted node."
 
+    __slots__ = ()
+
     @property
     def is_deleted(self):
         return True
@@ -154,6 +287,8 @@ class ResponseV2DeletedNode(ResponseV2BasicNode):
 class ResponseV2DirectoryNode(ResponseV2BasicNode):
     """A base-class representing a single directory node."""
 
+    __slots__ = ()
+
     @property
     def is_directory(self):
         return True
@@ -161,21 +296,49 @@ class ResponseV2DirectoryNode(ResponseV2BasicNode):
 
 class ResponseV2AliveDirectoryNode(ResponseV2DirectoryNode):
     """Represents a directory node, which may also be accompanied by children 
-    that can be enumerated.
+    that can be enumerated. The children are built once, when they're first 
+    asked for (or right away, if the node dictionary isn't being kept, so 
+    that their dictionaries aren't kept either). They can then be enumerated, 
+    counted with len(), looked-up by key, and sorted, any number of times.
     """
 
-    def initialize(self, node):
+    __slots__ = ('__is_collection', '__raw_nodes', '__children', 
+                 '__children_by_key', '__sorted_children')
+
+    def __init__(self, action, node, keep_raw=True, interned=None):
         if node.get('dir', False) is True:
             self.__is_collection = True
-            self.__raw_nodes = node.get('nodes', [])
+            raw_nodes = node.get('nodes', [])
         else:
             self.__is_collection = False
+            raw_nodes = None
+
+        self.__children_by_key = None
+        self.__sorted_children = {}
+
+        if keep_raw is True or raw_nodes is None:
+            self.__raw_nodes = raw_nodes
+            self.__children = None
+        else:
+            if interned is None:
+                interned = {}
+
             self.__raw_nodes = None
+            self.__children = tuple([_build_node_object(action, child, False, 
+                                                        interned)
+                                     for child 
+                                     in raw_nodes])
+
+        super(ResponseV2AliveDirectoryNode, self).__init__(action, node, 
+                                                           keep_raw, interned)
 
     def __repr__(self):
-        node_count_phrase = (len(self.__raw_nodes) \
-                                if self.__raw_nodes is not None \
-                                else '<NA>')
+        if self.__children is not None:
+            node_count_phrase = len(self.__children)
+        elif self.__raw_nodes is not None:
+            node_count_phrase = len(self.__raw_nodes)
+        else:
+            node_count_phrase = '<NA>'
 
         return ('<NODE(%s) [%s] [%s] IS_HID=[%s] TTL=[%s] IS_DIR=[%s] '
                 'IS_COLL=[%s] COUNT=[%s] CI=(%d) MI=(%d)>' % 
@@ -184,18 +347,91 @@ class ResponseV2AliveDirectoryNode(ResponseV2DirectoryNode):
                  self.__is_collection, node_count_phrase, 
                  self.created_index, self.modified_index))
 
+    def __len__(self):
+        return len(self.children)
+
+    def __bool__(self):
+        # A directory without children is still a node.
+        return True
+
+    __nonzero__ = __bool__
+
+    def __contains__(self, key):
+        return key in self.__get_children_by_key()
+
+    def __get_children_by_key(self):
+        if self.__children_by_key is None:
+            self.__children_by_key = dict([(child.key, child) 
+                                           for child 
+                                           in self.children])
+
+        return self.__children_by_key
+
+    def get_child(self, key):
+        """Return the child with the given key.
+
+        :param key: Full key of the child
+        :type key: string
+
+        :rtype: :class:`ResponseV2BasicNode`
+
+        :raises: KeyError
+        """
+
+        return self.__get_children_by_key()[key]
+
+    def get_sorted_children(self, by=SORT_MODIFIED_INDEX, reverse=False):
+        """Return the children in the order of their created or modified 
+        indexes.
+
+        :param by: SORT_CREATED_INDEX or SORT_MODIFIED_INDEX
+        :type by: string
+
+        :param reverse: Return the most-recent first.
+        :type reverse: bool
+
+        :rtype: tuple of :class:`ResponseV2BasicNode`
+        """
+
+        try:
+            sorted_children = self.__sorted_children[by]
+        except KeyError:
+            if by not in (SORT_CREATED_INDEX, SORT_MODIFIED_INDEX):
+                raise ValueError("Children can't be sorted by: %s" % (by,))
+
+            sorted_children = tuple(sorted(
+                                self.children, 
+                                key=lambda child: getattr(child, by)))
+
+            self.__sorted_children[by] = sorted_children
+
+        if reverse is True:
+            return sorted_children[::-1]
+
+        return sorted_children
+
     @property
     def is_collection(self):
         return self.__is_collection
 
     @property
     def children(self):
+        """Return the children.
+
+        :rtype: tuple of :class:`ResponseV2BasicNode`
+
+        :raises: ValueError
+        """
+
         if self.__is_collection is False:
             raise ValueError("This directory node is not a collection.")
 
-# TODO: Cache the new objects for the benefit of repeated enumerations?
-        for node in self.__raw_nodes:
-            yield _build_node_object(self.action, node)
+        if self.__children is None:
+            self.__children = tuple([_build_node_object(self.action, node) 
+                                     for node 
+                                     in self.__raw_nodes])
+
+        return self.__children
 
 
 class ResponseV2DeletedDirectoryNode(ResponseV2DirectoryNode):
@@ -203,6 +439,8 @@ class ResponseV2DeletedDirectoryNode(ResponseV2DirectoryNode):
     among siblings.
     """
 
+    __slots__ = ()
+
     @property
     def is_deleted(self):
         return True
@@ -214,39 +452,127 @@ class ResponseV2(object):
     :param response: Raw Requests response object
     :param request_verb: Request verb ('get', post', 'put', etc..)
     :param request_path: Node key
+    :param retry_count: Number of times that the request was retried
+    :param keep_raw: Whether to keep the decoded document (as *raw_response*) 
+                     and the node dictionaries (as *raw_node*). If not, all 
+                     of the nodes are built right away, in their compact 
+                     form.
 
     :type response: requests.models.Response
     :type request_verb: string
     :type request_path: string
+    :type retry_count: int
+    :type keep_raw: bool
 
     :returns: Response object
     :rtype: etcd.response.ResponseV2
     """
 
-    def __init__(self, response, request_verb, request_path):
-        try:
-            response_raw = response.json()
-        except simplejson.JSONDecodeError:
-            # Bug #1120: Wait will timeout with a JSON-message of zero-length.
-            if response.text == '':
-                raise etcd.exceptions.EtcdEmptyResponseError()
+    def __init__(self, response, request_verb, request_path, retry_count=0, 
+                 keep_raw=True):
+        self.retry_count = retry_count
+
+        # The indexes are only parsed if they're asked for. The headers are 
+        # kept, since a coalesced response is shared between callers that 
+        # may ask at the same time (the worst case is that they're parsed 
+        # twice).
+        self.__headers = response.headers
+        self.__indexes = None
+
+        response_raw = _decode_body(response)
+
+        self.raw_response = response_raw
+
+        self.__node = None
+        self.__prev_node = _UNSET
+
+        if keep_raw is False:
+            interned = {}
+
+            self.__node = _build_node_object(response_raw['action'], 
+                                             response_raw['node'], 
+                                             False, 
+                                             interned)
+
+            if 'prevNode' in response_raw:
+                self.__prev_node = _build_node_object(
+                                    A__PREVNODE, 
+                                    response_raw['prevNode'], 
+                                    False, 
+                                    interned)
             else:
-                raise
+                self.__prev_node = None
+
+            self.raw_response = None
+
+    def __repr__(self):
+        return ('<RESPONSE: %s>' % (self.node))
+
+    @property
+    def indexes(self):
+        """Return the indexes that the server reported with the response.
+
+        :rtype: :class:`ResponseIndexes`
+        """
+
+        if self.__indexes is None:
+            self.__indexes = _get_header_indexes(self.__headers)
+
+        return self.__indexes
+
+    @property
+    def etcd_index(self):
+        """Return the index of the latest change in the cluster, as of this 
+        response.
+
+        :rtype: int or None
+        """
 
-        self.node = _build_node_object(response_raw['action'], 
-                                       response_raw['node'])
+        return self.indexes.etcd_index
 
-        # We have to fake the action (since we don't know what the last actual 
-        # was), but we can reasonably assume it was a SET action (it doesn't 
-        # really matter, as long as it's not a DELETE/CAD action).
+    @property
+    def raft_index(self):
+        return self.indexes.raft_index
+
+    @property
+    def raft_term(self):
+        return self.indexes.raft_term
+
+    @property
+    def node(self):
+        """Return the node that the request acted on. It's only built when 
+        it's first asked for.
+
+        :rtype: :class:`ResponseV2BasicNode`
+        """
+
+        if self.__node is None:
+            self.__node = _build_node_object(self.raw_response['action'], 
+                                             self.raw_response['node'])
+
+        return self.__node
+
+    @property
+    def prev_node(self):
+        """Return the node as it was before the request changed it, if the 
+        server reported it.
+
+        :rtype: :class:`ResponseV2BasicNode` or None
+        """
+
+        if self.__prev_node is _UNSET:
+            # We have to fake the action (since we don't know what the last 
+            # actual was), but we can reasonably assume it was a SET action 
+            # (it doesn't really matter, as long as it's not a DELETE/CAD 
+            # action).
 # TODO: We're assuming that the 'dir' flag will be set, in prevNode, when 
 #       appropriate.
-        if 'prevNode' in response_raw:
-            self.prev_node = _build_node_object(A__PREVNODE, 
-                                                response_raw['prevNode'])
-        else:
-            self.prev_node = None
+            try:
+                prev_node = self.raw_response['prevNode']
+            except KeyError:
+                self.__prev_node = None
+            else:
+                self.__prev_node = _build_node_object(A__PREVNODE, prev_node)
 
-    def __repr__(self):
-        return ('<RESPONSE: %s>' % (self.node))
+        return self.__prev_node
 
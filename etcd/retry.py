@@ -0,0 +1,179 @@
+"""The policy that decides whether a failed request is sent again. Only 
+reads are retried. A write that failed with a server-error or a timeout may 
+still have been applied, and even one that's conditional on the index of the 
+node would then fail its precondition when repeated, which looks like a 
+conflict with another writer (and a caller like *atomic_update()* would apply 
+its change a second time).
+"""
+
+import time
+import random
+import logging
+import threading
+
+from etcd.config import RETRY_MAX_RETRIES, RETRY_INITIAL_BACKOFF_S, \
+                        RETRY_MAX_BACKOFF_S, RETRY_BUDGET_RATIO, \
+                        RETRY_BUDGET_MIN_PER_S
+
+_logger = logging.getLogger(__name__)
+
+
+class RetryBudget(object):
+    """Limits the retries of a client to a fraction of its requests, so that 
+    a struggling cluster isn't sent even more requests. Every request deposits 
+    *ratio* of a retry, a small number of retries per second are always 
+    allowed, and every retry withdraws one.
+
+    :param ratio: Number of retries earned by every request
+    :type ratio: float
+
+    :param min_per_s: Number of retries per second that are always allowed
+    :type min_per_s: float
+    """
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, 
+                 min_per_s=RETRY_BUDGET_MIN_PER_S):
+        self.__ratio = ratio
+        self.__min_per_s = min_per_s
+        self.__capacity = max(1.0, float(min_per_s))
+        self.__balance = self.__capacity
+        self.__last_s = time.time()
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        return ('<RETRY-BUDGET RATIO=(%.2f) MIN_PER_S=(%.1f) BALANCE=(%.2f)>' % 
+                (self.__ratio, self.__min_per_s, self.__balance))
+
+    def __refill(self):
+        now_s = time.time()
+        self.__balance = min(self.__capacity, 
+                             self.__balance + 
+                                (now_s - self.__last_s) * self.__min_per_s)
+
+        self.__last_s = now_s
+
+    def deposit(self):
+        """Account for a request."""
+
+        with self.__lock:
+            self.__refill()
+            self.__balance = min(self.__capacity, 
+                                 self.__balance + self.__ratio)
+
+    def withdraw(self):
+        """Take one retry from the budget, if there's one left.
+
+        :rtype: bool
+        """
+
+        with self.__lock:
+            self.__refill()
+
+            if self.__balance < 1.0:
+                return False
+
+            self.__balance -= 1.0
+            return True
+
+    @property
+    def balance(self):
+        with self.__lock:
+            self.__refill()
+            return self.__balance
+
+
+class RetryPolicy(object):
+    """Decides which requests are retried, and when.
+
+    :param max_retries: Number of times that a request may be retried (zero to 
+                        disable retries).
+    :type max_retries: int
+
+    :param initial_backoff_s: Upper bound on the delay before the first retry. 
+                              The delay is chosen randomly below the bound, 
+                              and the bound doubles with every retry.
+    :type initial_backoff_s: float
+
+    :param max_backoff_s: Upper bound on the delay before any retry.
+    :type max_backoff_s: float
+
+    :param budget: Budget that all of the retries of the client draw on.
+    :type budget: :class:`RetryBudget` or None
+    """
+
+    def __init__(self, max_retries=RETRY_MAX_RETRIES, 
+                 initial_backoff_s=RETRY_INITIAL_BACKOFF_S, 
+                 max_backoff_s=RETRY_MAX_BACKOFF_S, budget=None):
+        self.__max_retries = max_retries
+        self.__initial_backoff_s = initial_backoff_s
+        self.__max_backoff_s = max_backoff_s
+        self.__budget = budget if budget is not None else RetryBudget()
+        self.__random = random.Random()
+
+    def __repr__(self):
+        return ('<RETRY-POLICY MAX_RETRIES=(%d) BACKOFF=(%.3f)-(%.3f)s %s>' % 
+                (self.__max_retries, self.__initial_backoff_s, 
+                 self.__max_backoff_s, self.__budget))
+
+    def is_retryable(self, verb, parameters, data, is_long_poll):
+        """Can the request be repeated without changing its outcome? Only 
+        reads can. Long-polls are left to the caller, who knows which index to 
+        resume from.
+
+        :rtype: bool
+        """
+
+        if is_long_poll is True:
+            return False
+
+        return verb == 'get'
+
+    def is_retryable_response(self, r):
+        """Does the response indicate a failure that a retry might not see?
+
+        :param r: Raw response
+        :type r: requests.models.Response
+
+        :rtype: bool
+        """
+
+        return r.status_code >= 500
+
+    def get_delay(self, retry_count, deadline=None):
+        """Return how long to wait before the given retry, or None if it 
+        shouldn't be made: the request was retried enough, the deadline would 
+        pass, or the budget is exhausted.
+
+        :param retry_count: Number of the retry (starting at one)
+        :type retry_count: int
+
+        :param deadline: Deadline of the request
+        :type deadline: :class:`etcd.deadline.Deadline` or None
+
+        :rtype: float or None
+        """
+
+        if retry_count > self.__max_retries:
+            return None
+
+        backoff_s = min(self.__initial_backoff_s * 2 ** (retry_count - 1), 
+                        self.__max_backoff_s)
+
+        delay_s = self.__random.uniform(0, backoff_s)
+
+        if deadline is not None and deadline.remaining_s <= delay_s:
+            return None
+
+        if self.__budget.withdraw() is False:
+            _logger.debug("The retry budget is exhausted.")
+            return None
+
+        return delay_s
+
+    @property
+    def budget(self):
+        return self.__budget
+
+    @property
+    def max_retries(self):
+        return self.__max_retries
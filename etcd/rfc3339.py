@@ -0,0 +1,88 @@
+"""Parsing of the RFC 3339 timestamps that the server reports expirations 
+with (e.g. "2014-02-10T11:58:49.123456789-05:00"). Fractional seconds are 
+kept to the microsecond, and offsets may be negative, positive, or "Z". 
+Nodes that were given the same TTL at the same time carry the same 
+timestamp, so parsed timestamps are memoized.
+"""
+
+import re
+
+from datetime import datetime, timedelta
+
+from etcd.compat import UTC
+
+_TIMESTAMP_RE = re.compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2})[Tt ]'
+                           r'([0-9]{2}):([0-9]{2}):([0-9]{2})'
+                           r'(?:\.([0-9]+))?'
+                           r'(?:[Zz]|([+-])([0-9]{2}):?([0-9]{2}))$')
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+_MEMO_MAX_SIZE = 4096
+
+_memo = {}
+
+
+def _parse(phrase):
+    m = _TIMESTAMP_RE.match(phrase)
+    if m is None:
+        raise ValueError("Timestamp is not RFC 3339: [%s]" % (phrase))
+
+    (year, month, day, hour, minute, second, fraction, sign, offset_hours, 
+     offset_minutes) = m.groups()
+
+    microsecond = int((fraction + '00000')[:6]) if fraction else 0
+
+    # A leap-second can't be represented.
+    dt = datetime(int(year), int(month), int(day), int(hour), int(minute), 
+                  min(int(second), 59), microsecond, UTC)
+
+    if sign is not None:
+        offset = timedelta(hours=int(offset_hours), 
+                           minutes=int(offset_minutes))
+
+        if sign == '-':
+            dt += offset
+        else:
+            dt -= offset
+
+    return dt
+
+def parse(phrase):
+    """Parse a timestamp.
+
+    :param phrase: Timestamp
+    :type phrase: string
+
+    :returns: Time, in UTC
+    :rtype: datetime.datetime
+
+    :raises: ValueError if the timestamp isn't valid.
+    """
+
+    try:
+        return _memo[phrase]
+    except KeyError:
+        pass
+
+    dt = _parse(phrase)
+
+    # Rather than track recency, just start over once it's full.
+    if len(_memo) >= _MEMO_MAX_SIZE:
+        _memo.clear()
+
+    _memo[phrase] = dt
+    return dt
+
+def parse_epoch_s(phrase):
+    """Parse a timestamp into seconds since the epoch.
+
+    :param phrase: Timestamp
+    :type phrase: string
+
+    :rtype: float
+
+    :raises: ValueError if the timestamp isn't valid.
+    """
+
+    return (parse(phrase) - _EPOCH).total_seconds()
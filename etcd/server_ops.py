@@ -5,6 +5,26 @@ from etcd.response import ResponseV2
 from etcd.compat import parse_qsl
 
 
+def parse_version(version_string):
+    """Extract the version from the text returned by the server.
+
+    :param version_string: Version text
+    :type version_string: string
+
+    :returns: Version
+    :rtype: string
+    """
+
+    # Version should look like "etcd v0.2.0".
+    prefix = 'etcd v'
+
+    if version_string.startswith(prefix) is False:
+        raise ValueError("Could not parse server version: %s" % 
+                         (version_string))
+
+    return version_string[len(prefix):]
+
+
 class ServerOps(CommonOps):
     """Functions that query the server for cluster-level information."""
 
@@ -17,14 +37,7 @@ class ServerOps(CommonOps):
         """
 
         version_string = self.get_text('version', '/version', version=None)
-
-        # Version should look like "etcd v0.2.0".
-        prefix = 'etcd v'
-
-        if version_string.startswith(prefix) is False:
-            raise ValueError("Could not parse server version: %s" % (r.text))
-
-        return version_string[len(prefix):]
+        return parse_version(version_string)
 
     def get_leader_url_prefix(self):
         """Return the URL prefix of the leader host.
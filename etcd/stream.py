@@ -0,0 +1,250 @@
+"""Incremental parsing of directory listings, so that very large (recursive)
+listings can be processed while they're still being received, and without
+ever holding the whole listing in memory. Only the nodes that are currently
+open (one per level of the tree) are held at any time.
+"""
+
+import codecs
+import collections
+import json
+import re
+
+StreamedLeaf = collections.namedtuple('StreamedLeaf',
+                                      ['key', 'value', 'modified_index',
+                                       'ttl'])
+
+_TOKEN_RE = re.compile(r'\s*(?:'
+                       r'([{}\[\],:])|'
+                       r'"([^"\\]*(?:\\.[^"\\]*)*)"|'
+                       r'(-?[0-9]+(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)|'
+                       r'(true|false|null))')
+
+# What the remainder of the buffer may look like if it's just the start of a
+# token that hasn't been completely received.
+_PARTIAL_RE = re.compile(r'\s*(?:"|-?[0-9]|t|f|n|$)')
+
+_LITERALS = { 'true': True, 'false': False, 'null': None }
+
+_DECODER = json.JSONDecoder()
+
+# The listed node itself is the "node" of the response, and its descendants
+# are in "nodes" arrays.
+_CONTEXT_NODE = 'node'
+_CONTEXT_NODES = 'nodes'
+
+
+def _decode_flat(buffer_, start):
+    """Decode the object that starts at the given position in one step 
+    (rather than token by token) if it's completely in the buffer and has no 
+    children (as with a leaf).
+
+    :returns: Object and the position that follows it, or None
+    :rtype: tuple or None
+    """
+
+    end = buffer_.find('}', start)
+    if end == -1 or buffer_.find('{', start + 1, end) != -1 or \
+       buffer_.find('[', start, end) != -1:
+        return None
+
+    # A brace in a string can still mislead the search above.
+    try:
+        (fields, end) = _DECODER.raw_decode(buffer_, start)
+    except ValueError:
+        return None
+
+    if 'nodes' in fields:
+        return None
+
+    return (fields, end)
+
+
+class LeafParser(object):
+    """Parses the JSON of a listing as it's fed, and produces its leaves (the
+    nodes that aren't directories). Directories, and the previous-node of
+    the response, are skipped.
+    """
+
+    def __init__(self):
+        self.__decoder = codecs.getincrementaldecoder('utf-8')()
+        self.__buffer = ''
+
+        # An entry for every container that's open: the key that it's the
+        # value of (if any), and its scalar fields (None for an array).
+        self.__stack = []
+
+        self.__key = None
+        self.__expects_key = False
+
+    def feed(self, content):
+        """Parse the next part of the body.
+
+        :param content: The bytes that follow what was given previously
+        :type content: bytes
+
+        :returns: The leaves that were completed
+        :rtype: list of :class:`StreamedLeaf`
+        """
+
+        self.__buffer += self.__decoder.decode(content)
+        return self.__parse(False)
+
+    def close(self):
+        """Parse whatever remains of the body.
+
+        :returns: The leaves that were completed
+        :rtype: list of :class:`StreamedLeaf`
+
+        :raises: ValueError if the body was incomplete.
+        """
+
+        self.__buffer += self.__decoder.decode(b'', True)
+        leaves = self.__parse(True)
+
+        if self.__buffer.strip() or self.__stack:
+            raise ValueError("Listing was truncated.")
+
+        return leaves
+
+    def __parse(self, is_final):
+        leaves = []
+        buffer_ = self.__buffer
+        length = len(buffer_)
+        position = 0
+
+        while position < length:
+            m = _TOKEN_RE.match(buffer_, position)
+            if m is None:
+                if is_final is True or \
+                   _PARTIAL_RE.match(buffer_, position) is None:
+                    raise ValueError("Listing is not valid JSON near "
+                                     "character (%d)." % (position))
+
+                break
+
+            (punctuation, string, number, literal) = m.groups()
+
+            # A number or a literal at the end of the buffer may continue in
+            # the next part.
+            if (number is not None or literal is not None) and \
+               m.end() == length and is_final is False:
+                break
+
+            position = m.end()
+
+            if punctuation == '{' and self.__is_node_context() is True:
+                fields_and_end = _decode_flat(buffer_, m.start(1))
+                if fields_and_end is not None:
+                    (fields, position) = fields_and_end
+                    self.__push_node(fields, leaves)
+                    continue
+
+            if punctuation is not None:
+                self.__push_punctuation(punctuation, leaves)
+            elif string is not None:
+                if '\\' in string:
+                    string = json.loads('"' + string + '"')
+
+                if self.__expects_key is True:
+                    self.__key = string
+                else:
+                    self.__push_value(string)
+            elif number is not None:
+                if '.' in number or 'e' in number or 'E' in number:
+                    self.__push_value(float(number))
+                else:
+                    self.__push_value(int(number))
+            else:
+                self.__push_value(_LITERALS[literal])
+
+        self.__buffer = buffer_[position:]
+        return leaves
+
+    def __is_node_context(self):
+        """Return whether an object that starts now will be a node."""
+
+        stack = self.__stack
+        if not stack:
+            return False
+        elif stack[-1][1] is None:
+            return stack[-1][0] == _CONTEXT_NODES
+        else:
+            return self.__key == _CONTEXT_NODE and len(stack) == 1
+
+    def __push_node(self, fields, leaves):
+        if fields.get('dir') is not True:
+            leaves.append(StreamedLeaf(key=fields.get('key'),
+                                       value=fields.get('value'),
+                                       modified_index=fields.get(
+                                            'modifiedIndex'),
+                                       ttl=fields.get('ttl')))
+
+        self.__key = None
+        self.__expects_key = False
+
+    def __push_value(self, value):
+        if self.__stack and self.__stack[-1][1] is not None:
+            self.__stack[-1][1][self.__key] = value
+
+    def __push_punctuation(self, punctuation, leaves):
+        stack = self.__stack
+
+        if punctuation == ':':
+            self.__expects_key = False
+        elif punctuation == ',':
+            self.__expects_key = bool(stack) and stack[-1][1] is not None
+        elif punctuation == '{' or punctuation == '[':
+            if not stack:
+                context = None
+            elif stack[-1][1] is None:
+                # An element of an array is in the array's context.
+                context = stack[-1][0]
+            else:
+                context = self.__key
+
+            fields = {} if punctuation == '{' else None
+            stack.append((context, fields))
+
+            self.__key = None
+            self.__expects_key = fields is not None
+        else:
+            if not stack:
+                raise ValueError("Listing is not valid JSON (unbalanced "
+                                 "'%s')." % (punctuation))
+
+            (context, fields) = stack.pop()
+
+            if fields is not None and \
+               (context == _CONTEXT_NODES or
+                (context == _CONTEXT_NODE and len(stack) == 1)):
+                self.__push_node(fields, leaves)
+            else:
+                self.__key = None
+                self.__expects_key = False
+
+
+def iter_leaves(r, chunk_size):
+    """Yield the leaves of a listing as its body is received. The response
+    is closed when the body has been consumed, or when the generator is
+    discarded.
+
+    :param r: Response whose body hasn't been read yet
+    :type r: requests.models.Response
+
+    :param chunk_size: Number of bytes to read at a time
+    :type chunk_size: int
+
+    :rtype: generator of :class:`StreamedLeaf`
+    """
+
+    parser = LeafParser()
+
+    try:
+        for content in r.iter_content(chunk_size):
+            for leaf in parser.feed(content):
+                yield leaf
+
+        for leaf in parser.close():
+            yield leaf
+    finally:
+        r.close()
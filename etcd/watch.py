@@ -0,0 +1,491 @@
+"""Continuous watches. Unlike a single wait, a watch remembers the index of
+the last change that it reported and always resumes right after it, so no
+change is missed between one long-poll and the next.
+"""
+
+import collections
+import logging
+import time
+
+from requests.exceptions import ConnectionError, ChunkedEncodingError, \
+                                HTTPError
+
+import etcd.config
+
+from etcd.exceptions import EtcdEmptyResponseError, EtcdTimeoutError, \
+                            EtcdIndexClearedError, \
+                            EtcdAllMachinesFailedError, translate_http_error
+from etcd.response import A_SET, A_DELETE, A_CAD, A_EXPIRE
+
+_logger = logging.getLogger(__name__)
+
+WatchEvent = collections.namedtuple('WatchEvent',
+                                    ['action', 'node', 'prev_node',
+                                     'is_synthetic'])
+
+
+def get_watch_event(response):
+    """Build the event for the response of a long-poll.
+
+    :param response: Response
+    :type response: :class:`etcd.response.ResponseV2`
+
+    :rtype: :class:`WatchEvent`
+    """
+
+    node = response.node
+    return WatchEvent(action=node.action, node=node,
+                      prev_node=response.prev_node, is_synthetic=False)
+
+def get_listed_nodes(node, recursive):
+    """Return the given node (from a listing) or, if recursive, all of its 
+    descendants (a directory that's watched recursively is only watched for 
+    its descendants), by key.
+
+    :param node: Listed node
+    :type node: :class:`etcd.response.ResponseV2BasicNode`
+
+    :rtype: dictionary
+    """
+
+    nodes = {}
+
+    if recursive is True and node.is_collection is True:
+        pending = list(node.children)
+    else:
+        pending = [node]
+
+    # Walk the tree without recursion, since it can be deep.
+    while pending:
+        node = pending.pop()
+        nodes[node.key] = node
+
+        if recursive is True and node.is_collection is True:
+            pending.extend(node.children)
+
+    return nodes
+
+def get_resync_events(known, listed, index=None):
+    """Return the changes that turn one state into another, as synthetic 
+    events: a set for every node that's new or was modified, and a delete 
+    for every node that's gone. The node of a delete is the last one that 
+    was known (the index that it was deleted at isn't known). A node that 
+    wasn't known is only new if it was modified at or after *index*.
+
+    :param known: Nodes by key
+    :type known: dictionary
+
+    :param listed: Nodes by key
+    :type listed: dictionary
+
+    :param index: Index that the watch had reached
+    :type index: int or None
+
+    :rtype: list of :class:`WatchEvent`
+    """
+
+    events = []
+
+    for key in sorted(listed):
+        node = listed[key]
+        prev_node = known.get(key)
+        if prev_node is None:
+            # Anything older was reported before, or predates the watch.
+            is_changed = index is None or node.modified_index is None or \
+                         node.modified_index >= index
+        else:
+            is_changed = prev_node.modified_index != node.modified_index
+
+        if is_changed is True:
+            events.append(WatchEvent(action=A_SET, node=node, 
+                                     prev_node=prev_node, is_synthetic=True))
+
+    for key in sorted(known):
+        if key not in listed:
+            node = known[key]
+            events.append(WatchEvent(action=A_DELETE, node=node, 
+                                     prev_node=node, is_synthetic=True))
+
+    return events
+
+def get_listing_index(listed, etcd_index, index=None):
+    """Return the index to watch from after a listing: the one after the 
+    etcd-index that was reported with it or, if none was, the one after the 
+    latest change in the listing. It's never before *index*, which the watch 
+    had already reached.
+
+    :param listed: Listed nodes by key
+    :type listed: dictionary
+
+    :param etcd_index: Etcd-index reported with the listing
+    :type etcd_index: int or None
+
+    :param index: Index that the watch had reached
+    :type index: int or None
+
+    :rtype: int or None
+    """
+
+    if etcd_index is not None:
+        listing_index = etcd_index + 1
+        if index is not None and index > listing_index:
+            return index
+
+        return listing_index
+
+    modified_indexes = [node.modified_index 
+                        for node 
+                        in listed.values() 
+                        if node.modified_index is not None]
+
+    if not modified_indexes:
+        return index
+
+    listing_index = max(modified_indexes) + 1
+    if index is not None and index > listing_index:
+        return index
+
+    return listing_index
+
+def get_wait_parameters(recursive, index):
+    """Build the query parameters of a long-poll.
+
+    :rtype: dictionary
+    """
+
+    parameters = { 'wait': 'true' }
+
+    if recursive is True:
+        parameters['recursive'] = 'true'
+
+    if index is not None:
+        parameters['waitIndex'] = index
+
+    return parameters
+
+
+# What a failed long-poll calls for.
+POLL_ERROR_RETRY = 'retry'
+POLL_ERROR_BACK_OFF = 'back_off'
+POLL_ERROR_RESYNC = 'resync'
+
+
+class _WatcherBase(object):
+    """The state of a watch, shared by the blocking and the asyncio 
+    watchers. These only send the requests (and wait between them).
+    """
+
+    def __init__(self, client, path, recursive=False, index=None,
+                 poll_timeout=None, resync=True, listing=None):
+        self.__client = client
+        self.__path = path
+        self.__fq_path = client.node.get_fq_node_path(path)
+        self.__recursive = recursive
+        self.__index = index
+        self.__poll_timeout = poll_timeout
+        self.__backoff_s = etcd.config.WATCH_RECONNECT_BACKOFF_S
+        self.__is_closed = False
+        self.__resync = resync
+
+        # Synthetic events that haven't been reported yet.
+        self.__pending = collections.deque()
+
+        # The state that a resync compares against, by key.
+        self.__known = {}
+
+        if listing is not None:
+            self.__known = get_listed_nodes(listing.node, recursive)
+            self.__index = get_listing_index(self.__known, 
+                                             listing.etcd_index, index)
+
+    def __repr__(self):
+        return ('<%s [%s] RECURSIVE=[%s] INDEX=(%s)>' %
+                (self.__class__.__name__.upper(), self.__path, 
+                 self.__recursive, self.__index))
+
+    def pop_pending(self):
+        """Return the next synthetic event that hasn't been reported yet.
+
+        :rtype: :class:`WatchEvent` or None
+        """
+
+        if self.__pending:
+            return self.__pending.popleft()
+
+        return None
+
+    def get_poll_arguments(self):
+        """Return the arguments to send the next long-poll with.
+
+        :returns: Path, parameters, and timeout
+        :rtype: tuple
+        """
+
+        parameters = get_wait_parameters(self.__recursive, self.__index)
+        return (self.__fq_path, parameters, self.__poll_timeout)
+
+    def get_poll_error_action(self, e):
+        """Return what a long-poll that failed calls for: POLL_ERROR_RETRY, 
+        POLL_ERROR_BACK_OFF, or POLL_ERROR_RESYNC.
+
+        :param e: The error that the request raised
+        :type e: Exception
+
+        :rtype: string
+
+        :raises: The error (or the one that it translates to) if the watch 
+                 can't go on.
+        """
+
+        if isinstance(e, (EtcdEmptyResponseError, EtcdTimeoutError,
+                          ChunkedEncodingError)) is True:
+            # Nothing changed while the long-poll was open.
+            return POLL_ERROR_RETRY
+        elif isinstance(e, (ConnectionError, 
+                            EtcdAllMachinesFailedError)) is True:
+            # The client gives up once every machine has failed, but the 
+            # watch waits for the cluster to come back.
+            _logger.debug("Watch of [%s] could not connect: %s",
+                          self.__path, str(e))
+
+            return POLL_ERROR_BACK_OFF
+        elif isinstance(e, HTTPError) is True:
+            error = translate_http_error(self.__path, e)
+            if isinstance(error, EtcdIndexClearedError) is True:
+                if self.__resync is False:
+                    raise error
+
+                _logger.warning("Watch of [%s] fell behind the server's "
+                                "history at index (%s). Resyncing.", 
+                                self.__path, self.__index)
+
+                return POLL_ERROR_RESYNC
+
+            # A server that's failing (rather than refusing the request) may
+            # recover.
+            if e.response is not None and e.response.status_code >= 500:
+                _logger.debug("Watch of [%s] failed on the server: %s",
+                              self.__path, str(e))
+
+                return POLL_ERROR_BACK_OFF
+
+        raise e
+
+    def get_backoff_s(self):
+        """Return the number of seconds to wait for before trying again, and
+        back off further for the next time.
+
+        :rtype: float
+        """
+
+        backoff_s = self.__backoff_s
+
+        _logger.debug("Watch of [%s] will try again in (%.3f)s.",
+                      self.__path, backoff_s)
+
+        self.__backoff_s = min(backoff_s * 2,
+                               etcd.config.WATCH_MAX_RECONNECT_BACKOFF_S)
+
+        return backoff_s
+
+    def accept(self, response):
+        """Account for the response of a long-poll.
+
+        :param response: Response
+        :type response: :class:`etcd.response.ResponseV2`
+
+        :returns: The change
+        :rtype: :class:`WatchEvent`
+        """
+
+        self.__backoff_s = etcd.config.WATCH_RECONNECT_BACKOFF_S
+
+        event = get_watch_event(response)
+        self.__index = event.node.modified_index + 1
+
+        if self.__resync is True:
+            self.__track(event)
+
+        return event
+
+    def __track(self, event):
+        node = event.node
+        known = self.__known
+
+        if event.action in (A_DELETE, A_CAD, A_EXPIRE):
+            known.pop(node.key, None)
+
+            if node.is_directory is True:
+                prefix = node.key + '/'
+                for key in [key for key in known if key.startswith(prefix)]:
+                    del known[key]
+        elif self.__recursive is False or node.is_directory is False or \
+             node.key.rstrip('/') != self.__path.rstrip('/'):
+            # A directory that's watched recursively isn't tracked itself, 
+            # only its descendants are.
+            known[node.key] = node
+
+    def accept_listing(self, r):
+        """Resync from a listing of the node: queue the synthetic events and 
+        resume after the listing.
+
+        :param r: Listing, or the KeyError raised if the node doesn't exist
+        :type r: :class:`etcd.response.ResponseV2` or KeyError
+
+        :returns: The first synthetic event, if any
+        :rtype: :class:`WatchEvent` or None
+        """
+
+        if isinstance(r, KeyError) is True:
+            # The node doesn't exist (anymore).
+            listed = {}
+
+            indexes = getattr(r, 'indexes', None)
+            etcd_index = indexes.etcd_index if indexes is not None else None
+        else:
+            listed = get_listed_nodes(r.node, self.__recursive)
+            etcd_index = r.etcd_index
+
+        self.__pending.extend(get_resync_events(self.__known, listed, 
+                                                self.__index))
+        self.__known = listed
+        self.__index = get_listing_index(listed, etcd_index, self.__index)
+
+        return self.pop_pending()
+
+    def close(self):
+        """Stop reporting changes. A long-poll that's already open isn't 
+        interrupted, but no change is reported after it.
+        """
+
+        self.__is_closed = True
+
+    @property
+    def client(self):
+        return self.__client
+
+    @property
+    def is_closed(self):
+        return self.__is_closed
+
+    @property
+    def index(self):
+        """Return the index that changes will be reported from.
+
+        :rtype: int or None
+        """
+
+        return self.__index
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def recursive(self):
+        return self.__recursive
+
+
+class Watcher(_WatcherBase):
+    """Reports every change to a node (or, recursively, to a directory), in
+    order, as an iterator of :class:`WatchEvent`.
+
+    Every change is reported with the index that it was made at, and the
+    next long-poll asks for the changes from the following index on. A
+    long-poll that times out (including the empty response of etcd issue
+    #1120) is simply sent again, and the client fails-over between machines
+    as usual. If no machine can be connected-to, or the server fails, the
+    watch keeps trying, backing off between attempts.
+
+    If the watch falls so far behind that the server has cleared the changes 
+    that it needs from its history, it resyncs: it lists the node (or 
+    directory), reports the difference from the last state that it knew of 
+    as synthetic events (*is_synthetic* is True), and resumes from the 
+    listing. The state is kept from the changes that the watch reports, so 
+    deletions of nodes that it never saw can only be reported if the watch 
+    was started from a listing. A node that it never saw is only reported if 
+    it was modified after the index that the watch had reached, and a 
+    directory that's watched recursively isn't reported itself.
+
+    :param client: Client instance
+    :type client: :class:`etcd.client.Client`
+
+    :param path: Node key
+    :type path: string
+
+    :param recursive: Report changes to any descendant of the node.
+    :type recursive: bool
+
+    :param index: Index to report changes from (such as the etcd-index of a
+                  listing, plus one). By default, changes from when the first
+                  long-poll is sent.
+    :type index: int or None
+
+    :param poll_timeout: Number of seconds that a single long-poll may wait
+                         for. By default, the client's *wait_timeout_s*
+                         applies.
+    :type poll_timeout: float or None
+
+    :param resync: Resync when the changes have been cleared, rather than 
+                   raising :class:`etcd.exceptions.EtcdIndexClearedError`.
+    :type resync: bool
+
+    :param listing: Listing of the node to start from, in place of *index*.
+    :type listing: :class:`etcd.response.ResponseV2` or None
+    """
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while self.is_closed is False:
+            event = self.poll()
+            if event is not None and self.is_closed is False:
+                return event
+
+        raise StopIteration()
+
+    next = __next__
+
+    def poll(self):
+        """Send one long-poll.
+
+        :returns: The next change, or None if there wasn't one before the
+                  long-poll ended.
+        :rtype: :class:`WatchEvent` or None
+        """
+
+        event = self.pop_pending()
+        if event is not None:
+            return event
+
+        (fq_path, parameters, timeout) = self.get_poll_arguments()
+
+        try:
+            response = self.client.send(2, 'get', fq_path,
+                                        parameters=parameters,
+                                        timeout=timeout)
+        except Exception as e:
+            action = self.get_poll_error_action(e)
+        else:
+            return self.accept(response)
+
+        if action == POLL_ERROR_BACK_OFF:
+            time.sleep(self.get_backoff_s())
+        elif action == POLL_ERROR_RESYNC:
+            try:
+                r = self.client.directory.list(self.path, 
+                                               recursive=self.recursive)
+            except KeyError as e:
+                r = e
+            except Exception as e:
+                # The next long-poll finds the history cleared again, and 
+                # resyncs then.
+                if self.get_poll_error_action(e) == POLL_ERROR_BACK_OFF:
+                    time.sleep(self.get_backoff_s())
+
+                return None
+
+            return self.accept_listing(r)
+
+        return None
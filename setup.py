@@ -35,4 +35,7 @@ setuptools.setup(
       include_package_data=True,
       zip_safe=False,
       install_requires=install_requires,
+      extras_require={
+            'async': ['aiohttp'],
+      },
 )